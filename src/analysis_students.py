@@ -5,42 +5,60 @@ This module provides functionality to export student performance summaries
 for Power BI visualization and analysis.
 """
 
+import argparse
 import logging
-import pandas as pd
 import os
-from sqlalchemy import text
+from concurrent.futures import ThreadPoolExecutor
 from db_utils import get_engine
-from config import POWERBI_DIR, QUERIES
+from config import POWERBI_DIR, SUMMARIES, SUMMARY_CONFIG
+import columnar_store
+import instrumentation
+import summary_engine
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 
-def export_summaries():
+def _write_summary(name, df):
+    """
+    Write one summary to its Power BI CSV.
+    
+    Args:
+        name (str): Summary name (a SUMMARIES key)
+        df (pd.DataFrame): Summary rows
+    """
+    path = os.path.join(POWERBI_DIR, SUMMARIES[name]["file"])
+    df.to_csv(path, index=False)
+    logger.info(f"✅ {name} exported to {path}")
+
+
+def export_summaries(source="db"):
     """
     Export student performance summaries to CSV files for Power BI.
     
-    Exports:
+    Every report registered in config.SUMMARIES is exported, by default:
     - Gender-based pass rate analysis
     - Age-based average grade analysis
+    
+    The summary engine answers all reports from as few scans as possible,
+    and the scans and the file writes run concurrently.
+    
+    Args:
+        source (str): "db" to query the students table, "store" to read the
+            columnar store written by the ETL
     """
     try:
-        eng = get_engine()
-        
-        # Gender-based pass rate analysis
-        gender_query = text(QUERIES["gender_analysis"])
-        df_gender = pd.read_sql(gender_query, eng)
-        gender_file = os.path.join(POWERBI_DIR, "passrate_by_gender.csv")
-        df_gender.to_csv(gender_file, index=False)
-        logger.info(f"✅ Gender analysis exported to {gender_file}")
+        with instrumentation.span("summaries.compute"):
+            if source == "store":
+                df = columnar_store.read_store(summary_engine.required_columns())
+                results = summary_engine.run_on_frame(df)
+            else:
+                results = summary_engine.run_on_engine(get_engine())
         
-        # Age-based average grade analysis
-        age_query = text(QUERIES["age_analysis"])
-        df_age = pd.read_sql(age_query, eng)
-        age_file = os.path.join(POWERBI_DIR, "avg_grade_by_age.csv")
-        df_age.to_csv(age_file, index=False)
-        logger.info(f"✅ Age analysis exported to {age_file}")
+        with instrumentation.span("summaries.write"), \
+                ThreadPoolExecutor(max_workers=SUMMARY_CONFIG["workers"]) as pool:
+            list(pool.map(lambda item: _write_summary(*item), results.items()))
         
         return True
         
@@ -50,4 +68,8 @@ def export_summaries():
 
 
 if __name__ == "__main__":
-    export_summaries()
+    parser = argparse.ArgumentParser(description="Export Power BI summaries")
+    parser.add_argument("--source", choices=["db", "store"], default="db",
+                        help="read the students table or the columnar store")
+    args = parser.parse_args()
+    export_summaries(args.source)
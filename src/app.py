@@ -3,6 +3,10 @@ import pandas as pd
 import mysql.connector
 from sqlalchemy import create_engine
 import os
+import chart_data
+import dashboard_data
+import olap_cube
+from config import DASHBOARD_CONFIG
 
 # ---------------------------
 # STREAMLIT PAGE SETTINGS
@@ -32,10 +36,59 @@ DATABASE = "railway"
 # SQLAlchemy connection string
 connection_string = f"mysql+mysqlconnector://{USER}:{PASSWORD}@{HOST}:{PORT}/{DATABASE}"
 
-# Create SQLAlchemy engine
+# ---------------------------
+# CACHED DATA ACCESS
+# ---------------------------
+# Streamlit re-runs this script on every interaction. The engine (and its
+# connection pool) is created once per process, and query results are cached
+# for DASHBOARD_CACHE_TTL seconds, so reruns do not go back to the database.
+# Leading underscores keep Streamlit from hashing the engine argument.
+CACHE_TTL = DASHBOARD_CONFIG["cache_ttl"]
+
+
+@st.cache_resource
+def get_engine():
+    return create_engine(connection_string, pool_pre_ping=True, pool_recycle=3600)
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def load_columns(_engine):
+    return dashboard_data.student_columns(_engine)
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def load_overview(_engine, columns):
+    # KPIs and every chart the columns allow, queried concurrently
+    panels = {"kpis": dashboard_data.kpi_plan(_engine)}
+    if "sex" in columns and "final_result" in columns:
+        panels["gender_pass"] = dashboard_data.pass_rate_plan(_engine, "sex")
+    # Charts are binned or downsampled server-side, so their size does not grow with the table
+    if "G3" in columns and "age" in columns:
+        panels["avg_grade"] = chart_data.downsampled(dashboard_data.avg_grade_plan(_engine, "age"), "age", "G3")
+    if "studytime" in columns and "G3" in columns:
+        panels["study_points"] = chart_data.bin2d_plan(_engine, "studytime", "G3")
+    if "absences" in columns and "G3" in columns:
+        panels["absence_density"] = chart_data.bin2d_plan(_engine, "absences", "G3")
+    overview = dashboard_data.load_panels(_engine, panels)
+    if "absence_density" in overview:
+        overview["absence_density"] = chart_data.hexbin(overview["absence_density"], "absences", "G3")
+    return overview
+
+
+@st.cache_resource(ttl=CACHE_TTL, show_spinner=False)
+def load_cube(_engine):
+    # Built once per ETL load; every filter change is answered from memory
+    return olap_cube.get_cube(_engine)
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def load_page(_engine, page, page_size):
+    return dashboard_data.load_page(_engine, page, page_size)
+
+
 try:
-    engine = create_engine(connection_string)
-    df = pd.read_sql("SELECT * FROM students", con=engine)
+    engine = get_engine()
+    columns = load_columns(engine)
     st.success("✅ Connected to Railway MySQL Database")
 except Exception as e:
     st.error(f"❌ Database connection failed: {e}")
@@ -45,13 +98,15 @@ except Exception as e:
 # DATA CLEANING / INSIGHTS
 # ---------------------------
 st.subheader("📋 Dataset Preview")
-st.dataframe(df.head())
+st.dataframe(load_page(engine, 1, 5))
 
 # Summary Metrics
-total_students = len(df)
-passed = len(df[df["final_result"].str.lower() == "pass"])
-failures = len(df[df["final_result"].str.lower() == "fail"])
-pass_rate = round((passed / total_students) * 100, 2)
+overview = load_overview(engine, tuple(columns))
+kpis = overview["kpis"]
+total_students = kpis["total_students"]
+passed = kpis["passed"]
+failures = kpis["failures"]
+pass_rate = kpis["pass_rate"]
 
 # ---------------------------
 # ---------------------------
@@ -143,36 +198,67 @@ st.markdown("---")
 
 # Pass rate by gender
 st.subheader("📊 Pass Rate by Gender")
-if "sex" in df.columns and "final_result" in df.columns:
-    gender_pass = (
-        df.groupby("sex")["final_result"]
-        .apply(lambda x: (x.str.lower() == "pass").mean() * 100)
-        .reset_index()
-    )
-    st.bar_chart(gender_pass.set_index("sex"))
+if "gender_pass" in overview:
+    st.bar_chart(overview["gender_pass"].set_index("sex"))
 else:
     st.warning("⚠️ Columns 'sex' or 'final_result' missing from dataset.")
 
 # Average grade by age
 st.subheader("📈 Average Final Grade by Age")
-if "G3" in df.columns and "age" in df.columns:
-    avg_grade = df.groupby("age")["G3"].mean().reset_index()
-    st.line_chart(avg_grade.set_index("age"))
+if "avg_grade" in overview:
+    st.line_chart(overview["avg_grade"].set_index("age"))
 else:
     st.info("ℹ️ No 'G3' column found for grades in dataset.")
 
-# Study time vs final grade
+# Study time vs final grade (one point per distinct pair, sized by student count)
 st.subheader("📉 Study Time vs Final Grade")
-if "studytime" in df.columns and "G3" in df.columns:
-    st.scatter_chart(df[["studytime", "G3"]])
+if "study_points" in overview:
+    st.scatter_chart(overview["study_points"], x="studytime", y="G3", size="n")
 else:
     st.warning("⚠️ Columns 'studytime' or 'G3' not found in dataset.")
 
+# Absences vs final grade, as hexagonal density cells sized by student count
+st.subheader("🔷 Absences vs Final Grade (density)")
+if "absence_density" in overview:
+    st.scatter_chart(overview["absence_density"], x="absences", y="G3", size="n", color="#8e6cc0")
+else:
+    st.info("ℹ️ Columns 'absences' or 'G3' not found in dataset.")
+
+# ---------------------------
+# INTERACTIVE SLICING
+# ---------------------------
+st.markdown("---")
+st.subheader("🔎 Explore Students")
+try:
+    cube = load_cube(engine)
+except Exception as e:
+    cube = None
+    st.warning(f"⚠️ Interactive filters unavailable: {e}")
+
+if cube is not None and cube.dimensions:
+    st.sidebar.header("🔎 Filters")
+    filters = {dim: st.sidebar.multiselect(dim, cube.values(dim)) for dim in cube.dimensions}
+    breakdown = st.selectbox("Break down by", cube.dimensions)
+
+    selected = cube.query(filters).iloc[0]
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Students", int(selected["n"]))
+    c2.metric("Passed", int(selected["passed"]))
+    c3.metric("Pass Rate (%)", round(selected["pass_rate"], 2))
+    c4.metric("Mean G3", "-" if pd.isna(selected["G3_mean"]) else round(selected["G3_mean"], 2))
+
+    by_group = cube.query(filters, [breakdown])
+    st.bar_chart(by_group.set_index(breakdown)[["pass_rate"]])
+    st.dataframe(by_group)
+
 # ---------------------------
 # RAW DATA VIEW
 # ---------------------------
 with st.expander("📂 View Full Dataset"):
-    st.dataframe(df)
+    page_size = st.selectbox("Rows per page", DASHBOARD_CONFIG["page_sizes"])
+    page_count = max(1, -(-total_students // page_size))
+    page = st.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1, step=1)
+    st.dataframe(load_page(engine, page, page_size))
 
 st.markdown("---")
 st.caption("Built with ❤️ using Streamlit + MySQL (Railway)")
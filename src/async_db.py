@@ -0,0 +1,133 @@
+"""
+Async Database Access Module
+
+This module runs independent read queries concurrently, so a dashboard page
+or a multi-report export takes about as long as its slowest query instead
+of the sum of all of them.
+
+Queries run on the asyncio engine from db_utils.get_async_engine() (aiomysql
+or aiosqlite), with at most DB_CONFIG["max_concurrency"] in flight. When the
+async drivers are not installed they run on a thread pool over the sync
+engine instead, with the same bound. Either way results go through
+query_cache, so cached results skip the database.
+"""
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from sqlalchemy import text
+from config import DB_CONFIG, QUERY_CACHE_CONFIG
+import db_utils
+import query_cache
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+async def _table_versions(aeng, tables):
+    """Async counterpart of query_cache.table_versions()."""
+    versions = query_cache.known_versions(aeng)
+    if versions is None:
+        try:
+            async with aeng.connect() as conn:
+                rows = (await conn.execute(text(query_cache.versions_sql()))).fetchall()
+        except Exception:
+            rows = None
+        versions = query_cache.remember_versions(aeng, rows)
+    return query_cache.select_versions(versions, tables)
+
+
+def frame_from_rows(rows, columns):
+    """
+    Build a result frame the way pd.read_sql does.
+
+    Decimal values (SUM/AVG on aiomysql) become floats, so async results
+    have the same dtypes as sync ones and can share their cache entries.
+
+    Args:
+        rows (list): Result rows
+        columns (list): Column names
+
+    Returns:
+        pd.DataFrame: The rows as a frame
+    """
+    return pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+
+
+async def read_sql(aeng, sql, params=None, tables=None):
+    """
+    Run a read query on an async engine, through the query cache.
+
+    Args:
+        aeng: AsyncEngine
+        sql (str): SQL with optional :name bind parameters
+        params (dict): Bind parameter values
+        tables (list): Tables the query reads (defaults to query_cache.tables_in(sql))
+
+    Returns:
+        pd.DataFrame: Query result
+    """
+    versions = None
+    if QUERY_CACHE_CONFIG["enabled"]:
+        versions = await _table_versions(aeng, tables or query_cache.tables_in(sql))
+    key, df = query_cache.lookup(aeng, sql, params, versions)
+    if df is None:
+        async with aeng.connect() as conn:
+            result = await conn.execute(text(sql), params or {})
+            df = frame_from_rows(result.fetchall(), list(result.keys()))
+        query_cache.store(key, df)
+    return df
+
+
+async def read_many_async(aeng, queries, limit=None):
+    """
+    Run queries concurrently on an async engine.
+
+    Args:
+        aeng: AsyncEngine
+        queries (list): (sql, params) pairs
+        limit (int): Most queries in flight (defaults to DB_CONFIG["max_concurrency"])
+
+    Returns:
+        list: Result frames, in the order of queries
+    """
+    semaphore = asyncio.Semaphore(limit or DB_CONFIG["max_concurrency"])
+
+    async def run(sql, params):
+        async with semaphore:
+            return await read_sql(aeng, sql, params)
+
+    return list(await asyncio.gather(*(run(sql, params) for sql, params in queries)))
+
+
+def read_many(queries, eng=None, limit=None):
+    """
+    Run independent queries concurrently and wait for all of them.
+
+    Uses the async engine for eng's database when db_utils.async_available()
+    and a bounded thread pool over eng otherwise.
+
+    Args:
+        queries (list): (sql, params) pairs
+        eng: Sync engine choosing the database (defaults to db_utils.get_engine())
+        limit (int): Most queries in flight (defaults to DB_CONFIG["max_concurrency"])
+
+    Returns:
+        list: Result frames, in the order of queries
+    """
+    try:
+        eng = eng or db_utils.get_engine()
+        limit = limit or DB_CONFIG["max_concurrency"]
+        if not queries:
+            return []
+        if db_utils.async_available(eng):
+            aeng = db_utils.get_async_engine(eng)
+            return db_utils.run_async(read_many_async(aeng, queries, limit))
+        with ThreadPoolExecutor(max_workers=max(1, min(limit, len(queries)))) as pool:
+            return list(pool.map(lambda q: query_cache.read_sql(eng, q[0], q[1]), queries))
+
+    except Exception as e:
+        logger.error(f"❌ Error running concurrent queries: {str(e)}")
+        raise
@@ -0,0 +1,626 @@
+"""
+Student Performance Benchmark Module
+
+This module times pipeline steps on synthetic data so that performance
+changes can be measured at production-like row counts.
+"""
+
+import os
+import time
+import platform
+import contextlib
+import threading
+import json
+import argparse
+import logging
+import tempfile
+import subprocess
+import sys
+from datetime import datetime, timezone
+from unittest import mock
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, text
+import analysis_students
+import bulk_load
+import columnar_store
+import dashboard_data
+import etl_students
+import feature_store
+import forest_arrays
+import ml_predict_passfail
+import predict_service
+import summary_tables
+import synthetic_students
+import transforms
+from db_utils import get_engine
+from config import BENCHMARK_CONFIG, PROCESSED_FILE, ML_CONFIG, MODEL_FILE, MODEL_ARRAYS_DIR, SUMMARIES, QUERY_CACHE_CONFIG
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def make_raw_grades(rows, seed=42):
+    """
+    Generate raw grade columns shaped like the UCI extract.
+
+    Args:
+        rows (int): Number of rows
+        seed (int): Random seed
+
+    Returns:
+        pd.DataFrame: G1, G2 and G3 columns with grades between 0 and 20
+    """
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({col: rng.integers(0, 21, rows) for col in transforms.COLUMN_SCHEMA})
+
+
+def _legacy_transform(df):
+    """The per-row implementation the transform engine replaced."""
+    for col in transforms.COLUMN_SCHEMA:
+        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(int)
+    df['final_result'] = df['G3'].apply(lambda x: 'pass' if x >= 10 else 'fail')
+    df['target'] = df['final_result'].apply(lambda x: 1 if x == 'pass' else 0)
+    return df
+
+
+def _vectorized_transform(df):
+    """The schema-driven implementation used by the ETL and ML loader."""
+    df = transforms.transform(df)
+    df['target'] = transforms.encode_target(df['final_result'])
+    return df
+
+
+def _time(func, df, repeat):
+    """Return the best wall time of func over repeat fresh copies of df."""
+    best = float("inf")
+    for _ in range(repeat):
+        frame = df.copy()
+        start = time.perf_counter()
+        func(frame)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_transforms(rows, repeat=1):
+    """
+    Compare the per-row and vectorized grade transforms.
+
+    Args:
+        rows (int): Number of synthetic rows
+        repeat (int): Runs per implementation (best time is kept)
+
+    Returns:
+        dict: Timings in seconds and the speedup
+    """
+    raw = make_raw_grades(rows)
+    legacy = _time(_legacy_transform, raw, repeat)
+    vectorized = _time(_vectorized_transform, raw, repeat)
+    result = {
+        "rows": rows,
+        "legacy_s": round(legacy, 4),
+        "vectorized_s": round(vectorized, 4),
+        "speedup": round(legacy / vectorized, 1),
+    }
+    logger.info(f"Transforms @ {rows:,} rows: {result}")
+    return result
+
+
+def make_processed(rows):
+    """
+    Build a processed frame of the requested size by repeating the real data.
+
+    Args:
+        rows (int): Number of rows
+
+    Returns:
+        pd.DataFrame: Transformed rows in the processed schema
+    """
+    base = transforms.transform(pd.read_csv(PROCESSED_FILE))
+    reps = -(-rows // len(base))
+    return pd.concat([base] * reps, ignore_index=True).iloc[:rows]
+
+
+def bench_load(rows):
+    """
+    Compare loading the ML features from the processed CSV and the columnar store.
+
+    Args:
+        rows (int): Number of rows to write and read back
+
+    Returns:
+        dict: Load times in seconds and in-memory sizes in MB
+    """
+    df = make_processed(rows)
+    columns = feature_store.source_columns() + [ML_CONFIG["target"]]
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "processed.csv")
+        store_path = os.path.join(tmp, "processed.parquet")
+        df.to_csv(csv_path, index=False)
+        columnar_store.write_store(df, store_path)
+        del df
+
+        start = time.perf_counter()
+        from_csv = pd.read_csv(csv_path)
+        csv_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        from_store = columnar_store.read_store(columns, store_path)
+        store_s = time.perf_counter() - start
+
+    result = {
+        "rows": rows,
+        "csv_s": round(csv_s, 4),
+        "store_s": round(store_s, 4),
+        "csv_mb": round(float(from_csv.memory_usage(deep=True).sum()) / 2**20, 1),
+        "store_mb": round(float(from_store.memory_usage(deep=True).sum()) / 2**20, 1),
+    }
+    logger.info(f"Load @ {rows:,} rows: {result}")
+    return result
+
+
+def bench_bulk_load(rows):
+    """
+    Compare rows/sec of the bulk loaders.
+
+    Always runs against a temporary SQLite database; when get_engine()
+    reaches MySQL the MySQL loaders are timed too, against a scratch table.
+
+    Args:
+        rows (int): Number of rows to load
+
+    Returns:
+        dict: Rows/sec per "dialect:method"
+    """
+    df = make_processed(rows)
+    result = {"rows": rows}
+    with tempfile.TemporaryDirectory() as tmp:
+        scratch = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        engines = [scratch]
+        mysql = get_engine()
+        if mysql.dialect.name == "mysql":
+            engines.append(mysql)
+        for eng in engines:
+            for method in ["to_sql", eng.dialect.name]:
+                start = time.perf_counter()
+                used = bulk_load.bulk_load(eng, df, "students_bench", "replace", method=method)
+                elapsed = time.perf_counter() - start
+                result[f"{eng.dialect.name}:{used}_rows_per_s"] = round(rows / elapsed)
+            with eng.begin() as conn:
+                conn.execute(text("DROP TABLE IF EXISTS students_bench"))
+        scratch.dispose()
+    logger.info(f"Bulk load rows/sec @ {rows:,} rows: {result}")
+    return result
+
+
+def bench_dashboard(rows):
+    """
+    Time the dashboard's queries (uncached) against a SQLite students table.
+
+    Args:
+        rows (int): Number of rows in the table
+
+    Returns:
+        dict: Seconds per query
+    """
+    df = make_processed(rows)
+    result = {"rows": rows}
+    with tempfile.TemporaryDirectory() as tmp, _uncached(tmp):
+        eng = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        bulk_load.bulk_load(eng, df, "students", "replace")
+        summary_tables.rebuild(eng, summary_tables.aggregate(df))
+        result.update(_time_dashboard_queries(eng))
+        eng.dispose()
+    logger.info(f"Dashboard queries @ {rows:,} rows: {result}")
+    return result
+
+
+def _uncached(tmp):
+    """
+    Turn off query_cache and move its directory under tmp.
+
+    Repeated timings would otherwise be answered from the cache (only a load
+    bumps the table versions), and results would land in the real cache.
+    """
+    return mock.patch.dict(QUERY_CACHE_CONFIG, {"enabled": False, "dir": os.path.join(tmp, "query_cache")})
+
+
+def _time_dashboard_queries(eng, prefix=""):
+    """Run each dashboard query once, uncached, and return its seconds."""
+    queries = {
+        "kpis": lambda: dashboard_data.load_kpis(eng),
+        "pass_rate_by_sex": lambda: dashboard_data.load_pass_rate_by(eng, "sex"),
+        "avg_grade_by_age": lambda: dashboard_data.load_avg_grade_by(eng, "age"),
+        "studytime_vs_g3": lambda: dashboard_data.load_point_counts(eng, "studytime", "G3"),
+        "page": lambda: dashboard_data.load_page(eng, 10, 100),
+    }
+    timings = {}
+    for name, query in queries.items():
+        start = time.perf_counter()
+        query()
+        timings[f"{prefix}{name}_s"] = round(time.perf_counter() - start, 4)
+    return timings
+
+
+def _percentile_ms(latencies, q):
+    return round(float(np.percentile(latencies, q)) * 1000, 3)
+
+
+def bench_prediction(rows, clients=32, requests_per_client=200):
+    """
+    Measure batch scoring throughput and online micro-batch latency.
+
+    The batch path scores a SQLite students table in chunks, writing the
+    predictions back. The online path has `clients` threads each send
+    single-record requests through one MicroBatcher, as the HTTP server does.
+
+    Args:
+        rows (int): Rows in the batch-scored table
+        clients (int): Concurrent online callers
+        requests_per_client (int): Requests sent by each caller
+
+    Returns:
+        dict: Batch rows/sec and p99 chunk time, online requests/sec and latency percentiles
+    """
+    df = make_processed(rows)
+    model = predict_service.get_model()
+    result = {"rows": rows}
+    with tempfile.TemporaryDirectory() as tmp:
+        eng = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        bulk_load.bulk_load(eng, df, "students", "replace")
+        start = time.perf_counter()
+        predict_service.score_table(eng, model=model)
+        result["batch_rows_per_s"] = round(rows / (time.perf_counter() - start))
+        eng.dispose()
+
+    chunk = df[predict_service.model_features(model)].iloc[:predict_service.PREDICT_CONFIG["chunksize"]]
+    chunk_times = []
+    for _ in range(10):
+        start = time.perf_counter()
+        predict_service.predict_proba(chunk, model)
+        chunk_times.append(time.perf_counter() - start)
+    result["batch_chunk_p99_ms"] = _percentile_ms(chunk_times, 99)
+
+    records = df[predict_service.model_features(model)].iloc[:requests_per_client].to_dict("records")
+    latencies = [[] for _ in range(clients)]
+    batcher = predict_service.MicroBatcher(model)
+
+    def client(out):
+        for record in records:
+            sent = time.perf_counter()
+            batcher.submit(record).result()
+            out.append(time.perf_counter() - sent)
+
+    threads = [threading.Thread(target=client, args=(out,)) for out in latencies]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    batcher.close()
+
+    flat = [x for out in latencies for x in out]
+    result.update({
+        "online_requests_per_s": round(len(flat) / elapsed),
+        "online_p50_ms": _percentile_ms(flat, 50),
+        "online_p99_ms": _percentile_ms(flat, 99),
+        "online_mean_batch": round(len(flat) / batcher.batches, 1),
+    })
+    logger.info(f"Prediction @ {rows:,} rows, {clients} clients: {result}")
+    return result
+
+
+# Run in a fresh interpreter: import, load and score one row, then report
+# timings and the process's private (unshared) memory
+_COLD_START_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+fmt, path, row = sys.argv[1], sys.argv[2], json.loads(sys.argv[3])
+if fmt == "pickle":
+    import joblib
+    model = joblib.load(path)
+else:
+    import forest_arrays
+    model = forest_arrays.load_forest(path)
+loaded = time.perf_counter()
+import numpy as np
+model.predict_proba(np.array([row], dtype=float))
+scored = time.perf_counter()
+private_kb = 0
+with open("/proc/self/smaps_rollup") as f:
+    for line in f:
+        if line.startswith(("Private_Clean", "Private_Dirty")):
+            private_kb += int(line.split()[1])
+print(json.dumps({"load_s": loaded - start, "first_predict_s": scored - loaded, "private_mb": private_kb / 1024}))
+"""
+
+
+def _cold_start(fmt, path, row):
+    """Measure one cold start of a scoring process in a subprocess."""
+    out = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", _COLD_START_SCRIPT, fmt, path, json.dumps(row)],
+        capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def bench_model_load(rows, starts=3):
+    """
+    Compare the joblib pickle with the memory-mapped forest export.
+
+    Cold starts (import, load, first prediction) and private memory are
+    measured in fresh processes; scoring latency and throughput in this one.
+
+    Args:
+        rows (int): Rows for the throughput measurement
+        starts (int): Cold starts per format (the best is kept)
+
+    Returns:
+        dict: Per-format cold-start seconds, private MB, 1/32-row latency and rows/sec
+    """
+    pickled = predict_service.get_model(MODEL_FILE)
+    if not forest_arrays.is_export(MODEL_ARRAYS_DIR):
+        forest_arrays.export_forest(pickled, MODEL_ARRAYS_DIR)
+    models = {"pickle": (MODEL_FILE, pickled), "arrays": (MODEL_ARRAYS_DIR, forest_arrays.load_forest(MODEL_ARRAYS_DIR))}
+
+    X = make_processed(rows)[predict_service.model_features(pickled)]
+    row = X.iloc[0].astype(float).tolist()
+    result = {"rows": rows}
+    for fmt, (path, model) in models.items():
+        cold = min((_cold_start(fmt, path, row) for _ in range(starts)), key=lambda r: r["load_s"])
+        result[f"{fmt}_load_s"] = round(cold["load_s"], 4)
+        result[f"{fmt}_first_predict_s"] = round(cold["first_predict_s"], 4)
+        result[f"{fmt}_private_mb"] = round(cold["private_mb"], 1)
+        for n in (1, 32):
+            timings = []
+            for _ in range(20):
+                start = time.perf_counter()
+                model.predict_proba(X.iloc[:n])
+                timings.append(time.perf_counter() - start)
+            result[f"{fmt}_{n}_row_ms"] = round(min(timings) * 1000, 3)
+        start = time.perf_counter()
+        model.predict_proba(X)
+        result[f"{fmt}_rows_per_s"] = round(rows / (time.perf_counter() - start))
+    logger.info(f"Model load @ {rows:,} rows: {result}")
+    return result
+
+
+def bench_feature_store(rows):
+    """
+    Time building feature matrices against reading them back from the cache.
+
+    Args:
+        rows (int): Rows in the temporary columnar store
+
+    Returns:
+        dict: Miss and hit seconds per feature set
+    """
+    result = {"rows": rows}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "processed.parquet")
+        columnar_store.write_store(make_processed(rows), path)
+        cache = dict(feature_store.FEATURE_STORE_CONFIG)
+        feature_store.FEATURE_STORE_CONFIG["dir"] = os.path.join(tmp, "cache")
+        try:
+            for name in feature_store.FEATURE_SETS:
+                for label in ("miss", "hit"):
+                    start = time.perf_counter()
+                    feature_store.get_features(path, name)
+                    result[f"{name}_{label}_s"] = round(time.perf_counter() - start, 4)
+        finally:
+            feature_store.FEATURE_STORE_CONFIG.update(cache)
+    logger.info(f"Feature store @ {rows:,} rows: {result}")
+    return result
+
+
+@contextlib.contextmanager
+def _scratch_pipeline(tmp):
+    """
+    Point the ETL and summary exports at a scratch directory and SQLite database.
+
+    Query results are not cached, so repeated runs hit the database.
+
+    Yields:
+        sqlalchemy.engine.Engine: The scratch database's engine
+    """
+    eng = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+    powerbi = os.path.join(tmp, "powerbi")
+    os.makedirs(powerbi)
+    patches = [
+        (etl_students, "CSV_FILE", os.path.join(tmp, "student-mat.csv")),
+        (etl_students, "PROCESSED", os.path.join(tmp, "students_processed.csv")),
+        (etl_students, "PROCESSED_STORE_FILE", os.path.join(tmp, "students_processed.parquet")),
+        (etl_students, "get_engine", lambda *args, **kwargs: eng),
+        (analysis_students, "get_engine", lambda *args, **kwargs: eng),
+        (analysis_students, "POWERBI_DIR", powerbi),
+    ]
+    try:
+        with contextlib.ExitStack() as stack:
+            stack.enter_context(_uncached(tmp))
+            for module, name, value in patches:
+                stack.enter_context(mock.patch.object(module, name, value))
+            yield eng
+    finally:
+        eng.dispose()
+
+
+def _best_of(func, repeat):
+    """Return (best seconds, last result) of calling func repeat times."""
+    best, result = float("inf"), None
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def bench_suite(rows, repeat=1, seed=42):
+    """
+    Time the pipeline end to end on synthetic students.
+
+    A UCI-format CSV is generated with synthetic_students, then the real
+    entry points run against it in a scratch directory: clean_data,
+    load_mysql (into SQLite), export_summaries, train_model (on at most
+    BENCHMARK_CONFIG["train_rows"] rows) and the dashboard queries.
+
+    Args:
+        rows (int): Synthetic rows
+        repeat (int): Runs per step (best time is kept)
+        seed (int): Generator seed
+
+    Returns:
+        dict: Seconds per step
+    """
+    result = {"rows": rows, "seed": seed}
+    with tempfile.TemporaryDirectory() as tmp, _scratch_pipeline(tmp) as eng:
+        result["generate_s"], _ = _best_of(
+            lambda: synthetic_students.write_csv(etl_students.CSV_FILE, rows, seed=seed), 1
+        )
+        result["clean_data_s"], df = _best_of(etl_students.clean_data, repeat)
+        result["load_mysql_s"], _ = _best_of(lambda: etl_students.load_mysql(df), repeat)
+        result["export_summaries_s"], _ = _best_of(analysis_students.export_summaries, repeat)
+
+        sample = df.iloc[:BENCHMARK_CONFIG["train_rows"]]
+        X = feature_store.compute_features(sample)
+        y = transforms.encode_target(sample[ML_CONFIG["target"]])
+        del df
+        result["train_rows"] = len(sample)
+        result["train_model_s"], _ = _best_of(lambda: ml_predict_passfail.train_model(X, y), repeat)
+
+        runs = [_time_dashboard_queries(eng, prefix="dashboard_") for _ in range(repeat)]
+        result.update({name: min(run[name] for run in runs) for name in runs[0]})
+
+    result = {k: round(v, 4) if isinstance(v, float) else v for k, v in result.items()}
+    logger.info(f"Suite @ {rows:,} rows: {result}")
+    return result
+
+
+def _direction(metric):
+    """Return +1 if a larger value is worse, -1 if smaller is worse, 0 if not compared."""
+    if metric.endswith("_per_s"):
+        return -1
+    if metric.endswith(("_s", "_ms")):
+        return 1
+    return 0
+
+
+def baseline_path(name):
+    """Return the file a named baseline is stored in."""
+    return os.path.join(BENCHMARK_CONFIG["baseline_dir"], f"{name}.json")
+
+
+def save_baseline(name, results):
+    """
+    Store benchmark results as a named JSON baseline.
+
+    Args:
+        name (str): Baseline name, e.g. "main" or a machine name
+        results (dict): Benchmark name to its result dict
+
+    Returns:
+        str: The baseline file
+    """
+    path = baseline_path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    baseline = {
+        "name": name,
+        "created": datetime.now(timezone.utc).isoformat(),
+        "machine": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2)
+    logger.info(f"✅ Baseline saved → {path}")
+    return path
+
+
+def compare(results, baseline, threshold=None):
+    """
+    Compare benchmark results with a baseline.
+
+    Timings (metrics ending in _s or _ms) regress when they grow by more
+    than the threshold and by at least BENCHMARK_CONFIG["min_seconds"];
+    throughputs (_per_s) regress when they shrink by more than the
+    threshold. Benchmarks run at a different row count are not compared.
+
+    Args:
+        results (dict): Benchmark name to its result dict
+        baseline (dict): Baseline as written by save_baseline
+        threshold (float): Allowed fractional slowdown (defaults to BENCHMARK_CONFIG["threshold"])
+
+    Returns:
+        pd.DataFrame: One row per compared metric with baseline, current,
+        slowdown (fraction; negative is faster) and regression flag
+    """
+    threshold = BENCHMARK_CONFIG["threshold"] if threshold is None else threshold
+    rows = []
+    for bench, current in results.items():
+        previous = baseline["results"].get(bench)
+        if previous is None:
+            continue
+        if previous.get("rows") != current.get("rows"):
+            logger.warning(f"⚠️ {bench}: baseline ran {previous.get('rows')} rows, not {current.get('rows')}; skipped")
+            continue
+        for metric, value in current.items():
+            direction = _direction(metric)
+            old = previous.get(metric)
+            if not direction or not isinstance(old, (int, float)) or not old or not value:
+                continue
+            slowdown = value / old - 1 if direction > 0 else old / value - 1
+            regression = slowdown > threshold
+            if direction > 0:
+                seconds = (value - old) / (1000 if metric.endswith("_ms") else 1)
+                regression = regression and seconds >= BENCHMARK_CONFIG["min_seconds"]
+            rows.append({
+                "benchmark": bench, "metric": metric, "baseline": old, "current": value,
+                "slowdown": round(slowdown, 3), "regression": regression,
+            })
+    return pd.DataFrame(rows, columns=["benchmark", "metric", "baseline", "current", "slowdown", "regression"])
+
+
+BENCHMARKS = {
+    "transforms": lambda args: bench_transforms(args.rows, args.repeat),
+    "load": lambda args: bench_load(args.rows),
+    "bulk_load": lambda args: bench_bulk_load(args.rows),
+    "dashboard": lambda args: bench_dashboard(args.rows),
+    "prediction": lambda args: bench_prediction(args.rows),
+    "model_load": lambda args: bench_model_load(args.rows),
+    "feature_store": lambda args: bench_feature_store(args.rows),
+    "suite": lambda args: bench_suite(args.rows, args.repeat, args.seed),
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Student pipeline benchmarks")
+    parser.add_argument("--rows", type=int, default=10_000_000, help="synthetic rows to generate")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per implementation")
+    parser.add_argument("--seed", type=int, default=42, help="synthetic data seed (suite)")
+    parser.add_argument("--save-baseline", metavar="NAME", help="store the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="NAME", help="compare the results with a stored baseline")
+    parser.add_argument("--threshold", type=float, default=None,
+                        help=f"allowed slowdown before --compare fails (default {BENCHMARK_CONFIG['threshold']})")
+    parser.add_argument("benchmarks", nargs="*",
+                        help=f"benchmarks to run, from {', '.join(BENCHMARKS)} (all by default)")
+    args = parser.parse_args()
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+    if args.compare and not os.path.exists(baseline_path(args.compare)):
+        parser.error(f"no baseline at {baseline_path(args.compare)}")
+    results = {name: BENCHMARKS[name](args) for name in args.benchmarks or BENCHMARKS}
+    if args.save_baseline:
+        save_baseline(args.save_baseline, results)
+    if args.compare:
+        with open(baseline_path(args.compare)) as f:
+            report = compare(results, json.load(f), args.threshold)
+        print(report.to_string(index=False))
+        if report["regression"].any():
+            logger.error(f"❌ {int(report['regression'].sum())} metrics regressed against {args.compare}")
+            raise SystemExit(1)
+        logger.info(f"✅ No regressions against {args.compare}")
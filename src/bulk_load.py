@@ -0,0 +1,210 @@
+"""
+Bulk Load Module
+
+This module writes dataframes to the database through the fastest path the
+backend offers: LOAD DATA LOCAL INFILE on MySQL, a single-transaction
+prepared executemany on SQLite and a columnar INSERT ... SELECT from an
+Arrow table on DuckDB. If the native path fails, the load falls back to
+DataFrame.to_sql.
+"""
+
+import os
+import logging
+import tempfile
+from config import ETL_CONFIG
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Rows handed to the driver per executemany call on SQLite
+SQLITE_BATCH_ROWS = 50000
+
+
+def _create_table(eng, df, table, if_exists):
+    """Create (or keep, when appending) an empty table with the frame's columns."""
+    df.head(0).to_sql(table, eng, if_exists=if_exists, index=False)
+
+
+def _column_values(series):
+    """Return a column as a list of native Python values with None for missing."""
+    values = series.astype(object)
+    return values.where(series.notna(), None).tolist()
+
+
+def load_to_sql(eng, df, table, if_exists):
+    """
+    Load through DataFrame.to_sql (multi-row INSERTs on MySQL).
+
+    Args:
+        eng: SQLAlchemy engine
+        df (pd.DataFrame): Rows to load
+        table (str): Target table
+        if_exists (str): "replace" or "append"
+    """
+    is_sqlite = eng.dialect.name == "sqlite"
+    df.to_sql(
+        table,
+        eng,
+        if_exists=if_exists,
+        index=False,
+        chunksize=2000,
+        method=None if is_sqlite else "multi"  # SQLite doesn't support 'multi'
+    )
+
+
+def load_sqlite_executemany(eng, df, table, if_exists):
+    """
+    Load into SQLite with one prepared executemany per batch in a single transaction.
+
+    Durability pragmas are relaxed for the duration of the load and restored
+    afterwards.
+
+    Args:
+        eng: SQLAlchemy engine
+        df (pd.DataFrame): Rows to load
+        table (str): Target table
+        if_exists (str): "replace" or "append"
+    """
+    _create_table(eng, df, table, if_exists)
+    columns = ", ".join(f'"{c}"' for c in df.columns)
+    placeholders = ", ".join("?" for _ in df.columns)
+    sql = f'INSERT INTO "{table}" ({columns}) VALUES ({placeholders})'
+
+    raw = eng.raw_connection()
+    try:
+        cur = raw.cursor()
+        journal_mode = cur.execute("PRAGMA journal_mode").fetchone()[0]
+        synchronous = cur.execute("PRAGMA synchronous").fetchone()[0]
+        cur.execute("PRAGMA journal_mode=MEMORY")
+        cur.execute("PRAGMA synchronous=OFF")
+        try:
+            for start in range(0, len(df), SQLITE_BATCH_ROWS):
+                batch = df.iloc[start:start + SQLITE_BATCH_ROWS]
+                cur.executemany(sql, zip(*[_column_values(batch[c]) for c in batch.columns]))
+            raw.commit()
+        except Exception:
+            raw.rollback()
+            raise
+        finally:
+            cur.execute(f"PRAGMA journal_mode={journal_mode}")
+            cur.execute(f"PRAGMA synchronous={synchronous}")
+    finally:
+        raw.close()
+
+
+def load_mysql_infile(eng, df, table, if_exists):
+    """
+    Load into MySQL with LOAD DATA LOCAL INFILE from a temporary CSV.
+
+    Requires DB_LOCAL_INFILE=1 and local_infile enabled on the server.
+
+    Args:
+        eng: SQLAlchemy engine
+        df (pd.DataFrame): Rows to load
+        table (str): Target table
+        if_exists (str): "replace" or "append"
+    """
+    _create_table(eng, df, table, if_exists)
+    fd, path = tempfile.mkstemp(suffix=".csv")
+    os.close(fd)
+    try:
+        # Quotes are escaped by doubling and missing values written as an
+        # unquoted NULL, so no backslash escaping is needed
+        df.to_csv(path, index=False, header=False, na_rep="NULL", lineterminator="\n")
+        columns = ", ".join(f"`{c}`" for c in df.columns)
+        sql = (
+            f"LOAD DATA LOCAL INFILE '{path.replace(os.sep, '/')}' INTO TABLE `{table}` "
+            "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '' "
+            f"LINES TERMINATED BY '\\n' ({columns})"
+        )
+        raw = eng.raw_connection()
+        try:
+            cur = raw.cursor()
+            cur.execute(sql)
+            raw.commit()
+        finally:
+            raw.close()
+    finally:
+        os.remove(path)
+
+
+def load_duckdb_arrow(eng, df, table, if_exists):
+    """
+    Load into DuckDB straight from the frame's Arrow buffers.
+
+    The table is created from the Arrow schema (CREATE TABLE ... AS) or
+    appended to with INSERT ... SELECT, so no rows pass through Python.
+
+    Args:
+        eng: SQLAlchemy engine
+        df (pd.DataFrame): Rows to load
+        table (str): Target table
+        if_exists (str): "replace" or "append"
+    """
+    import pyarrow as pa
+    from sqlalchemy import inspect
+
+    frame = pa.Table.from_pandas(df, preserve_index=False)
+    # Categoricals arrive as dictionaries, which DuckDB would read as ENUMs
+    frame = pa.Table.from_arrays(
+        [c.cast(c.type.value_type) if pa.types.is_dictionary(c.type) else c for c in frame.columns],
+        names=frame.column_names,
+    )
+    columns = ", ".join(f'"{c}"' for c in df.columns)
+    if if_exists == "append" and inspect(eng).has_table(table):
+        sql = f'INSERT INTO "{table}" ({columns}) SELECT {columns} FROM _bulk_load_frame'
+    else:
+        sql = f'CREATE OR REPLACE TABLE "{table}" AS SELECT {columns} FROM _bulk_load_frame'
+
+    raw = eng.raw_connection()
+    try:
+        con = raw.driver_connection
+        con.register("_bulk_load_frame", frame)
+        try:
+            con.execute(sql)
+        finally:
+            con.unregister("_bulk_load_frame")
+        raw.commit()
+    finally:
+        raw.close()
+
+
+# Native loaders keyed by SQLAlchemy dialect name
+LOADERS = {
+    "sqlite": load_sqlite_executemany,
+    "mysql": load_mysql_infile,
+    "duckdb": load_duckdb_arrow,
+}
+
+
+def bulk_load(eng, df, table="students", if_exists="replace", method=None):
+    """
+    Load a dataframe through the native bulk path, falling back to to_sql.
+
+    Indexes are left to the caller so they can be built once after the load.
+
+    Args:
+        eng: SQLAlchemy engine
+        df (pd.DataFrame): Rows to load
+        table (str): Target table
+        if_exists (str): "replace" or "append"
+        method (str): "auto", "to_sql" or a LOADERS key (defaults to
+            ETL_CONFIG["bulk_load"])
+
+    Returns:
+        str: The loader that wrote the rows
+    """
+    method = method or ETL_CONFIG["bulk_load"]
+    if method == "auto":
+        method = eng.dialect.name if eng.dialect.name in LOADERS else "to_sql"
+
+    if method != "to_sql":
+        try:
+            LOADERS[method](eng, df, table, if_exists)
+            return method
+        except Exception as e:
+            logger.warning(f"⚠️ Bulk load via {method} failed, falling back to to_sql: {e}")
+
+    load_to_sql(eng, df, table, if_exists)
+    return "to_sql"
@@ -0,0 +1,208 @@
+"""
+Chart Data Module
+
+This module reduces chart data to a fixed size before it reaches Streamlit.
+The browser then receives the same number of points whether the students
+table holds a thousand rows or a hundred million.
+
+- bin2d_plan() counts students per cell of an x/y grid with GROUP BY on
+  computed bin numbers, so only the non-empty cells leave the database.
+  Integer columns with no more distinct values than bins keep one bin per
+  value, so small discrete charts stay exact.
+- hexbin() regroups such a grid into hexagonal cells with NumPy.
+- lttb() downsamples a line series with Largest-Triangle-Three-Buckets,
+  which keeps its visual peaks and troughs.
+
+Plans use the (sql, params, finish) format of dashboard_data, so they can be
+run together with dashboard_data.load_panels().
+"""
+
+import math
+import logging
+import numpy as np
+import pandas as pd
+from config import DASHBOARD_CONFIG
+import query_cache
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def column_range(eng, column, table="students"):
+    """
+    Read a column's minimum and maximum.
+
+    Returns:
+        tuple: (low, high, is_integer), or (None, None, False) if every value is NULL
+    """
+    df = query_cache.read_sql(eng, f"SELECT MIN({column}) AS lo, MAX({column}) AS hi FROM {table}")
+    lo, hi = df["lo"].iloc[0], df["hi"].iloc[0]
+    if pd.isna(lo) or pd.isna(hi):
+        return None, None, False
+    is_integer = pd.api.types.is_integer_dtype(df["lo"]) and pd.api.types.is_integer_dtype(df["hi"])
+    return float(lo), float(hi), is_integer
+
+
+def _axis(eng, column, bins, table):
+    """Return (origin, width, count, exact) of a column's bins."""
+    lo, hi, is_integer = column_range(eng, column, table)
+    if lo is None:
+        return 0.0, 1.0, 1, True
+    if is_integer and hi - lo + 1 <= bins:
+        # One bin per value
+        return lo, 1.0, int(hi - lo) + 1, True
+    return lo, (hi - lo) / bins or 1.0, bins, False
+
+
+def _center(index, origin, width, count, exact):
+    """Map bin numbers back to axis values: the value itself or the bin's midpoint."""
+    return origin + index * width if exact else origin + (index + 0.5) * width
+
+
+def _bin_sql(eng, column, origin, width, count, exact):
+    """SQL expression giving a value's 0-based bin number."""
+    offset = f"({column} - {origin!r}) / {width!r}"
+    # x - origin is never negative, so SQLite's truncating CAST is a floor
+    # (FLOOR may be missing from its build); MySQL and DuckDB casts round instead
+    index = f"CAST({offset} AS INTEGER)" if eng.dialect.name == "sqlite" else f"FLOOR({offset})"
+    return f"CASE WHEN {index} > {count - 1} THEN {count - 1} ELSE {index} END"
+
+
+def bin2d_plan(eng, x, y, bins=None, table="students"):
+    """
+    Plan a 2D histogram of two columns.
+
+    Runs the (cached) range queries needed to lay out the grid.
+
+    Args:
+        eng: SQLAlchemy engine
+        x (str): Column for the x axis
+        y (str): Column for the y axis
+        bins (int): Most bins per axis (defaults to DASHBOARD_CONFIG["chart_bins"])
+        table (str): Source table
+
+    Returns:
+        tuple: (sql, params, finish) giving a frame of x and y (bin centers,
+        or the values themselves for exact bins) and n, at most bins^2 rows
+    """
+    bins = bins or DASHBOARD_CONFIG["chart_bins"]
+    x_axis, y_axis = _axis(eng, x, bins, table), _axis(eng, y, bins, table)
+    sql = (
+        f"SELECT {_bin_sql(eng, x, *x_axis)} AS bin_x, {_bin_sql(eng, y, *y_axis)} AS bin_y, COUNT(*) AS n "
+        f"FROM {table} WHERE {x} IS NOT NULL AND {y} IS NOT NULL GROUP BY bin_x, bin_y ORDER BY bin_x, bin_y"
+    )
+
+    def finish(df):
+        return pd.DataFrame({
+            x: _center(df["bin_x"].to_numpy(dtype=float), *x_axis),
+            y: _center(df["bin_y"].to_numpy(dtype=float), *y_axis),
+            "n": df["n"].to_numpy(dtype=np.int64),
+        })
+
+    return sql, None, finish
+
+
+def hexbin(df, x, y, gridsize=None, weight="n"):
+    """
+    Regroup weighted points (e.g. a bin2d_plan() result) into hexagons.
+
+    Uses the two offset rectangular lattices of matplotlib's hexbin: each
+    point goes to the nearer of its two candidate hexagon centers.
+
+    Args:
+        df (pd.DataFrame): Points with x, y and weight columns
+        x (str): x column
+        y (str): y column
+        gridsize (int): Hexagons across the x range (defaults to DASHBOARD_CONFIG["hex_gridsize"])
+        weight (str): Column holding each point's count
+
+    Returns:
+        pd.DataFrame: x and y (hexagon centers) and n, for non-empty hexagons
+    """
+    gridsize = gridsize or DASHBOARD_CONFIG["hex_gridsize"]
+    if df.empty:
+        return pd.DataFrame({x: [], y: [], "n": []})
+    px, py = df[x].to_numpy(dtype=float), df[y].to_numpy(dtype=float)
+    weights = df[weight].to_numpy(dtype=float)
+    x_lo, x_hi, y_lo, y_hi = px.min(), px.max(), py.min(), py.max()
+    sx = (x_hi - x_lo) / gridsize or 1.0
+    # Hexagon rows are sqrt(3) times closer than columns for regular hexagons
+    ny = max(1, int(round(gridsize / math.sqrt(3))))
+    sy = (y_hi - y_lo) / ny or 1.0
+    u, v = (px - x_lo) / sx, (py - y_lo) / sy
+
+    i1, j1 = np.rint(u), np.rint(v)
+    i2, j2 = np.floor(u) + 0.5, np.floor(v) + 0.5
+    d1 = (u - i1) ** 2 + 3.0 * (v - j1) ** 2
+    d2 = (u - i2) ** 2 + 3.0 * (v - j2) ** 2
+    near_first = d1 <= d2
+    ci, cj = np.where(near_first, i1, i2), np.where(near_first, j1, j2)
+
+    cells = pd.DataFrame({"ci": ci, "cj": cj, "n": weights}).groupby(["ci", "cj"], sort=True)["n"].sum().reset_index()
+    return pd.DataFrame({
+        x: x_lo + cells["ci"].to_numpy() * sx,
+        y: y_lo + cells["cj"].to_numpy() * sy,
+        "n": cells["n"].to_numpy().astype(np.int64),
+    })
+
+
+def lttb(x, y, threshold):
+    """
+    Downsample a line with Largest-Triangle-Three-Buckets.
+
+    The first and last points are kept. The points between are split into
+    threshold - 2 buckets, and from each bucket the point forming the largest
+    triangle with the previously kept point and the next bucket's mean is
+    kept.
+
+    Args:
+        x (array-like): Sorted x values
+        y (array-like): y values
+        threshold (int): Points to keep
+
+    Returns:
+        np.ndarray: Indexes of the kept points, in order
+    """
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for b in range(threshold - 2):
+        start, stop = edges[b], edges[b + 1]
+        nxt_start, nxt_stop = stop, edges[b + 2] if b + 2 < len(edges) else n
+        avg_x, avg_y = x[nxt_start:nxt_stop].mean(), y[nxt_start:nxt_stop].mean()
+        ax, ay = x[previous], y[previous]
+        area = np.abs((ax - avg_x) * (y[start:stop] - ay) - (ax - x[start:stop]) * (avg_y - ay))
+        previous = start + int(np.argmax(area))
+        kept[b + 1] = previous
+    return kept
+
+
+def downsampled(plan, x, y, max_points=None):
+    """
+    Wrap a line chart plan so its result is reduced with lttb().
+
+    Args:
+        plan (tuple): (sql, params, finish) giving a frame sorted by x
+        x (str): x column
+        y (str): y column
+        max_points (int): Most points returned (defaults to DASHBOARD_CONFIG["max_line_points"])
+
+    Returns:
+        tuple: A plan whose result has at most max_points rows
+    """
+    sql, params, finish = plan
+    max_points = max_points or DASHBOARD_CONFIG["max_line_points"]
+
+    def reduce(df):
+        df = finish(df) if finish else df
+        if len(df) <= max_points:
+            return df
+        return df.iloc[lttb(df[x], df[y], max_points)].reset_index(drop=True)
+
+    return sql, params, reduce
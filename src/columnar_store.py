@@ -0,0 +1,157 @@
+"""
+Columnar Store Module
+
+This module writes the processed student data as a typed Parquet file next to
+students_processed.csv and reads it back with column projection, so
+downstream steps load only the columns they use without re-parsing text.
+"""
+
+import os
+import logging
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import transforms
+from config import PROCESSED_STORE_FILE
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def _arrow_schema(df):
+    """
+    Build the Arrow schema for a compact frame.
+
+    Dictionary indices are widened to int32 so chunks with different numbers
+    of categories share one schema.
+    """
+    fields = []
+    for field in pa.Schema.from_pandas(df, preserve_index=False):
+        if pa.types.is_dictionary(field.type):
+            field = field.with_type(pa.dictionary(pa.int32(), field.type.value_type))
+        fields.append(field)
+    return pa.schema(fields)
+
+
+class StoreWriter:
+    """
+    Append frames to the columnar store, one Parquet row group per write.
+
+    Use as a context manager; the file is complete once the writer is closed.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or PROCESSED_STORE_FILE
+        self.rows = 0
+        self._writer = None
+
+    def write(self, df):
+        """
+        Append a transformed frame.
+
+        Args:
+            df (pd.DataFrame): Transformed rows (see transforms.transform)
+        """
+        compact = transforms.to_storage_dtypes(df)
+        if self._writer is None:
+            schema = _arrow_schema(compact)
+            self._writer = pq.ParquetWriter(self.path, schema, compression="snappy")
+        table = pa.Table.from_pandas(compact, schema=self._writer.schema, preserve_index=False)
+        self._writer.write_table(table)
+        self.rows += len(df)
+
+    def close(self):
+        """Finalize the file."""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def write_store(df, path=None):
+    """
+    Write a transformed frame to the columnar store.
+
+    Args:
+        df (pd.DataFrame): Transformed rows
+        path (str): Output file (defaults to PROCESSED_STORE_FILE)
+    """
+    with StoreWriter(path) as writer:
+        writer.write(df)
+    logger.info(f"✅ Columnar store saved → {writer.path}")
+
+
+def store_exists(path=None):
+    """Return True if the columnar store has been written."""
+    return os.path.exists(path or PROCESSED_STORE_FILE)
+
+
+def store_columns(path=None):
+    """
+    List the columns in the columnar store without reading any data.
+
+    Args:
+        path (str): Store file (defaults to PROCESSED_STORE_FILE)
+
+    Returns:
+        list: Column names
+    """
+    return pq.read_schema(path or PROCESSED_STORE_FILE).names
+
+
+def read_store(columns=None, path=None):
+    """
+    Read the columnar store, loading only the requested columns.
+
+    The file is memory-mapped, and integer and categorical columns come back
+    with their compact dtypes.
+
+    Args:
+        columns (list): Columns to load (all columns when None)
+        path (str): Store file (defaults to PROCESSED_STORE_FILE)
+
+    Returns:
+        pd.DataFrame: The projected columns
+    """
+    path = path or PROCESSED_STORE_FILE
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Columnar store not found: {path}")
+    df = pq.read_table(path, columns=columns, memory_map=True).to_pandas()
+    # Row groups written chunk by chunk can list categories in different
+    # orders; sort them so the result does not depend on how it was written
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            categories = df[col].cat.categories
+            if not categories.is_monotonic_increasing:
+                df[col] = df[col].cat.reorder_categories(categories.sort_values())
+    return df
+
+
+def iter_store(columns=None, batch_size=100000, path=None):
+    """
+    Stream the columnar store in batches of rows.
+
+    Args:
+        columns (list): Columns to load (all columns when None)
+        batch_size (int): Rows per batch
+        path (str): Store file (defaults to PROCESSED_STORE_FILE)
+
+    Yields:
+        pd.DataFrame: Consecutive batches of the projected columns
+    """
+    path = path or PROCESSED_STORE_FILE
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Columnar store not found: {path}")
+    for batch in pq.ParquetFile(path, memory_map=True).iter_batches(batch_size=batch_size, columns=columns):
+        yield batch.to_pandas()
+
+
+def store_rows(path=None):
+    """Return the store's row count from its metadata, without reading data."""
+    return pq.ParquetFile(path or PROCESSED_STORE_FILE).metadata.num_rows
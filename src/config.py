@@ -22,7 +22,9 @@ os.makedirs(POWERBI_DIR, exist_ok=True)
 # Data files
 CSV_FILE = os.path.join(DATA_DIR, "student-mat.csv")
 PROCESSED_FILE = os.path.join(DATA_DIR, "students_processed.csv")
+PROCESSED_STORE_FILE = os.path.join(DATA_DIR, "students_processed.parquet")
 MODEL_FILE = os.path.join(DATA_DIR, "passfail_model.pkl")
+MODEL_ARRAYS_DIR = os.path.join(DATA_DIR, "passfail_model_arrays")
 
 # Database configuration
 DB_CONFIG = {
@@ -34,20 +36,188 @@ DB_CONFIG = {
     "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
     "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
     "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "3600")),
+    # Allow LOAD DATA LOCAL INFILE bulk loads (the server must enable local_infile too)
+    "local_infile": os.getenv("DB_LOCAL_INFILE", "0") == "1",
+    # Seconds a successful health check is trusted before pinging again
+    "health_ttl": float(os.getenv("DB_HEALTH_TTL", "30")),
+    # Consecutive connection failures that open the MySQL circuit breaker, and
+    # seconds to fail over straight to SQLite before trying MySQL again
+    "breaker_threshold": int(os.getenv("DB_BREAKER_THRESHOLD", "1")),
+    "breaker_cooldown": float(os.getenv("DB_BREAKER_COOLDOWN", "60")),
+    # Run independent queries concurrently through SQLAlchemy's async engine
+    # (aiomysql / aiosqlite); off by default, threads are used when it is off
+    # or the drivers are missing
+    "async_enabled": os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "yes"),
+    # Most queries in flight at once on the concurrent path
+    "max_concurrency": int(os.getenv("DB_MAX_CONCURRENCY", "8")),
+    # Local database used when MySQL is unavailable: "sqlite" (row store) or
+    # "duckdb" (columnar, much faster GROUP BY scans; needs duckdb-engine)
+    "fallback": os.getenv("DB_FALLBACK", "sqlite").lower(),
+    # Seconds to wait for a DuckDB file locked by another process
+    "duckdb_lock_wait": float(os.getenv("DB_DUCKDB_LOCK_WAIT", "10")),
 }
 
 # SQLite fallback configuration
 SQLITE_DB_PATH = os.path.join(DATA_DIR, "student_analytics.db")
 
+# DuckDB fallback configuration (DB_FALLBACK=duckdb)
+DUCKDB_PATH = os.getenv("DUCKDB_PATH", os.path.join(DATA_DIR, "student_analytics.duckdb"))
+
+# ETL configuration
+ETL_CONFIG = {
+    # Rows per chunk when the ETL runs in streaming mode, and per
+    # checkpointed chunk of a full load
+    "chunksize": int(os.getenv("ETL_CHUNKSIZE", "50000")),
+    # Full loads fill this table and then swap it in for students, recording
+    # each committed chunk in the load state table so a failed run can resume
+    "staging_table": os.getenv("ETL_STAGING_TABLE", "students_staging"),
+    "load_state_table": os.getenv("ETL_LOAD_STATE_TABLE", "etl_load_state"),
+    # Columns identifying a student row across runs for incremental loads.
+    # Empty means rows are keyed by their content, so an edited row is
+    # loaded as a delete and an insert.
+    "key_columns": [c.strip() for c in os.getenv("ETL_KEY_COLUMNS", "").split(",") if c.strip()],
+    # Table holding the per-row fingerprints of the last incremental load
+    "state_table": os.getenv("ETL_STATE_TABLE", "etl_row_state"),
+    # Drop directory for per-school / per-term extracts and the files to pick up
+    "drop_dir": os.getenv("ETL_DROP_DIR", os.path.join(DATA_DIR, "incoming")),
+    "file_pattern": os.getenv("ETL_FILE_PATTERN", "*.csv"),
+    # Worker processes for multi-file ingestion (0 means one per CPU core)
+    "workers": int(os.getenv("ETL_WORKERS", "0")),
+    # Bulk loader for the students table: "auto" picks the native path for the
+    # database (LOAD DATA on MySQL, executemany on SQLite), "to_sql" disables it
+    "bulk_load": os.getenv("ETL_BULK_LOAD", "auto"),
+}
+
+# Feature sets computed by feature_store.py. Each set lists raw numeric
+# columns, yes/no flags (encoded 0/1) and categoricals one-hot encoded over a
+# fixed vocabulary. Bump "version" whenever a set's definition changes, so
+# cached matrices built from the old definition are not reused.
+_BASE_FEATURES = ['studytime', 'failures', 'absences', 'G1', 'G2']
+FEATURE_SETS = {
+    "base": {
+        "version": 1,
+        "numeric": _BASE_FEATURES,
+        "flags": [],
+        "categorical": {},
+    },
+    "extended": {
+        "version": 1,
+        "numeric": _BASE_FEATURES + ['age', 'Medu', 'Fedu', 'traveltime', 'goout', 'Dalc', 'Walc', 'health'],
+        "flags": ['schoolsup', 'famsup', 'paid', 'activities', 'higher', 'internet', 'romantic'],
+        "categorical": {
+            "Mjob": ['at_home', 'health', 'other', 'services', 'teacher'],
+            "Fjob": ['at_home', 'health', 'other', 'services', 'teacher'],
+        },
+    },
+}
+
+# Feature matrix cache
+FEATURE_STORE_CONFIG = {
+    "dir": os.getenv("FEATURE_STORE_DIR", os.path.join(DATA_DIR, "feature_cache")),
+    # Least recently used matrices are evicted beyond either limit
+    "max_entries": int(os.getenv("FEATURE_STORE_MAX_ENTRIES", "8")),
+    "max_mb": int(os.getenv("FEATURE_STORE_MAX_MB", "2048")),
+}
+
 # ML model configuration
 ML_CONFIG = {
-    "features": ['studytime', 'failures', 'absences', 'G1', 'G2'],
+    "feature_set": os.getenv("ML_FEATURE_SET", "base"),
     "target": "final_result",
     "test_size": 0.2,
     "random_state": 42,
+    # Hyperparameter search (ml_predict_passfail.py --search)
+    "search_grid": {
+        "n_estimators": [100, 200, 400],
+        "max_depth": [5, 10, None],
+        "min_samples_split": [2, 5],
+        "min_samples_leaf": [1, 2],
+    },
+    "cv_folds": int(os.getenv("ML_CV_FOLDS", "5")),
+    # Worker processes for the search (-1 uses every core)
+    "search_jobs": int(os.getenv("ML_SEARCH_JOBS", "-1")),
+    # Successive halving keeps 1/factor of the configurations each round
+    "halving_factor": int(os.getenv("ML_HALVING_FACTOR", "3")),
+    # Rows per shard for out-of-core training (ml_predict_passfail.py --incremental)
+    "batch_size": int(os.getenv("ML_BATCH_SIZE", "100000")),
+}
+
+# Prediction service configuration
+PREDICT_CONFIG = {
+    # Model to serve: the joblib pickle, or a forest_arrays export directory
+    # (MODEL_ARRAYS_DIR) for near-instant, memory-mapped loading
+    "model": os.getenv("PREDICT_MODEL", MODEL_FILE),
+    # Rows scored per chunk by the batch scorer
+    "chunksize": int(os.getenv("PREDICT_CHUNKSIZE", "50000")),
+    # Table the batch scorer writes predictions to
+    "table": os.getenv("PREDICT_TABLE", "student_predictions"),
+    # Online server: largest micro-batch and how long to wait to fill one
+    "max_batch": int(os.getenv("PREDICT_MAX_BATCH", "64")),
+    "max_wait_ms": float(os.getenv("PREDICT_MAX_WAIT_MS", "5")),
+    "host": os.getenv("PREDICT_HOST", "127.0.0.1"),
+    "port": int(os.getenv("PREDICT_PORT", "8765")),
+}
+
+# Pipeline orchestrator configuration
+PIPELINE_CONFIG = {
+    # Input hashes of each stage's last successful run
+    "state_file": os.getenv("PIPELINE_STATE_FILE", os.path.join(DATA_DIR, "pipeline_state.json")),
+    # One JSON line per run with per-stage status and timings
+    "runs_file": os.getenv("PIPELINE_RUNS_FILE", os.path.join(DATA_DIR, "pipeline_runs.jsonl")),
+    # Stages run concurrently once their dependencies finish
+    "workers": int(os.getenv("PIPELINE_WORKERS", "2")),
+}
+
+# Instrumentation configuration (spans, counters, DB query timings)
+METRICS_CONFIG = {
+    # Off by default; spans and query hooks cost almost nothing when disabled
+    "enabled": os.getenv("METRICS_ENABLED", "false").lower() in ("1", "true", "yes"),
+    # "json" or "prometheus" (text exposition format for a local scraper)
+    "format": os.getenv("METRICS_FORMAT", "json"),
+    # Written at process exit; defaults to data/metrics.json or data/metrics.prom
+    "path": os.getenv("METRICS_FILE", ""),
+    # Seconds between resident memory samples while a span is open
+    "sample_interval": float(os.getenv("METRICS_SAMPLE_INTERVAL", "0.05")),
+}
+
+# Benchmark suite configuration (benchmark_students.py suite)
+BENCHMARK_CONFIG = {
+    # JSON baselines saved with --save-baseline and read by --compare
+    "baseline_dir": os.getenv("BENCHMARK_BASELINE_DIR", os.path.join(ROOT_DIR, "benchmarks")),
+    # Fractional slowdown against the baseline that counts as a regression
+    "threshold": float(os.getenv("BENCHMARK_THRESHOLD", "0.2")),
+    # Timing changes smaller than this many seconds are treated as noise
+    "min_seconds": float(os.getenv("BENCHMARK_MIN_SECONDS", "0.05")),
+    # train_model is timed on at most this many rows
+    "train_rows": int(os.getenv("BENCHMARK_TRAIN_ROWS", "200000")),
+}
+
+# Streamlit dashboard configuration
+DASHBOARD_CONFIG = {
+    # Seconds a cached query result is reused across reruns
+    "cache_ttl": int(os.getenv("DASHBOARD_CACHE_TTL", "300")),
+    # Page sizes offered by the raw data view
+    "page_sizes": [50, 100, 500],
+    # Chart payload bounds (chart_data.py): bins per axis of 2D histograms,
+    # hexagons across density charts and points kept on line charts
+    "chart_bins": int(os.getenv("CHART_BINS", "50")),
+    "hex_gridsize": int(os.getenv("CHART_HEX_GRIDSIZE", "30")),
+    "max_line_points": int(os.getenv("CHART_MAX_LINE_POINTS", "500")),
 }
 
-# SQL queries
+# Query result cache (query_cache.py)
+QUERY_CACHE_CONFIG = {
+    "enabled": os.getenv("QUERY_CACHE_ENABLED", "true").lower() in ("1", "true", "yes"),
+    # Parquet copies of results, shared by every process on the machine
+    "dir": os.getenv("QUERY_CACHE_DIR", os.path.join(DATA_DIR, "query_cache")),
+    "max_memory_entries": int(os.getenv("QUERY_CACHE_MAX_MEMORY", "256")),
+    "max_disk_entries": int(os.getenv("QUERY_CACHE_MAX_DISK", "1024")),
+    # Seconds a process trusts the table versions it last read
+    "version_ttl": float(os.getenv("QUERY_CACHE_VERSION_TTL", "1.0")),
+    # Table holding one version per data table, bumped by every ETL load
+    "version_table": "data_versions",
+}
+
+# Named SQL queries, run through query_cache.run_query (bind parameters as :name)
 QUERIES = {
     "gender_analysis": """
     SELECT sex, final_result, COUNT(*) AS count
@@ -62,4 +232,64 @@ QUERIES = {
     GROUP BY age
     ORDER BY age;
     """,
-}
\ No newline at end of file
+}
+
+# Summary reports exported for Power BI. Each report groups the students
+# table by `group_by` and computes `measures` as (aggregate, column) pairs,
+# where aggregate is "count", "sum" or "avg". The summary engine answers
+# reports sharing a scan from one GROUP BY over the union of their columns.
+SUMMARIES = {
+    "gender_analysis": {
+        "file": "passrate_by_gender.csv",
+        "group_by": ["sex", "final_result"],
+        "measures": {"count": ("count", None)},
+    },
+    "age_analysis": {
+        "file": "avg_grade_by_age.csv",
+        "group_by": ["age"],
+        "measures": {"avg_final": ("avg", "G3")},
+        "round": 2,
+    },
+}
+
+SUMMARY_CONFIG = {
+    # Most group-by columns one scan may combine before reports are split
+    # into another scan (caps the size of the intermediate result)
+    "max_group_columns": int(os.getenv("SUMMARY_MAX_GROUP_COLUMNS", "4")),
+    # Scans and exports run concurrently on this many threads
+    "workers": int(os.getenv("SUMMARY_WORKERS", "4")),
+    # Materialized aggregate table kept up to date by every ETL load, with
+    # the row count, pass count and G3 sum for each combination of these columns
+    "table": os.getenv("SUMMARY_TABLE", "student_summary"),
+    "dimensions": ["school", "sex", "age", "address", "final_result"],
+}
+
+# In-memory OLAP cube behind the dashboard filters (olap_cube.py)
+CUBE_CONFIG = {
+    # Attributes the cube can filter and group by. Each one added multiplies
+    # the possible cells, so keep this to what the dashboard slices on
+    "dimensions": [
+        c.strip() for c in os.getenv(
+            "CUBE_DIMENSIONS", "school,sex,age,address,Mjob,Fjob,schoolsup,internet,higher,studytime,failures",
+        ).split(",") if c.strip()
+    ],
+    # Dimensions with more distinct values than this are left out of the cube
+    "max_cardinality": int(os.getenv("CUBE_MAX_CARDINALITY", "64")),
+    # Rows read from the students table at a time while building
+    "chunksize": int(os.getenv("CUBE_CHUNKSIZE", "200000")),
+}
+
+# Workload-driven indexes on the students table (index_manager.py)
+INDEX_CONFIG = {
+    # Build the workload's indexes on each ETL load's staging table
+    "enabled": os.getenv("INDEX_MANAGER_ENABLED", "true").lower() in ("1", "true", "yes"),
+    # Most columns in one index; the rest of a query's columns are left uncovered
+    "max_columns": int(os.getenv("INDEX_MAX_COLUMNS", "5")),
+    # Leading characters of MySQL TEXT columns that go into an index
+    "text_prefix": int(os.getenv("INDEX_TEXT_PREFIX", "32")),
+    # MySQL only: KEY-partition students by this column (e.g. school); empty = off
+    "partition_by": os.getenv("INDEX_PARTITION_BY", ""),
+    "max_partitions": int(os.getenv("INDEX_MAX_PARTITIONS", "16")),
+    # Before/after EXPLAIN report written by `python index_manager.py`
+    "report": os.getenv("INDEX_REPORT", os.path.join(DATA_DIR, "index_report.json")),
+}
@@ -0,0 +1,242 @@
+"""
+Dashboard Data Module
+
+This module holds the queries behind the Streamlit dashboard. KPIs and charts
+are computed server-side, from the materialized summary table when the ETL
+has built it and from GROUP BY queries on students otherwise, and the raw
+data view is read one page at a time. No function here pulls the whole
+students table. Results go through query_cache, so repeated requests are
+answered without the database until the next ETL load; app.py adds a
+per-session TTL cache on top.
+
+Each panel is described by a plan, (sql, params, finish), so load_panels()
+can run a page's independent queries concurrently and then shape each
+result; the load_* functions run a single plan.
+"""
+
+import async_db
+import db_utils
+import query_cache
+import summary_tables
+import transforms
+
+# Case-insensitive outcome tests, the same comparison the summary rollup makes
+_IS_PASS = transforms.label_sql(transforms.TARGET["positive"])
+_IS_FAIL = transforms.label_sql("fail")
+
+_KPI_SQL = f"SELECT COUNT(*) AS total, SUM({_IS_PASS}) AS passed, SUM({_IS_FAIL}) AS failures FROM students"
+
+
+def _pass_rate_sql(column):
+    return f"SELECT {column}, AVG({_IS_PASS}) * 100 AS final_result FROM students GROUP BY {column} ORDER BY {column}"
+
+
+def _avg_grade_sql(column):
+    return f"SELECT {column}, AVG(G3) AS G3 FROM students GROUP BY {column} ORDER BY {column}"
+
+
+def student_columns(eng):
+    """Return the column names of the students table."""
+    return db_utils.table_columns(eng, "students")
+
+
+def _kpis(totals):
+    total, passed, failures = (int(totals[k] or 0) for k in ("total", "passed", "failures"))
+    return {
+        "total_students": total,
+        "passed": passed,
+        "failures": failures,
+        "pass_rate": round(passed / total * 100, 2) if total else 0.0,
+    }
+
+
+def _kpis_from_rollup(df):
+    totals = df.sum(numeric_only=True)
+    total, passed = totals.get(summary_tables.COUNT, 0), totals.get(summary_tables.PASS_COUNT, 0)
+    return _kpis({"total": total, "passed": passed, "failures": total - passed})
+
+
+def kpi_plan(eng):
+    """
+    Plan the headline counts query.
+
+    Returns:
+        tuple: (sql, params, finish) where finish turns the result frame into
+        a dict of total_students, passed, failures and pass_rate (percent)
+    """
+    if summary_tables.exists(eng):
+        return summary_tables.rollup_sql(["school"]), None, _kpis_from_rollup
+    return _KPI_SQL, None, lambda df: _kpis(df.iloc[0])
+
+
+def pass_rate_plan(eng, column):
+    """
+    Plan the pass rate (percent) per value of a column.
+
+    Returns:
+        tuple: (sql, params, finish) giving a frame of column and final_result
+    """
+    if summary_tables.exists(eng) and column in summary_tables.dimensions():
+        def finish(df):
+            df["final_result"] = df[summary_tables.PASS_COUNT] / df[summary_tables.COUNT] * 100
+            return df[[column, "final_result"]]
+        return summary_tables.rollup_sql([column]), None, finish
+    return _pass_rate_sql(column), None, None
+
+
+def avg_grade_plan(eng, column):
+    """
+    Plan the mean G3 per value of a column.
+
+    Returns:
+        tuple: (sql, params, finish) giving a frame of column and G3
+    """
+    if summary_tables.exists(eng) and column in summary_tables.dimensions():
+        def finish(df):
+            df["G3"] = df[summary_tables.SUM_COLUMNS["G3"]] / df[summary_tables.COUNT]
+            return df[[column, "G3"]]
+        return summary_tables.rollup_sql([column]), None, finish
+    return _avg_grade_sql(column), None, None
+
+
+def point_counts_plan(eng, x, y):
+    """
+    Plan the distinct (x, y) points with the number of students at each.
+
+    Returns:
+        tuple: (sql, params, finish) giving a frame of x, y and n
+    """
+    return f"SELECT {x}, {y}, COUNT(*) AS n FROM students GROUP BY {x}, {y} ORDER BY {x}, {y}", None, None
+
+
+def students_queries():
+    """
+    Return the dashboard's queries on the students table, for index tuning.
+
+    These are the forms the panels take when the summary table is absent.
+
+    Returns:
+        dict: Query name to SQL
+    """
+    return {
+        "dashboard_kpis": _KPI_SQL,
+        "dashboard_pass_rate_by_sex": _pass_rate_sql("sex"),
+        "dashboard_avg_grade_by_age": _avg_grade_sql("age"),
+        "dashboard_point_counts": point_counts_plan(None, "studytime", "G3")[0],
+    }
+
+
+def _finish(plan, df):
+    finish = plan[2]
+    return finish(df) if finish else df
+
+
+def load_panels(eng, panels):
+    """
+    Run several panels' queries concurrently (see async_db.read_many).
+
+    Args:
+        eng: SQLAlchemy engine
+        panels (dict): Panel name to a plan from the *_plan() functions
+
+    Returns:
+        dict: Panel name to its finished result
+    """
+    names = list(panels)
+    frames = async_db.read_many([panels[n][:2] for n in names], eng)
+    return {n: _finish(panels[n], df) for n, df in zip(names, frames)}
+
+
+def _load(eng, plan):
+    sql, params, _ = plan
+    return _finish(plan, query_cache.read_sql(eng, sql, params))
+
+
+def load_kpis(eng):
+    """
+    Compute the headline counts.
+
+    Args:
+        eng: SQLAlchemy engine
+
+    Returns:
+        dict: total_students, passed, failures and pass_rate (percent)
+    """
+    return _load(eng, kpi_plan(eng))
+
+
+def load_pass_rate_by(eng, column):
+    """
+    Pass rate (percent) per value of a column.
+
+    Args:
+        eng: SQLAlchemy engine
+        column (str): Column to group by
+
+    Returns:
+        pd.DataFrame: column and final_result (the pass rate)
+    """
+    return _load(eng, pass_rate_plan(eng, column))
+
+
+def load_avg_grade_by(eng, column):
+    """
+    Mean G3 per value of a column.
+
+    Args:
+        eng: SQLAlchemy engine
+        column (str): Column to group by
+
+    Returns:
+        pd.DataFrame: column and G3 (the mean)
+    """
+    return _load(eng, avg_grade_plan(eng, column))
+
+
+def load_point_counts(eng, x, y):
+    """
+    Distinct (x, y) points with the number of students at each.
+
+    Args:
+        eng: SQLAlchemy engine
+        x (str): Column for the x axis
+        y (str): Column for the y axis
+
+    Returns:
+        pd.DataFrame: x, y and n
+    """
+    return _load(eng, point_counts_plan(eng, x, y))
+
+
+def page_sql(eng):
+    """
+    Return the query load_page() runs.
+
+    Pages are ordered by db_utils.paging_key(). The page's first key is
+    found by skipping keys only, so the rows are read for one page instead
+    of for every page before it. Tables without a paging key (MySQL tables
+    loaded before full loads added row_id) are ordered by all of their
+    columns, so rows that differ always come out in the same order.
+    """
+    key = db_utils.paging_key(eng, "students")
+    if key:
+        start = f"(SELECT {key} FROM students ORDER BY {key} LIMIT 1 OFFSET :offset)"
+        return f"SELECT * FROM students WHERE {key} >= {start} ORDER BY {key} LIMIT :limit"
+    columns = ", ".join(db_utils.table_columns(eng, "students"))
+    return f"SELECT * FROM students ORDER BY {columns} LIMIT :limit OFFSET :offset"
+
+
+def load_page(eng, page, page_size):
+    """
+    Read one page of the students table.
+
+    Args:
+        eng: SQLAlchemy engine
+        page (int): 1-based page number
+        page_size (int): Rows per page
+
+    Returns:
+        pd.DataFrame: The page's rows, in a stable order
+    """
+    params = {"limit": int(page_size), "offset": (int(page) - 1) * int(page_size)}
+    return query_cache.read_sql(eng, page_sql(eng), params=params)
@@ -3,79 +3,500 @@ Database Utilities Module
 
 This module provides database connection utilities for the student performance
 analytics project using MySQL and SQLAlchemy.
+
+Engines are cached per connection configuration so callers share one
+connection pool. Health checks are remembered for DB_CONFIG["health_ttl"]
+seconds, and a circuit breaker sends callers straight to the local fallback
+while MySQL is known to be down. The fallback is SQLite, or DuckDB (a
+columnar engine that scans and aggregates far faster) with DB_FALLBACK=duckdb.
+A DuckDB file can be open in only one process at a time, so its engine
+connects per operation instead of pooling, and waits a few seconds for a
+lock held by another process before explaining the conflict.
+
+get_async_engine() returns an asyncio engine (aiomysql or aiosqlite) for
+the database get_engine() chose, so it inherits the same fallback. Async
+engines live on one shared event loop; run coroutines there with
+run_async().
 """
 
 import os
+import time
+import asyncio
 import logging
+import threading
+import importlib.util
 import sqlalchemy
-from sqlalchemy import create_engine, text
-from config import DB_CONFIG, SQLITE_DB_PATH
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.pool import NullPool
+from config import DB_CONFIG, DUCKDB_PATH, SQLITE_DB_PATH
+import instrumentation
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Engine registry shared by every caller in the process
+_LOCK = threading.Lock()
+_ENGINES = {}
+_LAST_HEALTHY = {}
+_BREAKERS = {}
+_LOOP = None
+_WARNED = set()
+
+# Async driver for each backend: (drivername, module that must be installed)
+ASYNC_DRIVERS = {
+    "mysql": ("mysql+aiomysql", "aiomysql"),
+    "sqlite": ("sqlite+aiosqlite", "aiosqlite"),
+}
+
+
+class CircuitBreaker:
+    """
+    Track connection failures for one database.
+
+    After `threshold` consecutive failures the breaker opens and callers are
+    refused for `cooldown` seconds. After the cooldown one caller at a time
+    gets a trial connection, and everyone else is still refused until it
+    reports back. Success closes the breaker, failure re-opens it. A trial
+    that never reports back is given up after another cooldown.
+    """
+
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.last_error = None
+        self._trial_at = None
+        # Own lock: stats() is called while holding the registry's _LOCK
+        self._lock = threading.Lock()
+
+    def _state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    @property
+    def state(self):
+        """Return "closed", "open" or "half-open"."""
+        with self._lock:
+            return self._state()
+
+    def allow(self):
+        """Return True if a connection attempt may be made now, claiming the trial slot when half-open."""
+        with self._lock:
+            state = self._state()
+            if state != "half-open":
+                return state == "closed"
+            now = time.monotonic()
+            if self._trial_at is not None and now - self._trial_at < self.cooldown:
+                return False
+            self._trial_at = now
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.last_error = None
+            self._trial_at = None
+
+    def record_failure(self, error):
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(error)
+            self._trial_at = None
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+    def stats(self):
+        with self._lock:
+            return {"state": self._state(), "failures": self.failures, "last_error": self.last_error}
+
+
+def _mysql_url():
+    """
+    Build the MySQL connection string from DB_CONFIG.
+
+    Raises:
+        RuntimeError: If required database credentials are missing
+    """
+    if not DB_CONFIG["user"]:
+        raise RuntimeError("DB_USER not found in environment variables")
+    if not DB_CONFIG["password"]:
+        raise RuntimeError("DB_PASS not found in environment variables")
+    if not DB_CONFIG["database"]:
+        raise RuntimeError("DB_NAME not found in environment variables")
+
+    return (
+        f"mysql+mysqlconnector://{DB_CONFIG['user']}:{DB_CONFIG['password']}@"
+        f"{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}"
+    )
+
+
+def _cached_engine(url, echo, setup=None, **kwargs):
+    """
+    Return the registered engine for (url, echo), creating it on first use.
+
+    setup, if given, is called with a new engine before other threads can see it.
+
+    Returns:
+        tuple: (engine, created) where created is True for a new engine
+    """
+    key = (url, echo)
+    with _LOCK:
+        engine = _ENGINES.get(key)
+        if engine is not None:
+            return engine, False
+        engine = create_engine(url, echo=echo, **kwargs)
+        instrumentation.instrument_engine(engine)
+        if setup is not None:
+            setup(engine)
+        _ENGINES[key] = engine
+        return engine, True
+
+
+def _is_healthy(engine):
+    """
+    Ping the engine unless a recent health check already succeeded.
+
+    Raises:
+        Exception: Whatever the driver raises when the database is unreachable
+    """
+    checked_at = _LAST_HEALTHY.get(engine)
+    if checked_at is not None and time.monotonic() - checked_at < DB_CONFIG["health_ttl"]:
+        return True
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    _LAST_HEALTHY[engine] = time.monotonic()
+    return True
+
+
+def fallback_backend():
+    """
+    Return the local backend used when MySQL is unavailable.
+
+    Returns:
+        str: "duckdb" when DB_FALLBACK=duckdb and duckdb-engine is installed,
+        otherwise "sqlite"
+    """
+    choice = DB_CONFIG["fallback"]
+    if choice == "duckdb" and importlib.util.find_spec("duckdb_engine") is not None:
+        return "duckdb"
+    if choice != "sqlite" and choice not in _WARNED:
+        _WARNED.add(choice)
+        reason = "duckdb-engine is not installed" if choice == "duckdb" else "unknown backend"
+        logger.warning(f"⚠️ DB_FALLBACK={choice}: {reason}. Using SQLite.")
+    return "sqlite"
+
+
+def _wait_for_duckdb_lock(engine):
+    """
+    Make an engine retry DuckDB's file lock, then fail with an explanation.
+
+    DuckDB lets a single process open a database file (read-only opens
+    conflict with writers too), so a load in one process and the dashboard in
+    another take turns. New connections retry for DB_CONFIG["duckdb_lock_wait"]
+    seconds before giving up.
+
+    Raises:
+        RuntimeError: From connect() if the lock is still held by another process
+    """
+    @event.listens_for(engine, "do_connect")
+    def connect(dialect, conn_rec, cargs, cparams):
+        deadline = time.monotonic() + DB_CONFIG["duckdb_lock_wait"]
+        delay = 0.05
+        while True:
+            try:
+                return dialect.connect(*cargs, **cparams)
+            except Exception as e:
+                if "Could not set lock" not in str(e):
+                    raise
+                if time.monotonic() >= deadline:
+                    raise RuntimeError(
+                        f"DuckDB file {engine.url.database} is open in another process. DuckDB allows one "
+                        "process per file: wait for the running ETL, export or dashboard query to finish, "
+                        f"or use MySQL for concurrent access. ({e})"
+                    ) from e
+                time.sleep(delay)
+                delay = min(delay * 2, 0.5)
+
+
+def _fallback_engine(echo):
+    """Return the cached SQLite or DuckDB fallback engine."""
+    if fallback_backend() == "duckdb":
+        # No pool: an idle pooled connection would keep the file locked
+        engine, created = _cached_engine(
+            f"duckdb:///{DUCKDB_PATH}", echo, setup=_wait_for_duckdb_lock, poolclass=NullPool
+        )
+        if created:
+            logger.info(f"✅ DuckDB fallback engine created at {DUCKDB_PATH}")
+        return engine
+    engine, created = _cached_engine(f"sqlite:///{SQLITE_DB_PATH}", echo)
+    if created:
+        logger.info(f"✅ SQLite fallback engine created at {SQLITE_DB_PATH}")
+    return engine
+
 
 def get_engine(echo=False, use_sqlite_fallback=True):
     """
-    Create and return a SQLAlchemy database engine.
-    
+    Return a SQLAlchemy database engine from the process-wide registry.
+
     Args:
         echo (bool): Whether to echo SQL statements (for debugging)
-        use_sqlite_fallback (bool): Whether to use SQLite as fallback if MySQL fails
-        
+        use_sqlite_fallback (bool): Whether to use the local fallback
+            (SQLite or DuckDB, see DB_FALLBACK) if MySQL fails
+
     Returns:
         sqlalchemy.engine.Engine: Database engine
-        
+
     Raises:
         RuntimeError: If required database credentials are missing and fallback is disabled
     """
     try:
-        # Validate required credentials
-        if not DB_CONFIG["user"]:
-            raise RuntimeError("DB_USER not found in environment variables")
-        if not DB_CONFIG["password"]:
-            raise RuntimeError("DB_PASS not found in environment variables")
-        if not DB_CONFIG["database"]:
-            raise RuntimeError("DB_NAME not found in environment variables")
-        
-        # Construct connection string
-        connection_string = (
-            f"mysql+mysqlconnector://{DB_CONFIG['user']}:{DB_CONFIG['password']}@"
-            f"{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}"
-        )
-        
-        # Create engine with connection pooling
-        engine = create_engine(
-            connection_string,
-            echo=echo,
-            pool_pre_ping=True,
-            pool_recycle=DB_CONFIG["pool_recycle"],
-            pool_size=DB_CONFIG["pool_size"],
-            max_overflow=DB_CONFIG["max_overflow"]
-        )
-        
-        # Test connection properly with text() wrapper
-        with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
-        
-        logger.info(f"✅ Database engine created for {DB_CONFIG['database']} on {DB_CONFIG['host']}:{DB_CONFIG['port']}")
+        connection_string = _mysql_url()
+
+        with _LOCK:
+            breaker = _BREAKERS.setdefault(
+                connection_string,
+                CircuitBreaker(DB_CONFIG["breaker_threshold"], DB_CONFIG["breaker_cooldown"]),
+            )
+        if not breaker.allow():
+            raise RuntimeError(f"MySQL circuit breaker open after: {breaker.last_error}")
+
+        try:
+            # Create engine with connection pooling; a missing driver or bad URL counts as a failure too
+            engine, created = _cached_engine(
+                connection_string,
+                echo,
+                pool_pre_ping=True,
+                pool_recycle=DB_CONFIG["pool_recycle"],
+                pool_size=DB_CONFIG["pool_size"],
+                max_overflow=DB_CONFIG["max_overflow"],
+                connect_args={"allow_local_infile": True} if DB_CONFIG["local_infile"] else {}
+            )
+            _is_healthy(engine)
+        except Exception as e:
+            breaker.record_failure(e)
+            raise
+
+        breaker.record_success()
+        if created:
+            logger.info(f"✅ Database engine created for {DB_CONFIG['database']} on {DB_CONFIG['host']}:{DB_CONFIG['port']}")
         return engine
     except Exception as e:
         if use_sqlite_fallback:
-            logger.warning(f"⚠️ MySQL connection failed: {str(e)}. Using SQLite fallback.")
-            sqlite_engine = create_engine(f"sqlite:///{SQLITE_DB_PATH}", echo=echo)
-            logger.info(f"✅ SQLite fallback engine created at {SQLITE_DB_PATH}")
-            return sqlite_engine
+            logger.warning(f"⚠️ MySQL connection failed: {str(e)}. Using local fallback.")
+            return _fallback_engine(echo)
         else:
             logger.error(f"❌ Error creating database engine: {str(e)}")
             raise
 
 
+def async_available(eng=None):
+    """
+    Return True if an async engine can be created for a database.
+
+    Args:
+        eng: SQLAlchemy engine whose backend to check (defaults to get_engine())
+
+    Returns:
+        bool: False when async access is disabled or greenlet or the
+        backend's async driver is not installed
+    """
+    if not DB_CONFIG["async_enabled"]:
+        return False
+    backend = (eng or get_engine()).url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        return False
+    modules = ["greenlet", ASYNC_DRIVERS[backend][1]]
+    return all(importlib.util.find_spec(m) is not None for m in modules)
+
+
+def get_async_engine(eng=None, echo=False):
+    """
+    Return the asyncio engine for the database a sync engine points at.
+
+    The MySQL/SQLite choice, circuit breaker and health checks all come
+    from get_engine(); this swaps in the backend's async driver. Engines
+    are cached like sync ones.
+
+    Args:
+        eng: Sync engine to mirror (defaults to get_engine(echo))
+        echo (bool): Whether to echo SQL statements
+
+    Returns:
+        sqlalchemy.ext.asyncio.AsyncEngine: Async engine
+
+    Raises:
+        RuntimeError: If async access is unavailable (see async_available)
+    """
+    eng = eng or get_engine(echo)
+    if not async_available(eng):
+        raise RuntimeError(f"Async access unavailable for {eng.url.get_backend_name()}")
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    backend = eng.url.get_backend_name()
+    url = eng.url.set(drivername=ASYNC_DRIVERS[backend][0])
+    key = (url.render_as_string(hide_password=False), echo)
+    with _LOCK:
+        engine = _ENGINES.get(key)
+        if engine is None:
+            kwargs = {"pool_pre_ping": True}
+            if backend == "mysql":
+                kwargs.update(
+                    pool_recycle=DB_CONFIG["pool_recycle"],
+                    pool_size=DB_CONFIG["max_concurrency"],
+                    max_overflow=0,
+                    connect_args={"local_infile": True} if DB_CONFIG["local_infile"] else {},
+                )
+            engine = create_async_engine(url, echo=echo, **kwargs)
+            instrumentation.instrument_engine(engine.sync_engine)
+            _ENGINES[key] = engine
+            logger.info(f"✅ Async engine created for {url.render_as_string(hide_password=True)}")
+    return engine
+
+
+def _event_loop():
+    """Return the shared event loop async engines run on, starting it on first use."""
+    global _LOOP
+    with _LOCK:
+        if _LOOP is None or _LOOP.is_closed():
+            _LOOP = asyncio.new_event_loop()
+            threading.Thread(target=_LOOP.run_forever, name="db-async-loop", daemon=True).start()
+        return _LOOP
+
+
+def run_async(coro):
+    """
+    Run a coroutine on the shared database event loop and wait for it.
+
+    Safe to call from any thread, including one with its own running loop
+    (e.g. Streamlit or Jupyter).
+
+    Args:
+        coro: Coroutine using async engines from get_async_engine()
+
+    Returns:
+        The coroutine's result
+    """
+    return asyncio.run_coroutine_threadsafe(coro, _event_loop()).result()
+
+
+def table_columns(bind, table):
+    """
+    Return a table's column names.
+
+    Reads them from an empty SELECT rather than from the catalog, which works
+    on every backend (duckdb-engine cannot reflect columns on SQLAlchemy 2.1).
+
+    Args:
+        bind: SQLAlchemy engine or connection
+        table (str): Table name
+
+    Returns:
+        list: Column names in table order
+    """
+    sql = text(f"SELECT * FROM {table} WHERE 1 = 0")
+    if isinstance(bind, sqlalchemy.engine.Connection):
+        return list(bind.execute(sql).keys())
+    with bind.connect() as conn:
+        return list(conn.execute(sql).keys())
+
+
+def paging_key(bind, table="students"):
+    """
+    Return the column that orders a table's rows stably, for paging.
+
+    Tables loaded incrementally have a unique row_key and MySQL tables from
+    full loads an AUTO_INCREMENT row_id; SQLite and DuckDB tables otherwise
+    have their built-in rowid.
+
+    Args:
+        bind: SQLAlchemy engine or connection
+        table (str): Table name
+
+    Returns:
+        str: "row_key", "row_id", "rowid", or None if the table has no such column
+    """
+    columns = table_columns(bind, table)
+    for key in ("row_key", "row_id"):
+        if key in columns:
+            return key
+    if bind.dialect.name in ("sqlite", "duckdb"):
+        return "rowid"
+    return None
+
+
+def reflect_table(conn, table):
+    """
+    Return a table object for building INSERT/UPDATE/DELETE statements.
+
+    Reflected from the catalog where the dialect supports it; on DuckDB a
+    lightweight table of untyped columns from table_columns() is used.
+
+    Args:
+        conn: Open SQLAlchemy connection
+        table (str): Table name
+    """
+    if conn.dialect.name == "duckdb":
+        return sqlalchemy.table(table, *(sqlalchemy.column(c) for c in table_columns(conn, table)))
+    return sqlalchemy.Table(table, sqlalchemy.MetaData(), autoload_with=conn)
+
+
+def get_engine_stats():
+    """
+    Report the state of every registered engine and circuit breaker.
+
+    Returns:
+        dict: "engines" maps each URL (password hidden) to its pool status and
+        last successful health check age; "breakers" maps each MySQL URL to
+        its breaker state
+    """
+    now = time.monotonic()
+    with _LOCK:
+        engines = {}
+        for (url, echo), engine in _ENGINES.items():
+            pool = getattr(engine, "sync_engine", engine).pool
+            checked_at = _LAST_HEALTHY.get(engine)
+            name = engine.url.render_as_string(hide_password=True)
+            engines[f"{name} (echo)" if echo else name] = {
+                "pool": pool.status(),
+                "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+                "health_age_s": None if checked_at is None else round(now - checked_at, 3),
+            }
+        breakers = {
+            sqlalchemy.engine.make_url(url).render_as_string(hide_password=True): breaker.stats()
+            for url, breaker in _BREAKERS.items()
+        }
+    return {"engines": engines, "breakers": breakers}
+
+
+def reset_engines():
+    """
+    Dispose every registered engine and forget health and breaker state.
+
+    Call this after forking or when DB_CONFIG changes at runtime.
+    """
+    with _LOCK:
+        engines = list(_ENGINES.values())
+        _ENGINES.clear()
+    for engine in engines:
+        if hasattr(engine, "sync_engine"):
+            run_async(engine.dispose())
+        else:
+            engine.dispose()
+    with _LOCK:
+        _LAST_HEALTHY.clear()
+        _BREAKERS.clear()
+
+
 def test_connection():
     """
     Test the database connection.
-    
+
     Returns:
         bool: True if connection is successful, False otherwise
     """
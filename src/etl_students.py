@@ -6,10 +6,23 @@ for student performance data from CSV to MySQL database.
 """
 
 import os
+import hashlib
+import argparse
 import logging
+from datetime import datetime, timezone
+import numpy as np
 import pandas as pd
-from sqlalchemy import text
+from sqlalchemy import inspect, text
 from db_utils import get_engine
+import db_utils
+from config import ETL_CONFIG, PROCESSED_STORE_FILE, SUMMARY_CONFIG
+import bulk_load
+import columnar_store
+import index_manager
+import instrumentation
+import query_cache
+import summary_tables
+import transforms
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -23,6 +36,16 @@ os.makedirs(DATA, exist_ok=True)
 CSV_FILE = os.path.join(DATA, "student-mat.csv")
 PROCESSED = os.path.join(DATA, "students_processed.csv")
 
+GRADE_COLUMNS = list(transforms.COLUMN_SCHEMA)
+
+# Surrogate paging key added to MySQL tables by full loads
+ROW_ID = "row_id"
+
+# Incremental load bookkeeping
+ROW_KEY = "row_key"
+ROW_HASH = "row_hash"
+BATCH_SIZE = 2000
+
 
 def ensure_csv():
     """
@@ -38,6 +61,23 @@ def ensure_csv():
     logger.info(f"✅ Found dataset: {CSV_FILE}")
 
 
+def transform_frame(df):
+    """
+    Apply the cleaning rules to a raw frame (or one chunk of it).
+    
+    Args:
+        df (pd.DataFrame): Raw rows as read from the source CSV
+        
+    Returns:
+        pd.DataFrame: The same frame with grades coerced and final_result added
+    """
+    # Clean column names
+    df.columns = [col.strip() for col in df.columns]
+    
+    # Coerce grade columns to int8 and derive the pass/fail outcome
+    return transforms.transform(df)
+
+
 def clean_data():
     """
     Clean and preprocess the student data.
@@ -47,25 +87,18 @@ def clean_data():
     """
     try:
         # Load data
-        df = pd.read_csv(CSV_FILE, sep=';')
+        with instrumentation.span("etl.read_csv") as s:
+            df = pd.read_csv(CSV_FILE, sep=';')
+            s.add_rows(len(df))
         logger.info(f"Loaded {len(df)} rows from {CSV_FILE}")
         
-        # Clean column names
-        df.columns = [col.strip() for col in df.columns]
-        
-        # Process grade columns (G1, G2, G3)
-        grade_columns = ['G1', 'G2', 'G3']
-        for col in grade_columns:
+        with instrumentation.span("etl.transform", rows=len(df)):
+            df = transform_frame(df)
+        for col in GRADE_COLUMNS:
             if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(int)
                 logger.info(f"Processed {col} column")
         
-        # Create pass/fail target variable
-        df['final_result'] = df['G3'].apply(lambda x: 'pass' if x >= 10 else 'fail')
-        
-        # Save processed data
-        df.to_csv(PROCESSED, index=False)
-        logger.info(f"✅ Cleaned data saved → {PROCESSED}")
+        save_processed(df)
         
         return df
         
@@ -74,63 +107,656 @@ def clean_data():
         raise
 
 
-def load_mysql(df):
+@instrumentation.timed("etl.save_processed")
+def save_processed(df):
+    """
+    Write cleaned rows to the processed CSV and the columnar store.
+    
+    Args:
+        df (pd.DataFrame): Cleaned dataframe
+    """
+    df.to_csv(PROCESSED, index=False)
+    logger.info(f"✅ Cleaned data saved → {PROCESSED}")
+    columnar_store.write_store(df, PROCESSED_STORE_FILE)
+
+
+def iter_clean_chunks(chunksize=None, source=None):
+    """
+    Read the source CSV in bounded chunks and yield each one cleaned.
+    
+    Args:
+        chunksize (int): Rows per chunk (defaults to ETL_CONFIG["chunksize"])
+        source (str): CSV file to read (defaults to CSV_FILE)
+        
+    Yields:
+        pd.DataFrame: Cleaned chunk, as transform_frame() returns it
+    """
+    chunksize = chunksize or ETL_CONFIG["chunksize"]
+    with pd.read_csv(source or CSV_FILE, sep=';', chunksize=chunksize) as reader:
+        for chunk in reader:
+            yield transform_frame(chunk)
+
+
+def _at_least_one_chunk(chunks, source=None):
+    """
+    Yield the chunks, or one empty chunk with the source's columns if there are none.
+    
+    Streaming outputs are written as chunks arrive, so a source without rows
+    must still yield a chunk for the previous run's files and table to be
+    replaced.
+    """
+    empty = True
+    for chunk in chunks:
+        empty = False
+        yield chunk
+    if empty:
+        yield transform_frame(pd.read_csv(source or CSV_FILE, sep=';', nrows=0))
+
+
+def _write_students(eng, df, if_exists, table="students"):
+    """
+    Write a frame to the students table through the bulk loader.
+    
+    Args:
+        eng: SQLAlchemy engine
+        df (pd.DataFrame): Rows to write
+        if_exists (str): "replace" or "append", as accepted by DataFrame.to_sql
+        table (str): Target table (the staging table during full loads)
+    """
+    with instrumentation.span("etl.write_students", rows=len(df)):
+        method = bulk_load.bulk_load(eng, df, table, if_exists)
+    logger.debug(f"Wrote {len(df)} rows to {table} via {method}")
+
+
+def _load_id(df, chunksize):
+    """
+    Identify a load by its columns, length and chunking.
+    
+    Rows are not sampled here: each chunk's content is checked against its
+    own checkpointed hash (see _chunk_hash) before a resume skips it.
+    """
+    signature = f"{','.join(map(str, df.columns))}|{len(df)}|{chunksize}"
+    return hashlib.blake2b(signature.encode(), digest_size=16).hexdigest()
+
+
+def _chunk_hash(chunk):
+    """Hash every value of a chunk, so any change to its rows changes the hash."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(",".join(map(str, chunk.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(chunk, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _ensure_load_state(conn):
+    table = ETL_CONFIG["load_state_table"]
+    if inspect(conn).has_table(table) and "chunk_hash" not in db_utils.table_columns(conn, table):
+        # Checkpoints written before chunk hashes were kept cannot be verified
+        conn.execute(text(f"DROP TABLE {table}"))
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {table} ("
+        "load_id VARCHAR(32) NOT NULL, chunk INTEGER NOT NULL, row_count BIGINT NOT NULL, "
+        "chunk_hash VARCHAR(32) NOT NULL, committed_at VARCHAR(40), PRIMARY KEY (load_id, chunk))"
+    ))
+
+
+def _record_chunk(eng, load_id, chunk, rows, chunk_hash):
+    """Checkpoint a chunk's size and content hash before it is written to the staging table."""
+    with eng.begin() as conn:
+        _ensure_load_state(conn)
+        conn.execute(
+            text(f"INSERT INTO {ETL_CONFIG['load_state_table']} (load_id, chunk, row_count, chunk_hash, committed_at) "
+                 "VALUES (:id, :chunk, :rows, :hash, :now)"),
+            {"id": load_id, "chunk": chunk, "rows": rows, "hash": chunk_hash,
+             "now": datetime.now(timezone.utc).isoformat()},
+        )
+
+
+def _reset_load_state(eng):
+    """Forget every checkpoint (the staging table holds one load at a time)."""
+    with eng.begin() as conn:
+        _ensure_load_state(conn)
+        conn.execute(text(f"DELETE FROM {ETL_CONFIG['load_state_table']}"))
+
+
+def _resume_point(eng, load_id, chunks):
+    """
+    Find the first chunk of a load that the staging table does not hold yet.
+    
+    Each chunk is checkpointed before it is written, and written in one
+    transaction, so the staging table's row count tells how many of the
+    checkpointed chunks committed. A checkpoint beyond them belongs to a
+    write that died and is removed. Every chunk to be skipped is hashed
+    again and compared with its checkpoint. A corrected extract of the same
+    shape therefore starts over instead of keeping stale rows. Without any
+    checkpoint the load also starts over, since the staging table may hold
+    rows of a different load.
+    
+    Args:
+        eng: SQLAlchemy engine
+        load_id (str): _load_id() of the load
+        chunks (list): The load's chunks, in order
+        
+    Returns:
+        int: Index of the first chunk to write (0 restarts the load)
+    """
+    insp = inspect(eng)
+    staging = ETL_CONFIG["staging_table"]
+    state_table = ETL_CONFIG["load_state_table"]
+    if not insp.has_table(staging) or not insp.has_table(state_table):
+        return 0
+    if "chunk_hash" not in db_utils.table_columns(eng, state_table):
+        return 0
+    with eng.connect() as conn:
+        recorded = conn.execute(
+            text(f"SELECT chunk, row_count, chunk_hash FROM {state_table} WHERE load_id = :id ORDER BY chunk"),
+            {"id": load_id},
+        ).fetchall()
+        staged = conn.execute(text(f"SELECT COUNT(*) FROM {staging}")).scalar()
+    if [row[0] for row in recorded] != list(range(len(recorded))):
+        return 0
+    done, committed = 0, 0
+    while done < len(recorded) and committed < staged:
+        committed += recorded[done][1]
+        done += 1
+    if not done or committed != staged:
+        if recorded:
+            logger.warning(f"⚠️ {staging} holds {staged} rows, which matches no checkpoint; restarting the load")
+        return 0
+    for i in range(done):
+        if len(chunks[i]) != recorded[i][1] or _chunk_hash(chunks[i]) != recorded[i][2]:
+            logger.warning(f"⚠️ Chunk {i + 1} differs from the staged rows; restarting the load")
+            return 0
+    with eng.begin() as conn:
+        conn.execute(text(f"DELETE FROM {state_table} WHERE load_id = :id AND chunk >= :done"),
+                     {"id": load_id, "done": done})
+    return done
+
+
+def _swap_in(eng, swaps):
     """
-    Load processed data into MySQL database or SQLite fallback.
+    Replace tables with fully built staging tables in one step.
+    
+    Readers see either all of the old tables or all of the new ones, never a
+    partial load or new students next to an old summary.
+    
+    Args:
+        eng: SQLAlchemy engine
+        swaps (dict): Staging table name to the name of the table it replaces
+    """
+    insp = inspect(eng)
+    existing = [table for table in swaps.values() if insp.has_table(table)]
+    if eng.dialect.name == "mysql":
+        # One RENAME TABLE statement swaps every name atomically
+        renames = []
+        for staging, table in swaps.items():
+            if table in existing:
+                renames.append(f"`{table}` TO `{table}_old`")
+            renames.append(f"`{staging}` TO `{table}`")
+        with eng.begin() as conn:
+            for table in existing:
+                conn.execute(text(f"DROP TABLE IF EXISTS `{table}_old`"))
+            conn.execute(text(f"RENAME TABLE {', '.join(renames)}"))
+            for table in existing:
+                conn.execute(text(f"DROP TABLE `{table}_old`"))
+    elif eng.dialect.name == "sqlite":
+        # The sqlite3 module commits before DDL unless a transaction is opened explicitly
+        raw = eng.raw_connection()
+        try:
+            cursor = raw.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            has_stats = cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+            ).fetchone()
+            for staging, table in swaps.items():
+                cursor.execute(f'DROP TABLE IF EXISTS "{table}"')
+                cursor.execute(f'ALTER TABLE "{staging}" RENAME TO "{table}"')
+                if has_stats:
+                    # ANALYZE statistics stay under the old name unless moved
+                    cursor.execute("UPDATE sqlite_stat1 SET tbl = ? WHERE tbl = ?", (table, staging))
+            raw.commit()
+        except Exception:
+            raw.rollback()
+            raise
+        finally:
+            raw.close()
+    else:
+        with eng.begin() as conn:
+            for staging, table in swaps.items():
+                conn.execute(text(f'DROP TABLE IF EXISTS "{table}"'))
+                conn.execute(text(f'ALTER TABLE "{staging}" RENAME TO "{table}"'))
+    logger.debug(f"Swapped in {swaps}")
+
+
+def _add_row_id(eng, table):
+    """
+    Number a fully loaded MySQL table's rows with an AUTO_INCREMENT row_id.
+
+    SQLite and DuckDB page on their built-in rowid, but a MySQL table has no
+    stable order of its own. The id gets a plain index rather than a
+    primary key, so the table can still be partitioned (see
+    index_manager.partition_students). A staging table that already has
+    the column (a resumed load) is left as it is.
+
+    Args:
+        eng: SQLAlchemy engine
+        table (str): Table holding the loaded rows (the staging table during loads)
+    """
+    if eng.dialect.name != "mysql" or ROW_ID in db_utils.table_columns(eng, table):
+        return
+    name = index_manager.free_name(eng, f"idx_students_{ROW_ID}", table)
+    with eng.begin() as conn:
+        conn.execute(text(
+            f"ALTER TABLE `{table}` ADD COLUMN `{ROW_ID}` BIGINT NOT NULL AUTO_INCREMENT, "
+            f"ADD INDEX `{name}` (`{ROW_ID}`)"
+        ))
+
+
+@instrumentation.timed("etl.create_indexes")
+def _create_indexes(eng, table="students"):
+    """
+    Build a students table's indexes once its rows are loaded.
+
+    Indexes come from index_manager, which derives them from the query
+    workload. Loads build them on the staging table after the bulk insert,
+    which is cheaper than maintaining them row by row. The table is then
+    swapped in already indexed.
+
+    Args:
+        eng: SQLAlchemy engine
+        table (str): Table holding the loaded rows (the staging table during loads)
+    """
+    if eng.dialect.name == "duckdb":
+        # Columnar scans with zone maps need no secondary index
+        return
+    try:
+        index_manager.ensure_indexes(eng, table=table)
+    except Exception as e:
+        # A missing index slows queries but leaves the loaded data intact
+        logger.warning(f"⚠️ Index maintenance failed: {e}")
+
+
+def _backend_name(eng):
+    """Return the display name of an engine's database backend."""
+    return {"mysql": "MySQL", "sqlite": "SQLite", "duckdb": "DuckDB"}.get(eng.dialect.name, eng.dialect.name)
+
+
+def _summary_staging():
+    """Return the staging table the summary is rebuilt into during full loads."""
+    return f"{SUMMARY_CONFIG['table']}_staging"
+
+
+def _bump_versions(eng):
+    """
+    Mark the students and summary tables as changed.
+    
+    Cached query results that read them (see query_cache) are invalidated.
+    
+    Args:
+        eng: SQLAlchemy engine
+    """
+    query_cache.bump_versions(eng, ["students", SUMMARY_CONFIG["table"]])
+
+
+def load_mysql(df, resume=True):
+    """
+    Load processed data into MySQL database or the local fallback (SQLite or DuckDB).
+    
+    Rows go to the staging table in ETL_CONFIG["chunksize"] chunks. Each
+    chunk's size and content hash are checkpointed in the load state table.
+    The staging table is indexed and the summary is rebuilt beside it. Both
+    then replace students and the summary in one step, so readers never see
+    a partial, unindexed or mismatched table. If a run dies partway,
+    rerunning the same load resumes at the first chunk that was not
+    committed.
     
     Args:
         df (pd.DataFrame): Processed dataframe to load
+        resume (bool): Continue an interrupted load of the same rows (False reloads every chunk)
     """
     try:
         eng = get_engine()
+        staging = ETL_CONFIG["staging_table"]
+        chunksize = ETL_CONFIG["chunksize"]
+        # An empty frame still gets one (empty) chunk, so the table is created
+        chunks = [df.iloc[start:start + chunksize] for start in range(0, len(df) or 1, chunksize)]
+        
+        with instrumentation.span("etl.load_mysql", rows=len(df)):
+            load_id = _load_id(df, chunksize)
+            done = _resume_point(eng, load_id, chunks) if resume else 0
+            if done:
+                staged = sum(len(chunk) for chunk in chunks[:done])
+                logger.info(f"↩️ Resuming load at chunk {done + 1} of {len(chunks)} ({staged} rows already staged)")
+            else:
+                _reset_load_state(eng)
+            
+            for i, chunk in enumerate(chunks[done:], start=done):
+                _record_chunk(eng, load_id, i, len(chunk), _chunk_hash(chunk))
+                _write_students(eng, chunk, "replace" if i == 0 else "append", staging)
+                logger.debug(f"Chunk {i + 1}/{len(chunks)} staged")
+            
+            _add_row_id(eng, staging)
+            _create_indexes(eng, staging)
+            with instrumentation.span("etl.summary_rebuild", rows=len(df)):
+                summary_tables.rebuild(eng, summary_tables.aggregate(df), _summary_staging())
+            _swap_in(eng, {staging: "students", _summary_staging(): SUMMARY_CONFIG["table"]})
+            _reset_load_state(eng)
+            _bump_versions(eng)
+            logger.info(f"Data loaded to {_backend_name(eng)} table: students")
+        
+        logger.info(f"✅ Data successfully loaded to {_backend_name(eng)}")
+        
+    except Exception as e:
+        logger.error(f"❌ Error loading data to MySQL: {str(e)}")
+        raise
+
+
+def fingerprint_rows(df, key_columns=None):
+    """
+    Compute a stable key and a content hash for every row.
+    
+    Args:
+        df (pd.DataFrame): Cleaned rows
+        key_columns (list): Columns identifying a row across runs (defaults to
+            ETL_CONFIG["key_columns"]; rows are keyed by content when empty)
+        
+    Returns:
+        pd.DataFrame: row_key and row_hash columns, aligned with df
+        
+    Raises:
+        ValueError: If the key columns do not identify rows uniquely
+    """
+    key_columns = key_columns if key_columns is not None else ETL_CONFIG["key_columns"]
+    hashes = pd.util.hash_pandas_object(df, index=False).to_numpy().view(np.int64)
+    if key_columns:
+        keys = pd.util.hash_pandas_object(df[key_columns], index=False).to_numpy().view(np.int64)
+        if len(np.unique(keys)) != len(keys):
+            raise ValueError(f"Key columns {key_columns} do not identify rows uniquely")
+    else:
+        # An unchanged row keeps its key wherever it moves in the extract, so
+        # the diff holds only inserts and deletes; identical rows are told
+        # apart by their occurrence number
+        occurrence = pd.Series(hashes).groupby(hashes).cumcount().to_numpy()
+        keyed = pd.DataFrame({ROW_HASH: hashes, "occurrence": occurrence})
+        keys = pd.util.hash_pandas_object(keyed, index=False).to_numpy().view(np.int64)
+    return pd.DataFrame({ROW_KEY: keys, ROW_HASH: hashes})
+
+
+def diff_rows(current, previous):
+    """
+    Compare two sets of row fingerprints.
+    
+    Args:
+        current (pd.DataFrame): Fingerprints of the rows being loaded
+        previous (pd.DataFrame): Fingerprints saved by the last load
         
-        # Check if we're using SQLite (fallback) or MySQL
-        is_sqlite = 'sqlite' in str(eng.url)
-        
-        # Load data to database
-        df.to_sql(
-            "students", 
-            eng, 
-            if_exists="replace", 
-            index=False, 
-            chunksize=2000, 
-            method=None if is_sqlite else "multi"  # SQLite doesn't support 'multi'
+    Returns:
+        dict: Arrays of row keys under "inserted", "updated" and "deleted"
+    """
+    merged = current.merge(previous, on=ROW_KEY, how="outer", suffixes=("", "_prev"), indicator=True)
+    both = merged["_merge"] == "both"
+    return {
+        "inserted": merged.loc[merged["_merge"] == "left_only", ROW_KEY].to_numpy(),
+        "updated": merged.loc[both & (merged[ROW_HASH] != merged[f"{ROW_HASH}_prev"]), ROW_KEY].to_numpy(),
+        "deleted": merged.loc[merged["_merge"] == "right_only", ROW_KEY].to_numpy(),
+    }
+
+
+def _to_records(df):
+    """Convert a frame to DB-API friendly dicts (native Python scalars, None for NaN)."""
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+
+def _upsert(conn, table, df):
+    """
+    Insert rows, overwriting existing rows with the same row_key.
+    
+    Args:
+        conn: Open SQLAlchemy connection
+        table (sqlalchemy.Table): Reflected target table
+        df (pd.DataFrame): Rows to write
+    """
+    if conn.dialect.name == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table)
+        stmt = stmt.on_duplicate_key_update(
+            {c.name: stmt.inserted[c.name] for c in table.columns if c.name != ROW_KEY}
         )
-        logger.info(f"Data loaded to {'SQLite' if is_sqlite else 'MySQL'} table: students")
-        
-        # Add index for performance (MySQL only)
-        if not is_sqlite:
-            with eng.connect() as conn:
-                try:
-                    conn.execute(text("ALTER TABLE students ADD INDEX idx_final_result (final_result(10))"))
-                    logger.info("✅ Index added to final_result column")
-                except Exception as e:
-                    logger.warning(f"⚠️ Index may already exist: {e}")
+    else:
+        # DuckDB's dialect derives from PostgreSQL's and shares its ON CONFLICT syntax
+        if conn.dialect.name == "duckdb":
+            from sqlalchemy.dialects.postgresql import insert
         else:
-            # For SQLite, create index differently
-            with eng.connect() as conn:
-                try:
-                    conn.execute(text("CREATE INDEX IF NOT EXISTS idx_final_result ON students(final_result)"))
-                    logger.info("✅ Index added to final_result column in SQLite")
-                except Exception as e:
-                    logger.warning(f"⚠️ SQLite index error: {e}")
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ROW_KEY],
+            set_={c.name: stmt.excluded[c.name] for c in table.columns if c.name != ROW_KEY},
+        )
+    for start in range(0, len(df), BATCH_SIZE):
+        conn.execute(stmt, _to_records(df.iloc[start:start + BATCH_SIZE]))
+
+
+def _delete_keys(conn, table, keys):
+    """Delete the rows whose row_key is in keys."""
+    for start in range(0, len(keys), BATCH_SIZE):
+        batch = [int(k) for k in keys[start:start + BATCH_SIZE]]
+        conn.execute(table.delete().where(table.c[ROW_KEY].in_(batch)))
+
+
+def _read_keys(conn, table, keys):
+    """Read the rows whose row_key is in keys."""
+    frames = [pd.DataFrame(columns=[c.name for c in table.columns])]
+    for start in range(0, len(keys), BATCH_SIZE):
+        batch = [int(k) for k in keys[start:start + BATCH_SIZE]]
+        frames.append(pd.read_sql(table.select().where(table.c[ROW_KEY].in_(batch)), conn))
+    return pd.concat(frames, ignore_index=True)
+
+
+def _create_key_index(eng, table_name, target=None):
+    """
+    Add a unique index on row_key so upserts can target it.
+    
+    Args:
+        eng: SQLAlchemy engine
+        table_name (str): Table to index
+        target (str): Table the index serves once table_name is swapped in (defaults to table_name)
+    """
+    name = index_manager.free_name(eng, f"idx_{target or table_name}_{ROW_KEY}", table_name)
+    with eng.begin() as conn:
+        if eng.dialect.name != "mysql":
+            conn.execute(text(f"CREATE UNIQUE INDEX IF NOT EXISTS {name} ON {table_name}({ROW_KEY})"))
+        else:
+            conn.execute(text(f"ALTER TABLE {table_name} ADD UNIQUE INDEX {name} ({ROW_KEY})"))
+
+
+def _has_incremental_state(eng, columns):
+    """
+    Check whether the database holds a previous incremental load of the same shape.
+    
+    Args:
+        eng: SQLAlchemy engine
+        columns (list): Columns the students table must have
+        
+    Returns:
+        bool: True if the state table exists and students has exactly these columns
+    """
+    insp = inspect(eng)
+    if not insp.has_table("students") or not insp.has_table(ETL_CONFIG["state_table"]):
+        return False
+    loaded = db_utils.table_columns(eng, "students")
+    return sorted(loaded) == sorted(columns)
+
+
+@instrumentation.timed("etl.load_incremental")
+def load_incremental(df, key_columns=None):
+    """
+    Apply only the rows that changed since the previous load.
+    
+    Every row is fingerprinted and compared with the fingerprints saved by
+    the last run. New and changed rows are upserted on row_key, vanished rows
+    are deleted, and the saved fingerprints are updated in the same
+    transaction. The first run (or a run after the schema changed) does a
+    full load. It builds students, the initial fingerprints and the summary
+    in staging tables and swaps them in together.
+    
+    Args:
+        df (pd.DataFrame): Processed dataframe to load
+        key_columns (list): Columns identifying a row across runs (defaults to
+            ETL_CONFIG["key_columns"])
+        
+    Returns:
+        dict: Number of rows "inserted", "updated" and "deleted"
+    """
+    try:
+        eng = get_engine()
+        state_table = ETL_CONFIG["state_table"]
+        
+        state = fingerprint_rows(df, key_columns)
+        df = df.assign(**{ROW_KEY: state[ROW_KEY].to_numpy()})
+        
+        if not _has_incremental_state(eng, list(df.columns)):
+            logger.info("No previous incremental state found, doing a full load")
+            staging = ETL_CONFIG["staging_table"]
+            state_staging = f"{state_table}_staging"
+            # DuckDB cannot rename a table that has an index, so its key
+            # indexes are added after the swap
+            key_after_swap = eng.dialect.name == "duckdb"
+            _write_students(eng, df, "replace", staging)
+            state.to_sql(state_staging, eng, if_exists="replace", index=False, chunksize=BATCH_SIZE)
+            if not key_after_swap:
+                _create_key_index(eng, staging, "students")
+                _create_key_index(eng, state_staging, state_table)
+            _create_indexes(eng, staging)
+            summary_tables.rebuild(eng, summary_tables.aggregate(df), _summary_staging())
+            _swap_in(eng, {
+                staging: "students",
+                state_staging: state_table,
+                _summary_staging(): SUMMARY_CONFIG["table"],
+            })
+            if key_after_swap:
+                _create_key_index(eng, "students")
+                _create_key_index(eng, state_table)
+            _bump_versions(eng)
+            counts = {"inserted": len(df), "updated": 0, "deleted": 0}
+            logger.info(f"✅ Full load completed: {len(df)} rows")
+            return counts
+        
+        previous = pd.read_sql(text(f"SELECT {ROW_KEY}, {ROW_HASH} FROM {state_table}"), eng)
+        changes = diff_rows(state, previous)
+        
+        changed = np.concatenate([changes["inserted"], changes["updated"]])
+        changed_mask = state[ROW_KEY].isin(changed).to_numpy()
+        has_summary = summary_tables.exists(eng)
+        
+        with eng.begin() as conn:
+            students = db_utils.reflect_table(conn, "students")
+            row_state = db_utils.reflect_table(conn, state_table)
+            
+            if has_summary:
+                # Old versions of updated and deleted rows, read before they change
+                replaced = np.concatenate([changes["updated"], changes["deleted"]])
+                old_rows = _read_keys(conn, students, replaced)
+                delta = summary_tables.change_delta(df.loc[changed_mask], old_rows)
+                summary_tables.apply_delta(conn, delta)
+            
+            _upsert(conn, students, df.loc[changed_mask])
+            _delete_keys(conn, students, changes["deleted"])
+            _upsert(conn, row_state, state.loc[changed_mask])
+            _delete_keys(conn, row_state, changes["deleted"])
         
-        logger.info(f"✅ Data successfully loaded to {'SQLite' if is_sqlite else 'MySQL'}")
+        if not has_summary:
+            summary_tables.rebuild(eng, summary_tables.aggregate(df))
+        _bump_versions(eng)
+        
+        counts = {name: len(keys) for name, keys in changes.items()}
+        logger.info(
+            f"✅ Incremental load applied: {counts['inserted']} inserted, "
+            f"{counts['updated']} updated, {counts['deleted']} deleted"
+        )
+        return counts
         
     except Exception as e:
-        logger.error(f"❌ Error loading data to MySQL: {str(e)}")
+        logger.error(f"❌ Error in incremental load: {str(e)}")
         raise
 
 
-def main():
+def run_streaming(chunksize=None, source=None, processed=None, store=None):
+    """
+    Clean and load the source CSV chunk by chunk.
+    
+    Each cleaned chunk is appended to the processed CSV, the columnar store
+    and the staging table before the next one is read, so peak memory is
+    bounded by the chunk size instead of the size of the extract. Summary
+    aggregates are accumulated per chunk. Once every chunk is in, the
+    staging table is indexed, the summary is written beside it, and both
+    replace the live tables in one step. A source without rows replaces
+    them with empty ones. For input that matches the UCI schema the result
+    is identical to clean_data() followed by load_mysql().
+    
+    Args:
+        chunksize (int): Rows per chunk (defaults to ETL_CONFIG["chunksize"])
+        source (str): CSV file to read (defaults to CSV_FILE)
+        processed (str): Processed CSV to write (defaults to PROCESSED)
+        store (str): Columnar store to write (defaults to PROCESSED_STORE_FILE)
+        
+    Returns:
+        int: Number of rows processed
+    """
+    try:
+        processed = processed or PROCESSED
+        eng = get_engine()
+        
+        total = 0
+        summary = []
+        with instrumentation.span("etl.run_streaming") as stream_span, \
+                columnar_store.StoreWriter(store or PROCESSED_STORE_FILE) as store_writer:
+            for i, chunk in enumerate(_at_least_one_chunk(iter_clean_chunks(chunksize, source), source)):
+                stream_span.add_rows(len(chunk))
+                first = i == 0
+                chunk.to_csv(processed, mode='w' if first else 'a', header=first, index=False)
+                store_writer.write(chunk)
+                _write_students(eng, chunk, "replace" if first else "append", ETL_CONFIG["staging_table"])
+                summary = [summary_tables.combine(summary + [summary_tables.aggregate(chunk)])]
+                total += len(chunk)
+                logger.info(f"Chunk {i + 1}: {len(chunk)} rows loaded ({total} total)")
+        
+        _add_row_id(eng, ETL_CONFIG["staging_table"])
+        _create_indexes(eng, ETL_CONFIG["staging_table"])
+        summary_tables.rebuild(eng, summary[0], _summary_staging())
+        _swap_in(eng, {ETL_CONFIG["staging_table"]: "students", _summary_staging(): SUMMARY_CONFIG["table"]})
+        _bump_versions(eng)
+        logger.info(f"✅ Streamed {total} rows → {processed} and {_backend_name(eng)}")
+        
+        return total
+        
+    except Exception as e:
+        logger.error(f"❌ Error in streaming ETL: {str(e)}")
+        raise
+
+
+@instrumentation.timed("etl.main")
+def main(stream=False, chunksize=None, incremental=False, resume=True):
     """
     Main ETL process execution.
+    
+    Args:
+        stream (bool): Process the CSV in bounded chunks instead of in memory
+        chunksize (int): Rows per chunk in streaming mode
+        incremental (bool): Apply only changed rows instead of replacing the table
+        resume (bool): Continue an interrupted full load where it stopped
     """
     try:
         ensure_csv()
-        df = clean_data()
-        load_mysql(df)
-        logger.info(f"🎯 ETL finished successfully. Rows processed: {len(df)}")
+        if stream:
+            rows = run_streaming(chunksize)
+        else:
+            df = clean_data()
+            if incremental:
+                load_incremental(df)
+            else:
+                load_mysql(df, resume=resume)
+            rows = len(df)
+        logger.info(f"🎯 ETL finished successfully. Rows processed: {rows}")
         
     except Exception as e:
         logger.error(f"❌ ETL process failed: {str(e)}")
@@ -138,4 +764,15 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Student performance ETL")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--stream", action="store_true",
+                      help="read, clean and load the CSV in bounded chunks")
+    mode.add_argument("--incremental", action="store_true",
+                      help="load only rows that changed since the last run")
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help=f"rows per chunk in streaming mode (default {ETL_CONFIG['chunksize']})")
+    parser.add_argument("--no-resume", action="store_true",
+                        help="reload every chunk instead of resuming an interrupted load")
+    args = parser.parse_args()
+    main(stream=args.stream, chunksize=args.chunksize, incremental=args.incremental, resume=not args.no_resume)
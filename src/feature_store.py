@@ -0,0 +1,315 @@
+"""
+Feature Store Module
+
+This module turns processed student rows into model feature matrices and
+caches them on disk. A matrix is keyed by the feature set's name and version
+(config.FEATURE_SETS) and by a content fingerprint of the source file. A
+re-run on unchanged data therefore memory-maps the cached float32 arrays
+instead of re-reading and re-encoding the source. The least recently used
+matrices are evicted once the cache exceeds FEATURE_STORE_CONFIG's limits.
+
+Training, evaluation and scoring all compute features through this module,
+so the feature definitions live in one place.
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+from config import FEATURE_SETS, FEATURE_STORE_CONFIG, ML_CONFIG, PROCESSED_FILE, PROCESSED_STORE_FILE
+import columnar_store
+import transforms
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.json"
+FINGERPRINTS_FILE = "fingerprints.json"
+
+# Serializes index updates within the process; across processes the index is
+# replaced atomically and a lost last-used update only affects eviction order
+_LOCK = threading.Lock()
+
+
+def feature_set(name=None):
+    """Return the definition of a feature set (defaults to ML_CONFIG["feature_set"])."""
+    name = name or ML_CONFIG["feature_set"]
+    if name not in FEATURE_SETS:
+        raise ValueError(f"Unknown feature set: {name}")
+    return FEATURE_SETS[name]
+
+
+def feature_columns(name=None):
+    """
+    List the columns of a feature set's matrix, in order.
+
+    Args:
+        name (str): Feature set (defaults to ML_CONFIG["feature_set"])
+
+    Returns:
+        list: Numeric columns, then flags, then one column per categorical value
+    """
+    spec = feature_set(name)
+    columns = list(spec["numeric"]) + list(spec["flags"])
+    for col, values in spec["categorical"].items():
+        columns += [f"{col}_{value}" for value in values]
+    return columns
+
+
+def source_columns(name=None):
+    """List the processed columns a feature set is computed from."""
+    spec = feature_set(name)
+    return list(spec["numeric"]) + list(spec["flags"]) + list(spec["categorical"])
+
+
+def set_for_columns(columns):
+    """
+    Find the feature set whose matrix has exactly these columns.
+
+    Args:
+        columns (list): Feature names, e.g. a model's feature_names_in_
+
+    Returns:
+        str: Feature set name, or None if no set matches
+    """
+    for name in FEATURE_SETS:
+        if feature_columns(name) == list(columns):
+            return name
+    return None
+
+
+def compute_features(df, name=None):
+    """
+    Compute a feature set's matrix from processed rows.
+
+    Args:
+        df (pd.DataFrame): Rows holding source_columns(name)
+        name (str): Feature set (defaults to ML_CONFIG["feature_set"])
+
+    Returns:
+        pd.DataFrame: float32 columns in feature_columns(name) order
+
+    Raises:
+        ValueError: If source columns are missing
+    """
+    spec = feature_set(name)
+    missing = [c for c in source_columns(name) if c not in df.columns]
+    if missing:
+        raise ValueError(f"Missing required features: {missing}")
+
+    parts = {}
+    for col in spec["numeric"]:
+        parts[col] = df[col].to_numpy(dtype=np.float32)
+    for col in spec["flags"]:
+        parts[col] = _category_mask(df[col], lambda values: values.str.lower() == "yes")
+    for col, values in spec["categorical"].items():
+        for value in values:
+            parts[f"{col}_{value}"] = _category_mask(df[col], lambda v, value=value: v == value)
+    return pd.DataFrame(parts, index=df.index)
+
+
+def _category_mask(series, test):
+    """
+    Apply a test to a text column, encoding the result as 0/1 floats.
+
+    The test runs once per distinct value and is spread to the rows through
+    the category codes; missing values encode as 0.
+    """
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype("category")
+    hits = np.append(np.asarray(test(series.cat.categories.astype(str)), dtype=np.float32), np.float32(0))
+    return hits[series.cat.codes.to_numpy()]
+
+
+def default_source():
+    """Return the columnar store if it exists, else the processed CSV."""
+    if columnar_store.store_exists(PROCESSED_STORE_FILE):
+        return PROCESSED_STORE_FILE
+    if os.path.exists(PROCESSED_FILE):
+        return PROCESSED_FILE
+    raise FileNotFoundError(f"Processed data file not found: {PROCESSED_FILE}")
+
+
+def _cache_dir():
+    return FEATURE_STORE_CONFIG["dir"]
+
+
+def _read_json(name):
+    try:
+        with open(os.path.join(_cache_dir(), name)) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _write_json(name, data):
+    os.makedirs(_cache_dir(), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=_cache_dir(), suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, os.path.join(_cache_dir(), name))
+
+
+def fingerprint(path):
+    """
+    Content hash of a source file.
+
+    The hash is remembered against the file's size and modification time,
+    so unchanged files are not re-read.
+
+    Args:
+        path (str): Source file
+
+    Returns:
+        str: Hex digest
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    signature = [stat.st_size, stat.st_mtime_ns]
+    with _LOCK:
+        known = _read_json(FINGERPRINTS_FILE)
+        if path in known and known[path][:2] == signature:
+            return known[path][2]
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    with _LOCK:
+        known = _read_json(FINGERPRINTS_FILE)
+        known[path] = signature + [digest.hexdigest()]
+        _write_json(FINGERPRINTS_FILE, known)
+    return digest.hexdigest()
+
+
+def cache_key(path, name=None):
+    """Return the cache key for a source file and feature set."""
+    name = name or ML_CONFIG["feature_set"]
+    return f"{name}-v{feature_set(name)['version']}-{fingerprint(path)}"
+
+
+def _read_source(path, name):
+    """Load the source columns and target from the store or a CSV."""
+    wanted = source_columns(name) + [ML_CONFIG["target"]]
+    if path.endswith(".parquet"):
+        available = columnar_store.store_columns(path)
+        return columnar_store.read_store([c for c in wanted if c in available], path)
+    return pd.read_csv(path, usecols=lambda c: c in wanted)
+
+
+def _evict(keep):
+    """Drop least recently used entries beyond the configured limits."""
+    index = _read_json(INDEX_FILE)
+    max_bytes = FEATURE_STORE_CONFIG["max_mb"] * 2**20
+    by_age = sorted(index, key=lambda k: index[k]["last_used"])
+    while by_age and (
+        len(index) > FEATURE_STORE_CONFIG["max_entries"]
+        or sum(e["bytes"] for e in index.values()) > max_bytes
+    ):
+        key = by_age.pop(0)
+        if key == keep:
+            continue
+        shutil.rmtree(os.path.join(_cache_dir(), key), ignore_errors=True)
+        del index[key]
+        logger.info(f"Evicted feature matrix {key}")
+    _write_json(INDEX_FILE, index)
+
+
+def _store(key, X, y, path):
+    """Write a matrix to the cache, publishing it with an atomic rename."""
+    os.makedirs(_cache_dir(), exist_ok=True)
+    staging = tempfile.mkdtemp(dir=_cache_dir(), prefix=".building-")
+    np.save(os.path.join(staging, "X.npy"), np.ascontiguousarray(X.to_numpy(dtype=np.float32)))
+    if y is not None:
+        np.save(os.path.join(staging, "y.npy"), y)
+    with open(os.path.join(staging, "meta.json"), "w") as f:
+        json.dump({"columns": list(X.columns), "rows": len(X), "source": os.path.abspath(path)}, f)
+    try:
+        os.rename(staging, os.path.join(_cache_dir(), key))
+    except OSError:
+        # Another process published the same key first
+        shutil.rmtree(staging, ignore_errors=True)
+    size = sum(os.path.getsize(os.path.join(_cache_dir(), key, f)) for f in os.listdir(os.path.join(_cache_dir(), key)))
+    with _LOCK:
+        index = _read_json(INDEX_FILE)
+        index[key] = {"last_used": time.time(), "bytes": size}
+        _write_json(INDEX_FILE, index)
+        _evict(keep=key)
+
+
+def _load(key):
+    """Memory-map a cached matrix, or return None if it is not cached."""
+    entry = os.path.join(_cache_dir(), key)
+    if not os.path.exists(os.path.join(entry, "meta.json")):
+        return None
+    with open(os.path.join(entry, "meta.json")) as f:
+        meta = json.load(f)
+    X = pd.DataFrame(np.load(os.path.join(entry, "X.npy"), mmap_mode="r"), columns=meta["columns"], copy=False)
+    y_path = os.path.join(entry, "y.npy")
+    y = pd.Series(np.load(y_path, mmap_mode="r"), name="target") if os.path.exists(y_path) else None
+    with _LOCK:
+        index = _read_json(INDEX_FILE)
+        index.setdefault(key, {"bytes": 0})["last_used"] = time.time()
+        _write_json(INDEX_FILE, index)
+    return X, y
+
+
+def cached_features(path=None, name=None):
+    """
+    Return a source file's cached feature matrix and target without building them.
+
+    Args:
+        path (str): Processed CSV or columnar store (defaults to default_source())
+        name (str): Feature set (defaults to ML_CONFIG["feature_set"])
+
+    Returns:
+        tuple: (X, y) as from get_features(), or None if the matrix is not cached
+    """
+    return _load(cache_key(path or default_source(), name or ML_CONFIG["feature_set"]))
+
+
+def get_features(path=None, name=None):
+    """
+    Return a source file's feature matrix and target, from the cache if possible.
+
+    Args:
+        path (str): Processed CSV or columnar store (defaults to default_source())
+        name (str): Feature set (defaults to ML_CONFIG["feature_set"])
+
+    Returns:
+        tuple: (X, y) with X a float32 DataFrame of feature_columns(name) and
+        y the encoded target (None if the source has no target column)
+    """
+    try:
+        path = path or default_source()
+        name = name or ML_CONFIG["feature_set"]
+        key = cache_key(path, name)
+        start = time.perf_counter()
+        cached = _load(key)
+        if cached is not None:
+            logger.info(f"✅ Feature cache hit {key} ({len(cached[0])} rows) in {time.perf_counter() - start:.3f}s")
+            return cached
+
+        df = _read_source(path, name)
+        X = compute_features(df, name)
+        target = ML_CONFIG["target"]
+        y = transforms.encode_target(df[target]) if target in df.columns else None
+        _store(key, X, y, path)
+        logger.info(f"Feature cache miss {key}: built {X.shape} from {path} in {time.perf_counter() - start:.3f}s")
+        return X, (pd.Series(y, name="target") if y is not None else None)
+
+    except Exception as e:
+        logger.error(f"❌ Error getting features: {str(e)}")
+        raise
+
+
+def clear_cache():
+    """Remove every cached matrix."""
+    with _LOCK:
+        shutil.rmtree(_cache_dir(), ignore_errors=True)
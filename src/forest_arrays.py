@@ -0,0 +1,200 @@
+"""
+Forest Arrays Module
+
+This module exports a fitted RandomForestClassifier as a directory of flat
+NumPy arrays: the nodes of every tree laid end to end, each node holding a
+feature, a threshold, left/right children and leaf class probabilities. The
+arrays are opened with memory mapping, so loading is near-instant and the
+pages are shared by every process scoring with the same export. The predictor
+reproduces RandomForestClassifier.predict_proba bit for bit. Only NumPy is
+needed to load and score.
+"""
+
+import os
+import json
+import logging
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+META_FILE = "meta.json"
+ARRAYS = ["feature", "threshold", "left", "missing_right", "value"]
+
+# Rows traversed at once; keeps the (rows x trees) node index matrix in cache
+PREDICT_CHUNK = 2048
+
+
+def _breadth_first(tree):
+    """
+    Order a tree's nodes so that every node's two children are adjacent.
+
+    Returns:
+        tuple: (order, position) where order lists old node ids in the new
+        order and position maps old ids to new ones
+    """
+    order = [0]
+    for node in order:
+        if tree.children_left[node] >= 0:
+            order += [tree.children_left[node], tree.children_right[node]]
+    order = np.asarray(order, dtype=np.intp)
+    position = np.empty_like(order)
+    position[order] = np.arange(len(order))
+    return order, position
+
+
+def export_forest(model, path):
+    """
+    Write a fitted forest as flat node arrays.
+
+    Nodes are renumbered breadth-first so that a node's right child directly
+    follows its left child, and child indices are made global (offset by the
+    tree's first node). Leaves get an infinite threshold and point to
+    themselves, so a row that reaches a leaf stays there and every tree can
+    be walked the same number of steps.
+
+    Args:
+        model: Fitted single-output RandomForestClassifier
+        path (str): Directory to write (created if needed)
+    """
+    try:
+        trees = [e.tree_ for e in model.estimators_]
+        offsets = np.cumsum([0] + [t.node_count for t in trees])
+        arrays = {name: [] for name in ARRAYS}
+        for tree, offset in zip(trees, offsets):
+            order, position = _breadth_first(tree)
+            is_leaf = tree.children_left[order] < 0
+            left = position[np.where(is_leaf, order, tree.children_left[order])]
+            arrays["feature"].append(np.where(is_leaf, 0, tree.feature[order]))
+            arrays["threshold"].append(np.where(is_leaf, np.inf, tree.threshold[order]))
+            arrays["left"].append(np.where(is_leaf, np.arange(len(order)), left) + offset)
+            arrays["missing_right"].append(~is_leaf & ~tree.missing_go_to_left[order].astype(bool))
+            # DecisionTreeClassifier.predict_proba returns the leaf's value row as is
+            # (scikit-learn >= 1.4 stores it normalized)
+            arrays["value"].append(tree.value[order, 0, :model.n_classes_])
+
+        os.makedirs(path, exist_ok=True)
+        dtypes = {"feature": np.int64, "left": np.int64}
+        for name, parts in arrays.items():
+            np.save(os.path.join(path, f"{name}.npy"), np.ascontiguousarray(np.concatenate(parts), dtype=dtypes.get(name)))
+        meta = {
+            "format_version": FORMAT_VERSION,
+            "classes": np.asarray(model.classes_).tolist(),
+            "feature_names": list(getattr(model, "feature_names_in_", [])),
+            "n_features": int(model.n_features_in_),
+            "roots": offsets[:-1].tolist(),
+            "max_depth": int(max(t.max_depth for t in trees)),
+        }
+        with open(os.path.join(path, META_FILE), "w") as f:
+            json.dump(meta, f, indent=2)
+        logger.info(f"✅ Exported {len(trees)} trees ({offsets[-1]} nodes) to {path}")
+
+    except Exception as e:
+        logger.error(f"❌ Error exporting forest: {str(e)}")
+        raise
+
+
+def is_export(path):
+    """Return True if path holds a forest written by export_forest()."""
+    return os.path.isfile(os.path.join(path, META_FILE))
+
+
+class CompactForest:
+    """
+    Forest predictor reading the arrays written by export_forest().
+
+    Exposes classes_, feature_names_in_, predict_proba() and predict() like
+    the RandomForestClassifier it was exported from.
+    """
+
+    def __init__(self, path, mmap=True):
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+        if meta["format_version"] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported forest export version: {meta['format_version']}")
+        mode = "r" if mmap else None
+        for name in ARRAYS:
+            # Plain ndarray views of the maps skip np.memmap's per-operation overhead
+            setattr(self, name, np.asarray(np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode)))
+        self.classes_ = np.asarray(meta["classes"])
+        if meta["feature_names"]:
+            self.feature_names_in_ = np.asarray(meta["feature_names"], dtype=object)
+        self.n_features_in_ = meta["n_features"]
+        self.roots = np.asarray(meta["roots"], dtype=np.int64)
+        self.max_depth = meta["max_depth"]
+
+    def _as_matrix(self, X):
+        """
+        Convert X to a float64 matrix of the model's features.
+
+        sklearn casts X to float32 and compares it with float64 thresholds;
+        widening the float32 values to float64 once gives the same comparisons.
+        """
+        if hasattr(X, "columns") and hasattr(self, "feature_names_in_"):
+            X = X[list(self.feature_names_in_)]
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected {self.n_features_in_} features, got shape {X.shape}")
+        return X.astype(np.float64)
+
+    def _leaves(self, X):
+        """Walk every tree for every row at once; return the (rows, trees) leaf indices."""
+        row_start = (np.arange(len(X)) * X.shape[1])[:, None]
+        flat = X.ravel()
+        has_nan = np.isnan(flat).any()
+        node = np.broadcast_to(self.roots, (len(X), len(self.roots))).copy()
+        for _ in range(self.max_depth):
+            x = flat.take(row_start + self.feature.take(node))
+            # Same test as sklearn's tree: go left if x <= threshold, NaNs follow missing_go_to_left
+            go_right = x > self.threshold.take(node)
+            if has_nan:
+                go_right |= np.isnan(x) & self.missing_right.take(node)
+            node = self.left.take(node) + go_right
+        return node
+
+    def predict_proba(self, X):
+        """
+        Class probabilities, identical to RandomForestClassifier.predict_proba.
+
+        Args:
+            X: DataFrame or array of features
+
+        Returns:
+            np.ndarray: (rows, classes) probabilities
+        """
+        X = self._as_matrix(X)
+        proba = np.zeros((len(X), len(self.classes_)), dtype=np.float64)
+        for start in range(0, len(X), PREDICT_CHUNK):
+            leaves = self._leaves(X[start:start + PREDICT_CHUNK])
+            out = proba[start:start + PREDICT_CHUNK]
+            # Trees are summed one at a time in order, as the forest does
+            for t in range(leaves.shape[1]):
+                out += self.value.take(leaves[:, t], axis=0)
+        proba /= len(self.roots)
+        return proba
+
+    def predict(self, X):
+        """Predicted class for each row."""
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def load_forest(path, mmap=True):
+    """
+    Open a forest export.
+
+    Args:
+        path (str): Directory written by export_forest()
+        mmap (bool): Memory-map the arrays instead of reading them into memory
+
+    Returns:
+        CompactForest: The predictor
+    """
+    try:
+        forest = CompactForest(path, mmap)
+        logger.info(f"✅ Forest arrays opened from {path}")
+        return forest
+    except Exception as e:
+        logger.error(f"❌ Error loading forest arrays: {str(e)}")
+        raise
@@ -0,0 +1,221 @@
+"""
+Incremental Training Module
+
+This module trains the pass/fail Random Forest on data too large to hold in
+memory. Feature batches are streamed from the columnar store or the students
+table. Each batch (shard) grows a small forest of its own, and the shards'
+trees are merged into a single RandomForestClassifier, so the result can be
+saved, exported and served like a model trained in one fit.
+
+Rows are held out for validation by a hash of their contents, so a second
+streaming pass finds the same held-out rows without storing them. Metrics
+are accumulated batch by batch in a confusion matrix.
+"""
+
+import copy
+import logging
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sqlalchemy import text
+from config import ML_CONFIG
+from db_utils import get_engine
+import columnar_store
+import feature_store
+import transforms
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+CLASSES = np.array([0, 1])
+
+# Resolution of the hash-based hold-out split
+_HOLDOUT_BUCKETS = 10000
+
+
+class StreamingMetrics:
+    """
+    Classification metrics accumulated one batch at a time.
+
+    Only the confusion matrix is kept, so memory does not grow with the
+    number of validation rows.
+    """
+
+    def __init__(self, classes=CLASSES):
+        self.classes = np.asarray(classes)
+        self.confusion = np.zeros((len(self.classes), len(self.classes)), dtype=np.int64)
+
+    def update(self, y_true, y_pred):
+        """Add a batch of true and predicted labels."""
+        true_idx = np.searchsorted(self.classes, np.asarray(y_true))
+        pred_idx = np.searchsorted(self.classes, np.asarray(y_pred))
+        np.add.at(self.confusion, (true_idx, pred_idx), 1)
+
+    @property
+    def support(self):
+        return self.confusion.sum(axis=1)
+
+    @property
+    def accuracy(self):
+        total = self.confusion.sum()
+        return float(np.trace(self.confusion) / total) if total else 0.0
+
+    def per_class(self):
+        """
+        Precision, recall, F1 and support per class.
+
+        Returns:
+            pd.DataFrame: One row per class, indexed by class label
+        """
+        tp = np.diag(self.confusion).astype(float)
+        predicted = self.confusion.sum(axis=0)
+        precision = np.divide(tp, predicted, out=np.zeros_like(tp), where=predicted > 0)
+        recall = np.divide(tp, self.support, out=np.zeros_like(tp), where=self.support > 0)
+        denominator = precision + recall
+        f1 = np.divide(2 * precision * recall, denominator, out=np.zeros_like(tp), where=denominator > 0)
+        return pd.DataFrame(
+            {"precision": precision, "recall": recall, "f1-score": f1, "support": self.support},
+            index=self.classes,
+        )
+
+
+def holdout_mask(df, test_size=None, seed=None):
+    """
+    Pick validation rows by hashing their contents.
+
+    The same row is always on the same side of the split, wherever and in
+    whichever batch it appears, and duplicate rows never straddle it.
+
+    Args:
+        df (pd.DataFrame): Batch of feature and target columns
+        test_size (float): Fraction to hold out (defaults to ML_CONFIG["test_size"])
+        seed (int): Changes the split (defaults to ML_CONFIG["random_state"])
+
+    Returns:
+        np.ndarray: Boolean mask, True for held-out rows
+    """
+    test_size = ML_CONFIG["test_size"] if test_size is None else test_size
+    seed = ML_CONFIG["random_state"] if seed is None else seed
+    hashes = pd.util.hash_pandas_object(df, index=False, hash_key=f"{seed:016d}"[-16:]).to_numpy()
+    return hashes % _HOLDOUT_BUCKETS < int(test_size * _HOLDOUT_BUCKETS)
+
+
+def iter_batches(source="store", batch_size=None, feature_set=None):
+    """
+    Stream (X, y) batches of model features and target.
+
+    Args:
+        source (str): "store" for the columnar store, "db" for the students table
+        batch_size (int): Rows per batch (defaults to ML_CONFIG["batch_size"])
+        feature_set (str): Feature set (defaults to ML_CONFIG["feature_set"])
+
+    Yields:
+        tuple: (X, y) with X the batch's feature_store.compute_features()
+        matrix and y the encoded target
+    """
+    batch_size = batch_size or ML_CONFIG["batch_size"]
+    columns = feature_store.source_columns(feature_set) + [ML_CONFIG["target"]]
+
+    def split(df):
+        X = feature_store.compute_features(df, feature_set)
+        return X, pd.Series(transforms.encode_target(df[ML_CONFIG["target"]]), index=df.index)
+
+    if source == "store":
+        for df in columnar_store.iter_store(columns, batch_size):
+            yield split(df)
+    elif source == "db":
+        with get_engine().connect().execution_options(stream_results=True) as conn:
+            sql = text(f"SELECT {', '.join(columns)} FROM students")
+            for df in pd.read_sql(sql, conn, chunksize=batch_size):
+                yield split(df)
+    else:
+        raise ValueError(f"Unknown source: {source}")
+
+
+def count_rows(source="store"):
+    """Return the number of rows a source will stream."""
+    if source == "store":
+        return columnar_store.store_rows()
+    with get_engine().connect() as conn:
+        return int(conn.execute(text("SELECT COUNT(*) FROM students")).scalar())
+
+
+def merge_forests(forests):
+    """
+    Combine the trees of forests fit on different shards.
+
+    Args:
+        forests (list): Fitted RandomForestClassifiers with the same classes and features
+
+    Returns:
+        RandomForestClassifier: A forest holding every tree, averaging them as usual
+    """
+    merged = copy.deepcopy(forests[0])
+    merged.estimators_ = [tree for forest in forests for tree in forest.estimators_]
+    merged.n_estimators = len(merged.estimators_)
+    return merged
+
+
+def train_incremental(source="store", batch_size=None, params=None, random_state=None, feature_set=None):
+    """
+    Train a forest shard by shard, then validate it in a second pass.
+
+    Each shard grows enough trees that the merged forest has about
+    params["n_estimators"] trees. A batch missing a class is carried over
+    into the next one so every shard's trees know both classes.
+
+    Args:
+        source (str): "store" or "db" (see iter_batches)
+        batch_size (int): Rows per shard (defaults to ML_CONFIG["batch_size"])
+        params (dict): RandomForestClassifier parameters
+        random_state (int): Seed (defaults to ML_CONFIG["random_state"])
+        feature_set (str): Feature set (defaults to ML_CONFIG["feature_set"])
+
+    Returns:
+        tuple: (model, metrics) the merged forest and its StreamingMetrics
+        on the held-out rows
+    """
+    try:
+        batch_size = batch_size or ML_CONFIG["batch_size"]
+        params = dict(params or {})
+        n_estimators = params.pop("n_estimators", 100)
+        random_state = ML_CONFIG["random_state"] if random_state is None else random_state
+        shards = max(1, -(-count_rows(source) // batch_size))
+        trees_per_shard = max(1, round(n_estimators / shards))
+
+        forests, carry = [], None
+        for X, y in iter_batches(source, batch_size, feature_set):
+            held_out = holdout_mask(X.assign(_y=y.to_numpy()))
+            X_train, y_train = X[~held_out], y[~held_out]
+            if carry is not None:
+                X_train = pd.concat([carry[0], X_train])
+                y_train = pd.concat([carry[1], y_train])
+            if y_train.nunique() < len(CLASSES):
+                carry = (X_train, y_train)
+                continue
+            carry = None
+            forest = RandomForestClassifier(
+                n_estimators=trees_per_shard, random_state=random_state + len(forests), **params
+            )
+            forests.append(forest.fit(X_train, y_train))
+            logger.info(f"Shard {len(forests)}: {len(X_train)} rows, {trees_per_shard} trees")
+        if not forests:
+            raise ValueError("No shard contained both classes")
+        if carry is not None:
+            logger.warning(f"⚠️ Last {len(carry[0])} training rows lacked a class and were not used")
+
+        model = merge_forests(forests)
+        logger.info(f"✅ Merged {len(forests)} shards into {model.n_estimators} trees")
+
+        metrics = StreamingMetrics()
+        for X, y in iter_batches(source, batch_size, feature_set):
+            held_out = holdout_mask(X.assign(_y=y.to_numpy()))
+            if held_out.any():
+                metrics.update(y[held_out], model.predict(X[held_out]))
+        logger.info(f"Validated on {int(metrics.support.sum())} held-out rows")
+        return model, metrics
+
+    except Exception as e:
+        logger.error(f"❌ Error in incremental training: {str(e)}")
+        raise
@@ -0,0 +1,429 @@
+"""
+Index Manager Module
+
+This module derives the students table's secondary indexes from the queries
+actually run against it: the named queries (config.QUERIES and
+query_cache.register()), the Power BI summary scans and the dashboard
+panels.
+
+For each query, the columns it filters on with equality come first in the
+index key. Its GROUP BY columns and range-filter columns follow. The other
+columns it reads are appended, so the index covers the query and the
+database can answer it from the index alone. Indexes implied by a wider one
+are dropped. Managed indexes carry the ix_wl_ prefix. ensure_indexes()
+creates the missing ones and drops those no longer needed. The ETL calls it
+on its staging table after the bulk load, so indexes are built once instead
+of being maintained row by row, and are in place when the table is swapped
+in as students.
+
+tune() also records each query's EXPLAIN plan (and MySQL's cost estimate)
+and best-of-three run time before and after, as a report. On MySQL the table
+can optionally be KEY-partitioned by a column (INDEX_PARTITION_BY). DuckDB
+is skipped, since its column scans gain nothing from these indexes.
+"""
+
+import re
+import json
+import time
+import hashlib
+import argparse
+import logging
+from sqlalchemy import inspect, text
+from sqlalchemy.types import Text
+from config import INDEX_CONFIG
+import dashboard_data
+import db_utils
+import query_cache
+import summary_engine
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+TABLE = "students"
+PREFIX = "ix_wl_"
+
+_CLAUSE_END = r"(?=\bGROUP\s+BY\b|\bORDER\s+BY\b|\bHAVING\b|\bLIMIT\b|;|$)"
+_WHERE = re.compile(r"\bWHERE\b(.*?)" + _CLAUSE_END, re.IGNORECASE | re.DOTALL)
+_GROUP_BY = re.compile(r"\bGROUP\s+BY\b(.*?)(?=\bORDER\s+BY\b|\bHAVING\b|\bLIMIT\b|;|$)", re.IGNORECASE | re.DOTALL)
+_WORD = re.compile(r"\b[A-Za-z_]\w*\b")
+
+
+def workload():
+    """
+    Collect the queries the students table serves.
+
+    Returns:
+        dict: Query name to SQL, for every query reading only the students table
+    """
+    queries = query_cache.registered_queries()
+    for i, scan in enumerate(summary_engine.plan_scans()):
+        queries[f"summary_scan_{i}"] = summary_engine.scan_sql(scan)
+    queries.update(dashboard_data.students_queries())
+    return {name: sql for name, sql in queries.items() if query_cache.tables_in(sql) == [TABLE]}
+
+
+def _columns_in(fragment, columns):
+    """Return the table columns named in an SQL fragment, in order of appearance."""
+    lookup = {c.lower(): c for c in columns}
+    seen = []
+    for word in _WORD.findall(fragment):
+        col = lookup.get(word.lower())
+        if col and col not in seen:
+            seen.append(col)
+    return seen
+
+
+def analyze(sql, columns):
+    """
+    Split the columns a query uses by role.
+
+    Args:
+        sql (str): Query on the students table
+        columns (list): The table's columns
+
+    Returns:
+        dict: "equality", "group_by", "range" and "other" column lists
+    """
+    where = _WHERE.search(sql)
+    where = where.group(1) if where else ""
+    equality = [
+        c for c in _columns_in(where, columns)
+        if re.search(rf"\b{re.escape(c)}\s*(=|IN\b)", where, re.IGNORECASE)
+    ]
+    ranged = [c for c in _columns_in(where, columns) if c not in equality]
+    group = _GROUP_BY.search(sql)
+    group_by = [c for c in _columns_in(group.group(1), columns) if c not in equality] if group else []
+    used = set(equality + group_by + ranged)
+    other = [c for c in _columns_in(sql, columns) if c not in used]
+    return {"equality": equality, "group_by": group_by, "range": ranged, "other": other}
+
+
+def _index_name(cols):
+    name = PREFIX + "_".join(c.lower() for c in cols)
+    if len(name) > 60:
+        digest = hashlib.blake2b(",".join(cols).encode(), digest_size=4).hexdigest()
+        name = f"{name[:51]}_{digest}"
+    return name
+
+
+def free_name(eng, name, table):
+    """
+    Return an index name for a table that no other table's index uses.
+
+    SQLite and DuckDB index names are unique per database, and a staging table keeps
+    its index names when it is renamed over the live table. Each load's
+    staging table therefore alternates between name and name_1.
+
+    Args:
+        eng: SQLAlchemy engine
+        name (str): Preferred name
+        table (str): Table the index is for
+
+    Returns:
+        str: name, or the first free name_<n>
+    """
+    if eng.dialect.name == "mysql":
+        # MySQL index names are per table
+        return name
+    if eng.dialect.name == "duckdb":
+        # duckdb-engine cannot reflect indexes
+        with eng.connect() as conn:
+            taken = {row[0] for row in conn.execute(
+                text("SELECT index_name FROM duckdb_indexes() WHERE table_name <> :t"), {"t": table}
+            )}
+    else:
+        insp = inspect(eng)
+        taken = {
+            ix["name"]
+            for other in insp.get_table_names() if other != table
+            for ix in insp.get_indexes(other)
+        }
+    candidate, n = name, 0
+    while candidate in taken:
+        n += 1
+        candidate = f"{name}_{n}"
+    return candidate
+
+
+def _subsumes(wider, narrower):
+    """True if the wider index serves every query the narrower one does."""
+    key = narrower["key"]
+    return set(wider["key"][:len(key)]) == set(key) and set(narrower["columns"]) <= set(wider["columns"])
+
+
+def recommend(eng, queries=None, table=TABLE):
+    """
+    Derive the index set for a workload.
+
+    Args:
+        eng: SQLAlchemy engine (for the table's columns)
+        queries (dict): Query name to SQL (defaults to workload())
+        table (str): Table holding the students rows (e.g. the ETL's staging table)
+
+    Returns:
+        list: Indexes as dicts with "name", "columns" (in key order), "key"
+        (the leading columns the queries seek or group on) and "queries"
+    """
+    queries = queries if queries is not None else workload()
+    columns = db_utils.table_columns(eng, table)
+    candidates = []
+    for name, sql in queries.items():
+        roles = analyze(sql, columns)
+        key = roles["equality"] + roles["group_by"] + roles["range"]
+        cols = (key + roles["other"])[:INDEX_CONFIG["max_columns"]]
+        if not cols:
+            continue
+        for existing in candidates:
+            if existing["columns"] == cols:
+                existing["queries"].append(name)
+                break
+        else:
+            candidates.append({"columns": cols, "key": key[:len(cols)], "queries": [name]})
+
+    # Widest first, so narrower indexes fold into the ones that serve them
+    candidates.sort(key=lambda c: -len(c["columns"]))
+    indexes = []
+    for candidate in candidates:
+        for kept in indexes:
+            if _subsumes(kept, candidate):
+                kept["queries"] += candidate["queries"]
+                break
+        else:
+            indexes.append(candidate)
+    for index in indexes:
+        index["name"] = _index_name(index["columns"])
+    return indexes
+
+
+def _managed_indexes(eng, table=TABLE):
+    """Return {name: columns} of the ix_wl_ indexes on a table."""
+    return {
+        ix["name"]: ix["column_names"]
+        for ix in inspect(eng).get_indexes(table)
+        if ix["name"] and ix["name"].startswith(PREFIX)
+    }
+
+
+def _create_sql(eng, name, columns, table=TABLE):
+    if eng.dialect.name == "mysql":
+        # TEXT columns (pandas' type for strings) can only be indexed on a prefix
+        text_columns = {c["name"] for c in inspect(eng).get_columns(table) if isinstance(c["type"], Text)}
+        parts = [f"`{c}`({INDEX_CONFIG['text_prefix']})" if c in text_columns else f"`{c}`" for c in columns]
+        return f"CREATE INDEX `{name}` ON `{table}` ({', '.join(parts)})"
+    return f'CREATE INDEX "{name}" ON "{table}" ({", ".join(columns)})'
+
+
+def _drop_sql(eng, name, table=TABLE):
+    if eng.dialect.name == "mysql":
+        return f"DROP INDEX `{name}` ON `{table}`"
+    return f'DROP INDEX IF EXISTS "{name}"'
+
+
+def ensure_indexes(eng, queries=None, dry_run=False, table=TABLE):
+    """
+    Bring the managed indexes in line with the workload.
+
+    Existing indexes are matched to the recommendation by their columns, so
+    a staging table's alternate names (see free_name) are kept too. On
+    MySQL with INDEX_PARTITION_BY set, the table is partitioned first, so
+    the indexes are built on the partitioned table.
+
+    Args:
+        eng: SQLAlchemy engine
+        queries (dict): Query name to SQL (defaults to workload())
+        dry_run (bool): Only report what would change
+        table (str): Table holding the students rows (e.g. the ETL's staging table)
+
+    Returns:
+        dict: "created", "dropped" and "kept" index names
+    """
+    result = {"created": [], "dropped": [], "kept": []}
+    if not INDEX_CONFIG["enabled"] or eng.dialect.name == "duckdb" or not inspect(eng).has_table(table):
+        return result
+    try:
+        wanted = {tuple(ix["columns"]): ix for ix in recommend(eng, queries, table)}
+        existing = _managed_indexes(eng, table)
+        present = set()
+        for name, columns in existing.items():
+            if tuple(columns) in wanted:
+                result["kept"].append(name)
+                present.add(tuple(columns))
+            else:
+                result["dropped"].append(name)
+        missing = [ix for columns, ix in wanted.items() if columns not in present]
+        if dry_run:
+            result["created"] = [ix["name"] for ix in missing]
+            return result
+
+        if INDEX_CONFIG["partition_by"] and eng.dialect.name == "mysql":
+            partition_students(eng, INDEX_CONFIG["partition_by"], table)
+        with eng.begin() as conn:
+            for name in result["dropped"]:
+                conn.execute(text(_drop_sql(eng, name, table)))
+        for ix in missing:
+            result["created"].append(free_name(eng, ix["name"], table))
+        with eng.begin() as conn:
+            for name, ix in zip(result["created"], missing):
+                conn.execute(text(_create_sql(eng, name, ix["columns"], table)))
+            if result["created"] and eng.dialect.name == "sqlite":
+                # Give the planner statistics to choose between the new indexes
+                conn.execute(text(f'ANALYZE "{table}"'))
+        if result["created"] or result["dropped"]:
+            logger.info(f"✅ Indexes on {table}: created {result['created']}, dropped {result['dropped']}")
+        return result
+
+    except Exception as e:
+        logger.error(f"❌ Error maintaining indexes: {str(e)}")
+        raise
+
+
+def partition_students(eng, column, table=TABLE):
+    """
+    KEY-partition a MySQL students table by a column, once.
+
+    One partition is made per distinct value, capped at
+    INDEX_CONFIG["max_partitions"]. MySQL requires every unique index to
+    include the partitioning column, so tables loaded incrementally (unique
+    on row_key) are left alone. A TEXT column is first converted to
+    VARCHAR, since TEXT cannot be a partitioning key.
+
+    Args:
+        eng: SQLAlchemy engine (MySQL)
+        column (str): Column to partition by, e.g. "school"
+        table (str): Table to partition (the ETL's staging table during loads)
+
+    Returns:
+        bool: True if the table was partitioned by this call
+    """
+    with eng.begin() as conn:
+        partitioned = conn.execute(text(
+            "SELECT COUNT(*) FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t AND PARTITION_NAME IS NOT NULL"
+        ), {"t": table}).scalar()
+        if partitioned:
+            return False
+        unique = [ix for ix in inspect(conn).get_indexes(table) if ix["unique"] and column not in ix["column_names"]]
+        if unique:
+            logger.warning(f"⚠️ Not partitioning {table} by {column}: unique index {unique[0]['name']} lacks it")
+            return False
+        col_type = next(c["type"] for c in inspect(conn).get_columns(table) if c["name"] == column)
+        if isinstance(col_type, Text):
+            conn.execute(text(f"ALTER TABLE `{table}` MODIFY `{column}` VARCHAR(64)"))
+        values = conn.execute(text(f"SELECT COUNT(DISTINCT `{column}`) FROM `{table}`")).scalar() or 1
+        partitions = max(2, min(int(values), INDEX_CONFIG["max_partitions"]))
+        conn.execute(text(f"ALTER TABLE `{table}` PARTITION BY KEY(`{column}`) PARTITIONS {partitions}"))
+    logger.info(f"✅ {table} partitioned by {column} into {partitions} partitions")
+    return True
+
+
+def _walk(node):
+    """Yield every dict nested in a MySQL JSON plan."""
+    if isinstance(node, dict):
+        yield node
+        for value in node.values():
+            yield from _walk(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _walk(value)
+
+
+def explain(eng, sql):
+    """
+    Describe how the database would run a query.
+
+    Args:
+        eng: SQLAlchemy engine
+        sql (str): Query
+
+    Returns:
+        dict: "plan" (text), "cost" (MySQL's estimate, else None) and
+        "full_scan" (True if the table itself is scanned)
+    """
+    sql = sql.strip().rstrip(";")
+    with eng.connect() as conn:
+        if eng.dialect.name == "mysql":
+            plan = json.loads(conn.execute(text(f"EXPLAIN FORMAT=JSON {sql}")).scalar())
+            tables = [n["table"] for n in _walk(plan) if isinstance(n.get("table"), dict)]
+            cost = plan.get("query_block", {}).get("cost_info", {}).get("query_cost")
+            return {
+                "plan": "; ".join(f"{t.get('table_name')}: {t.get('access_type')} {t.get('key') or ''}".strip() for t in tables),
+                "cost": float(cost) if cost is not None else None,
+                "full_scan": any(t.get("access_type") == "ALL" for t in tables),
+            }
+        if eng.dialect.name == "sqlite":
+            details = [row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+            return {
+                "plan": "; ".join(details),
+                "cost": None,
+                "full_scan": any(d.startswith("SCAN") and "INDEX" not in d for d in details),
+            }
+        rows = conn.execute(text(f"EXPLAIN {sql}")).fetchall()
+        return {"plan": " ".join(str(r[-1]) for r in rows), "cost": None, "full_scan": None}
+
+
+def _best_time(eng, sql, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with eng.connect() as conn:
+            conn.execute(text(sql)).fetchall()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def _measure(eng, queries):
+    return {name: dict(explain(eng, sql), seconds=round(_best_time(eng, sql), 5)) for name, sql in queries.items()}
+
+
+def tune(eng=None, dry_run=False, report_path=None):
+    """
+    Apply the workload's indexes and report each query before and after.
+
+    Args:
+        eng: SQLAlchemy engine (defaults to db_utils.get_engine())
+        dry_run (bool): Report the planned changes without applying them
+        report_path (str): JSON report file (defaults to INDEX_CONFIG["report"])
+
+    Returns:
+        dict: "changes" (see ensure_indexes), "indexes" (see recommend) and
+        "queries", mapping each query to its "before" and "after" measurements
+    """
+    try:
+        eng = eng or db_utils.get_engine()
+        queries = workload()
+        before = _measure(eng, queries)
+        changes = ensure_indexes(eng, queries, dry_run=dry_run)
+        after = before if dry_run else _measure(eng, queries)
+        report = {
+            "backend": eng.dialect.name,
+            "changes": changes,
+            "indexes": recommend(eng, queries),
+            "queries": {name: {"before": before[name], "after": after[name]} for name in queries},
+        }
+        path = report_path or INDEX_CONFIG["report"]
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"✅ Index report written to {path}")
+        return report
+
+    except Exception as e:
+        logger.error(f"❌ Error tuning indexes: {str(e)}")
+        raise
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create the students indexes the query workload needs")
+    parser.add_argument("--dry-run", action="store_true", help="show the changes without applying them")
+    parser.add_argument("--report", help="JSON report path")
+    args = parser.parse_args()
+    result = tune(dry_run=args.dry_run, report_path=args.report)
+    for index in result["indexes"]:
+        print(f"{index['name']}: ({', '.join(index['columns'])}) for {', '.join(index['queries'])}")
+    print(f"\ncreated {result['changes']['created']}, dropped {result['changes']['dropped']}")
+    for name, m in result["queries"].items():
+        b, a = m["before"], m["after"]
+        cost = f", cost {b['cost']} → {a['cost']}" if b["cost"] is not None else ""
+        print(f"{name}: {b['seconds'] * 1000:.1f} ms → {a['seconds'] * 1000:.1f} ms{cost}")
+        print(f"    before: {b['plan']}\n    after:  {a['plan']}")
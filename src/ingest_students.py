@@ -0,0 +1,149 @@
+"""
+Student Performance Ingestion Module
+
+This module ingests a drop directory of per-school / per-term CSV extracts.
+Files are parsed and cleaned in parallel on a process pool, tagged with their
+source file and merged into a single frame for one load. A file that fails is
+reported and skipped instead of aborting the batch.
+"""
+
+import os
+import glob
+import argparse
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+from config import ETL_CONFIG
+import etl_students
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+SOURCE_COLUMN = "source_file"
+
+
+def discover_files(drop_dir=None, pattern=None):
+    """
+    List the extracts waiting in the drop directory.
+
+    Args:
+        drop_dir (str): Directory to scan (defaults to ETL_CONFIG["drop_dir"])
+        pattern (str): Glob pattern (defaults to ETL_CONFIG["file_pattern"])
+
+    Returns:
+        list: Matching file paths, sorted by name
+    """
+    drop_dir = drop_dir or ETL_CONFIG["drop_dir"]
+    pattern = pattern or ETL_CONFIG["file_pattern"]
+    return sorted(p for p in glob.glob(os.path.join(drop_dir, pattern)) if os.path.isfile(p))
+
+
+def clean_file(path):
+    """
+    Parse and clean one extract, tagging each row with its file name.
+
+    Runs inside a worker process.
+
+    Args:
+        path (str): CSV file to read
+
+    Returns:
+        pd.DataFrame: Cleaned rows with a source_file column
+    """
+    df = etl_students.transform_frame(pd.read_csv(path, sep=';'))
+    df[SOURCE_COLUMN] = os.path.basename(path)
+    return df
+
+
+def ingest_files(paths, workers=None):
+    """
+    Clean many extracts in parallel and merge them.
+
+    Args:
+        paths (list): CSV files to ingest
+        workers (int): Worker processes (defaults to ETL_CONFIG["workers"],
+            0 meaning one per CPU core)
+
+    Returns:
+        tuple: (df, failures) merged frame in file order, and a dict mapping
+        each file that could not be ingested to its error message
+
+    Raises:
+        RuntimeError: If no file could be ingested
+    """
+    workers = workers if workers is not None else ETL_CONFIG["workers"]
+    workers = min(workers or os.cpu_count() or 1, max(len(paths), 1))
+
+    frames = {}
+    failures = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(clean_file, path): path for path in paths}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                frames[path] = future.result()
+                logger.info(f"Cleaned {len(frames[path])} rows from {path}")
+            except Exception as e:
+                failures[path] = str(e)
+                logger.error(f"❌ Skipping {path}: {str(e)}")
+
+    if not frames:
+        raise RuntimeError(f"None of the {len(paths)} files could be ingested")
+
+    df = pd.concat([frames[p] for p in paths if p in frames], ignore_index=True)
+    df[SOURCE_COLUMN] = df[SOURCE_COLUMN].astype("category")
+    logger.info(
+        f"✅ Ingested {len(df)} rows from {len(frames)} files with {workers} workers"
+        f" ({len(failures)} failed)"
+    )
+    return df, failures
+
+
+def main(drop_dir=None, pattern=None, workers=None, incremental=False):
+    """
+    Ingest the drop directory and load the merged rows in one pass.
+
+    Args:
+        drop_dir (str): Directory to scan
+        pattern (str): Glob pattern for extracts
+        workers (int): Worker processes
+        incremental (bool): Apply only changed rows instead of replacing the table
+
+    Returns:
+        dict: Files that failed, mapped to their error message
+    """
+    try:
+        paths = discover_files(drop_dir, pattern)
+        if not paths:
+            raise FileNotFoundError(f"No files matching {pattern or ETL_CONFIG['file_pattern']} "
+                                    f"in {drop_dir or ETL_CONFIG['drop_dir']}")
+        logger.info(f"Found {len(paths)} files to ingest")
+
+        df, failures = ingest_files(paths, workers)
+        etl_students.save_processed(df)
+        if incremental:
+            etl_students.load_incremental(df)
+        else:
+            etl_students.load_mysql(df)
+
+        logger.info(f"🎯 Ingestion finished. Rows processed: {len(df)}, failed files: {len(failures)}")
+        return failures
+
+    except Exception as e:
+        logger.error(f"❌ Ingestion failed: {str(e)}")
+        raise
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest a directory of student extracts")
+    parser.add_argument("--drop-dir", default=None,
+                        help=f"directory to scan (default {ETL_CONFIG['drop_dir']})")
+    parser.add_argument("--pattern", default=None,
+                        help=f"glob pattern for extracts (default {ETL_CONFIG['file_pattern']})")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default one per CPU core)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="load only rows that changed since the last run")
+    args = parser.parse_args()
+    main(args.drop_dir, args.pattern, args.workers, args.incremental)
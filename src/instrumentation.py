@@ -0,0 +1,323 @@
+"""
+Instrumentation Module
+
+This module records where the pipeline spends its time. Code marks stages
+and sub-steps with span() (or the timed() decorator). Each span aggregates
+its call count, total and maximum seconds, the rows it processed (and so
+rows/sec) and the peak resident memory seen while it was open. Engines from
+db_utils report per-statement query timings through SQLAlchemy events.
+
+Metrics are off unless METRICS_ENABLED is set. Disabled spans return a
+shared no-op object, so instrumented code pays one flag check per call.
+When enabled, the metrics are written at process exit as JSON or in the
+Prometheus text format (METRICS_FORMAT) for a local scraper to read.
+"""
+
+import os
+import sys
+import json
+import time
+import atexit
+import logging
+import tempfile
+import threading
+import functools
+from config import DATA_DIR, METRICS_CONFIG
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+PREFIX = "student_analytics"
+
+_LOCK = threading.Lock()
+_SPANS = {}
+_QUERIES = {}
+_ACTIVE = set()
+_SAMPLER = None
+_EXIT_HOOK = False
+
+
+def enabled():
+    """Return True if metrics are being recorded."""
+    return METRICS_CONFIG["enabled"]
+
+
+def current_rss():
+    """
+    Resident memory of this process in bytes.
+
+    Returns:
+        int: Current RSS on Linux, peak RSS on other Unix systems, or None
+        where neither is available
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        return None
+
+
+class _NullSpan:
+    """Span returned while metrics are disabled; every method does nothing."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def add_rows(self, n):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """
+    A timed region of code.
+
+    Use as a context manager; call add_rows() with the number of rows the
+    region handled so the aggregate reports throughput.
+    """
+
+    def __init__(self, name, rows=0):
+        self.name = name
+        self.rows = rows
+        self.peak_rss = None
+
+    def add_rows(self, n):
+        self.rows += int(n)
+
+    def sample(self, rss):
+        if rss is not None and (self.peak_rss is None or rss > self.peak_rss):
+            self.peak_rss = rss
+
+    def __enter__(self):
+        self.sample(current_rss())
+        with _LOCK:
+            _ACTIVE.add(self)
+        _ensure_sampler()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        self.sample(current_rss())
+        with _LOCK:
+            _ACTIVE.discard(self)
+            stats = _SPANS.setdefault(self.name, {
+                "calls": 0, "errors": 0, "seconds": 0.0, "max_seconds": 0.0, "rows": 0, "peak_rss": None,
+            })
+            stats["calls"] += 1
+            stats["errors"] += exc_type is not None
+            stats["seconds"] += elapsed
+            stats["max_seconds"] = max(stats["max_seconds"], elapsed)
+            stats["rows"] += self.rows
+            if self.peak_rss is not None:
+                stats["peak_rss"] = max(stats["peak_rss"] or 0, self.peak_rss)
+        return False
+
+
+def span(name, rows=0):
+    """
+    Time a block of code under a metric name.
+
+    Args:
+        name (str): Dotted span name, e.g. "etl.load_mysql"
+        rows (int): Rows handled, if known up front (see Span.add_rows)
+
+    Returns:
+        Span: Context manager (a no-op one when metrics are disabled)
+    """
+    if not METRICS_CONFIG["enabled"]:
+        return _NULL_SPAN
+    return Span(name, rows)
+
+
+def timed(name):
+    """
+    Decorator that wraps every call of a function in span(name).
+
+    Args:
+        name (str): Span name
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not METRICS_CONFIG["enabled"]:
+                return func(*args, **kwargs)
+            with Span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _sample_loop():
+    while True:
+        time.sleep(METRICS_CONFIG["sample_interval"])
+        with _LOCK:
+            active = list(_ACTIVE)
+        if active:
+            rss = current_rss()
+            for s in active:
+                s.sample(rss)
+
+
+def _ensure_sampler():
+    """Start the memory sampler and the exit hook on first use."""
+    global _SAMPLER, _EXIT_HOOK
+    if _SAMPLER is not None:
+        return
+    with _LOCK:
+        if _SAMPLER is None:
+            _SAMPLER = threading.Thread(target=_sample_loop, name="metrics-sampler", daemon=True)
+            _SAMPLER.start()
+        if not _EXIT_HOOK:
+            atexit.register(_write_at_exit)
+            _EXIT_HOOK = True
+
+
+def _statement_kind(statement):
+    words = statement.lstrip().split(None, 1)
+    return words[0].lower() if words else "unknown"
+
+
+def instrument_engine(engine):
+    """
+    Record the time of every statement an engine executes.
+
+    Timings are aggregated by statement kind (select, insert, ...). The
+    listeners return immediately while metrics are disabled.
+
+    Args:
+        engine: SQLAlchemy engine
+    """
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if METRICS_CONFIG["enabled"]:
+            conn.info.setdefault("_metrics_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("_metrics_start")
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        kind = _statement_kind(statement)
+        with _LOCK:
+            stats = _QUERIES.setdefault(kind, {"calls": 0, "seconds": 0.0, "max_seconds": 0.0})
+            stats["calls"] += 1
+            stats["seconds"] += elapsed
+            stats["max_seconds"] = max(stats["max_seconds"], elapsed)
+        _ensure_sampler()
+
+
+def snapshot():
+    """
+    Return the metrics recorded so far.
+
+    Returns:
+        dict: "spans" maps span names to calls, errors, seconds, max_seconds,
+        rows, rows_per_s and peak_rss; "queries" maps statement kinds to
+        calls, seconds and max_seconds
+    """
+    with _LOCK:
+        spans = {name: dict(stats) for name, stats in _SPANS.items()}
+        queries = {kind: dict(stats) for kind, stats in _QUERIES.items()}
+    for stats in spans.values():
+        stats["rows_per_s"] = round(stats["rows"] / stats["seconds"], 1) if stats["rows"] and stats["seconds"] else None
+    return {"pid": os.getpid(), "timestamp": time.time(), "spans": spans, "queries": queries}
+
+
+def reset():
+    """Forget every recorded metric."""
+    with _LOCK:
+        _SPANS.clear()
+        _QUERIES.clear()
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def to_prometheus(data=None):
+    """
+    Render metrics in the Prometheus text exposition format.
+
+    Args:
+        data (dict): A snapshot() (defaults to the current metrics)
+
+    Returns:
+        str: Exposition text
+    """
+    data = data or snapshot()
+    families = [
+        ("span_calls_total", "counter", "Times the span was entered", "spans", "span", "calls"),
+        ("span_errors_total", "counter", "Times the span exited with an exception", "spans", "span", "errors"),
+        ("span_seconds_total", "counter", "Total seconds spent in the span", "spans", "span", "seconds"),
+        ("span_max_seconds", "gauge", "Longest single call of the span", "spans", "span", "max_seconds"),
+        ("span_rows_total", "counter", "Rows processed inside the span", "spans", "span", "rows"),
+        ("span_peak_rss_bytes", "gauge", "Peak resident memory while the span was open", "spans", "span", "peak_rss"),
+        ("db_query_calls_total", "counter", "Statements executed", "queries", "kind", "calls"),
+        ("db_query_seconds_total", "counter", "Total statement execution seconds", "queries", "kind", "seconds"),
+        ("db_query_max_seconds", "gauge", "Slowest statement", "queries", "kind", "max_seconds"),
+    ]
+    lines = []
+    for metric, kind, help_text, section, label, field in families:
+        name = f"{PREFIX}_{metric}"
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        for key, stats in sorted(data[section].items()):
+            if stats.get(field) is not None:
+                lines.append(f'{name}{{{label}="{_label(key)}"}} {stats[field]}')
+    return "\n".join(lines) + "\n"
+
+
+def default_path(fmt=None):
+    """Return the metrics file path for a format."""
+    fmt = fmt or METRICS_CONFIG["format"]
+    return METRICS_CONFIG["path"] or os.path.join(DATA_DIR, "metrics.prom" if fmt == "prometheus" else "metrics.json")
+
+
+def write_metrics(path=None, fmt=None):
+    """
+    Write the current metrics to a file, replacing it atomically.
+
+    Args:
+        path (str): Output file (defaults to default_path())
+        fmt (str): "json" or "prometheus" (defaults to METRICS_CONFIG["format"])
+
+    Returns:
+        str: The path written
+    """
+    fmt = fmt or METRICS_CONFIG["format"]
+    if fmt not in ("json", "prometheus"):
+        raise ValueError(f"Unknown metrics format: {fmt}")
+    path = path or default_path(fmt)
+    body = to_prometheus() if fmt == "prometheus" else json.dumps(snapshot(), indent=2)
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        f.write(body)
+    os.replace(tmp, path)
+    return path
+
+
+def _write_at_exit():
+    if not METRICS_CONFIG["enabled"]:
+        return
+    try:
+        path = write_metrics()
+        logger.info(f"📊 Metrics written to {path}")
+    except Exception as e:
+        logger.error(f"❌ Error writing metrics: {str(e)}")
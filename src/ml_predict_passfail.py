@@ -6,12 +6,18 @@ based on academic and behavioral features.
 """
 
 import os
+import argparse
 import logging
-import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
 import joblib
+from config import FEATURE_SETS
+import feature_store
+import forest_arrays
+import incremental_training
+import instrumentation
+import model_search
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -21,38 +27,40 @@ logger = logging.getLogger(__name__)
 ROOT = os.path.join(os.path.dirname(__file__), "..")
 DATA_DIR = os.path.join(ROOT, "data")
 MODEL_FILE = os.path.join(DATA_DIR, "passfail_model.pkl")
-PROCESSED_FILE = os.path.join(DATA_DIR, "students_processed.csv")
+MODEL_ARRAYS_DIR = os.path.join(DATA_DIR, "passfail_model_arrays")
 
-# Feature selection based on domain knowledge and correlation analysis
-FEATURES = ['studytime', 'failures', 'absences', 'G1', 'G2']
+# Random Forest parameters used when no search is run
+DEFAULT_PARAMS = {
+    'n_estimators': 100,
+    'max_depth': 10,
+    'min_samples_split': 5,
+    'min_samples_leaf': 2,
+}
 
 
-def load_data():
+def load_data(feature_set=None):
     """
-    Load and prepare the processed dataset.
+    Load the feature matrix and target from the feature store.
+    
+    The matrix is read from the feature cache when the processed data and
+    the feature set are unchanged, and computed from the columnar store (or
+    the processed CSV) otherwise.
+    
+    Args:
+        feature_set (str): Feature set name (defaults to ML_CONFIG["feature_set"])
     
     Returns:
         tuple: (X, y) feature matrix and target vector
     """
     try:
-        if not os.path.exists(PROCESSED_FILE):
-            raise FileNotFoundError(f"Processed data file not found: {PROCESSED_FILE}")
-        
-        df = pd.read_csv(PROCESSED_FILE)
-        logger.info(f"Loaded dataset with {len(df)} rows and {len(df.columns)} columns")
-        
-        # Convert pass/fail text to binary target
-        df['target'] = df['final_result'].apply(lambda x: 1 if x == 'pass' else 0)
+        with instrumentation.span("ml.load_data") as s:
+            X, y = feature_store.get_features(name=feature_set)
+            s.add_rows(len(X))
+        if y is None:
+            raise ValueError("Processed data has no final_result column")
         
-        # Check if all required features exist
-        missing_features = [f for f in FEATURES if f not in df.columns]
-        if missing_features:
-            raise ValueError(f"Missing required features: {missing_features}")
-        
-        X = df[FEATURES]
-        y = df['target']
-        
-        logger.info(f"Selected features: {FEATURES}")
+        logger.info(f"Loaded dataset with {len(X)} rows")
+        logger.info(f"Selected features: {list(X.columns)}")
         logger.info(f"Target distribution: {y.value_counts().to_dict()}")
         
         return X, y
@@ -62,13 +70,15 @@ def load_data():
         raise
 
 
-def train_model(X, y):
+def train_model(X, y, search=False):
     """
     Train the Random Forest classifier.
     
     Args:
         X: Feature matrix
         y: Target vector
+        search (bool): Choose parameters with a cross-validated halving
+            search on the training set instead of using DEFAULT_PARAMS
         
     Returns:
         tuple: (model, X_test, y_test, y_pred) trained model and test results
@@ -82,20 +92,22 @@ def train_model(X, y):
         logger.info(f"Training set: {X_train.shape[0]} samples")
         logger.info(f"Test set: {X_test.shape[0]} samples")
         
+        if search:
+            with instrumentation.span("ml.search", rows=len(X_train)):
+                params, _ = model_search.search(X_train, y_train)
+        else:
+            params = DEFAULT_PARAMS
+        
         # Train model
-        model = RandomForestClassifier(
-            n_estimators=100,
-            random_state=42,
-            max_depth=10,
-            min_samples_split=5,
-            min_samples_leaf=2
-        )
+        model = RandomForestClassifier(random_state=42, **params)
         
-        model.fit(X_train, y_train)
+        with instrumentation.span("ml.fit", rows=len(X_train)):
+            model.fit(X_train, y_train)
         logger.info("✅ Model training completed")
         
         # Make predictions
-        y_pred = model.predict(X_test)
+        with instrumentation.span("ml.predict", rows=len(X_test)):
+            y_pred = model.predict(X_test)
         
         return model, X_test, y_test, y_pred
         
@@ -134,10 +146,48 @@ def evaluate_model(y_test, y_pred):
         raise
 
 
+def evaluate_streaming(metrics):
+    """
+    Display results accumulated by incremental training.
+    
+    Prints the same report as evaluate_model, computed from the streamed
+    confusion matrix instead of the full test set.
+    
+    Args:
+        metrics: incremental_training.StreamingMetrics for the held-out rows
+        
+    Returns:
+        float: Accuracy
+    """
+    try:
+        accuracy = metrics.accuracy
+        logger.info(f"Model Accuracy: {accuracy:.4f}")
+        
+        print(f"\n{'='*50}")
+        print("MODEL EVALUATION RESULTS")
+        print(f"{'='*50}")
+        print(f"Accuracy: {accuracy:.4f}")
+        print(f"\nClassification Report:")
+        print(metrics.per_class().round(2).to_string())
+        
+        print(f"\nConfusion Matrix:")
+        print(metrics.confusion)
+        
+        return accuracy
+        
+    except Exception as e:
+        logger.error(f"❌ Error evaluating model: {str(e)}")
+        raise
+
+
+@instrumentation.timed("ml.save_model")
 def save_model(model):
     """
     Save the trained model to disk.
     
+    The joblib pickle is written along with a flat-array export of the
+    forest, which scoring processes can memory-map instead of unpickling.
+    
     Args:
         model: Trained model to save
     """
@@ -148,27 +198,43 @@ def save_model(model):
         # Save model
         joblib.dump(model, MODEL_FILE)
         logger.info(f"✅ Model saved to {MODEL_FILE}")
+        forest_arrays.export_forest(model, MODEL_ARRAYS_DIR)
         
     except Exception as e:
         logger.error(f"❌ Error saving model: {str(e)}")
         raise
 
 
-def main():
+def main(search=False, incremental=False, source="store", batch_size=None, feature_set=None):
     """
     Main machine learning pipeline execution.
+    
+    Args:
+        search (bool): Tune the model's parameters before the final fit
+        incremental (bool): Stream the data in shards instead of loading it
+        source (str): Incremental data source, "store" or "db"
+        batch_size (int): Rows per shard in incremental mode
+        feature_set (str): Feature set to train on (defaults to ML_CONFIG["feature_set"])
     """
     try:
         logger.info("🚀 Starting ML pipeline...")
         
-        # Load data
-        X, y = load_data()
-        
-        # Train model
-        model, X_test, y_test, y_pred = train_model(X, y)
-        
-        # Evaluate model
-        accuracy = evaluate_model(y_test, y_pred)
+        if incremental:
+            # Train shard by shard and validate in a second streaming pass
+            with instrumentation.span("ml.train_incremental"):
+                model, metrics = incremental_training.train_incremental(
+                    source, batch_size, DEFAULT_PARAMS, feature_set=feature_set
+                )
+            accuracy = evaluate_streaming(metrics)
+        else:
+            # Load data
+            X, y = load_data(feature_set)
+            
+            # Train model
+            model, X_test, y_test, y_pred = train_model(X, y, search=search)
+            
+            # Evaluate model
+            accuracy = evaluate_model(y_test, y_pred)
         
         # Save model
         save_model(model)
@@ -181,4 +247,18 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Train the student pass/fail model")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--search", action="store_true",
+                      help="run a cross-validated successive-halving search before the final fit")
+    mode.add_argument("--incremental", action="store_true",
+                      help="train out of core, one shard of rows at a time")
+    parser.add_argument("--source", choices=["store", "db"], default="store",
+                        help="where --incremental streams rows from")
+    parser.add_argument("--batch-size", type=int, default=None,
+                        help="rows per shard for --incremental")
+    parser.add_argument("--feature-set", choices=sorted(FEATURE_SETS), default=None,
+                        help="feature set from config.FEATURE_SETS")
+    args = parser.parse_args()
+    main(search=args.search, incremental=args.incremental, source=args.source,
+         batch_size=args.batch_size, feature_set=args.feature_set)
@@ -0,0 +1,284 @@
+"""
+OLAP Cube Module
+
+This module answers filter and group-by questions about the students table
+from memory, for the dashboard's interactive slicing.
+
+The cube is built from the students table in one chunked read. Rows are
+collapsed to cells, one per distinct combination of the dimension values,
+with additive measures per cell: student count, pass count, and the sum and
+sum of squares of G3. Every dimension is dictionary-encoded, and each of its
+values gets a bitmap of the cells holding it. A filter is answered by OR-ing
+the bitmaps of the selected values within a dimension and AND-ing across
+dimensions. The selected cells' measures are then summed per group, which
+gives counts, pass rates, means and standard deviations for any filter and
+breakdown without touching the database.
+"""
+
+import logging
+import threading
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from config import CUBE_CONFIG
+import db_utils
+import instrumentation
+import query_cache
+import transforms
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Per-cell measures; all of them add up across cells
+MEASURES = ["n", "pass_n", "g3_sum", "g3_sq"]
+
+# Guards the cache dicts; builds hold only their database's entry in _BUILDS
+# so one slow build does not block cubes for other databases
+_LOCK = threading.Lock()
+_CUBES = {}
+_BUILDS = {}
+
+
+def _bitmap(flags):
+    """Pack a boolean array into little-endian uint64 words."""
+    packed = np.packbits(flags, bitorder="little")
+    padded = np.zeros(-(-len(packed) // 8) * 8, dtype=np.uint8)
+    padded[:len(packed)] = packed
+    return padded.view(np.uint64)
+
+
+class Cube:
+    """
+    Cells of the students table with bitmap indexes on every dimension.
+
+    Args:
+        vocab (dict): Dimension name to its sorted distinct values
+        codes (dict): Dimension name to each cell's index into vocab
+        measures (dict): Measure name to each cell's value
+    """
+
+    def __init__(self, vocab, codes, measures):
+        self.vocab = vocab
+        self.codes = codes
+        self.measures = measures
+        self.cells = len(measures["n"])
+        self.rows = int(measures["n"].sum())
+        self.words = -(-self.cells // 64)
+        self.bitmaps = {
+            dim: np.stack([_bitmap(codes[dim] == i) for i in range(len(values))])
+            if len(values) else np.zeros((0, self.words), dtype=np.uint64)
+            for dim, values in vocab.items()
+        }
+
+    @property
+    def dimensions(self):
+        return list(self.vocab)
+
+    def values(self, dim):
+        """Return the distinct values of a dimension, sorted."""
+        return list(self.vocab[dim])
+
+    def mask(self, filters=None):
+        """
+        Build the bitmap of cells matching a filter.
+
+        Args:
+            filters (dict): Dimension to a value or list of accepted values;
+                empty lists and None mean no restriction
+
+        Returns:
+            np.ndarray: uint64 bitmap words, or None when nothing is filtered
+
+        Raises:
+            KeyError: If a filter names a dimension the cube does not have
+        """
+        result = None
+        for dim, accepted in (filters or {}).items():
+            if dim not in self.vocab:
+                raise KeyError(f"Unknown cube dimension: {dim}")
+            if accepted is None:
+                continue
+            if not isinstance(accepted, (list, tuple, set)):
+                accepted = [accepted]
+            if not accepted:
+                continue
+            index = pd.Index(self.vocab[dim]).get_indexer(list(accepted))
+            rows = self.bitmaps[dim][index[index >= 0]]
+            bits = np.bitwise_or.reduce(rows, axis=0) if len(rows) else np.zeros(self.words, dtype=np.uint64)
+            result = bits if result is None else result & bits
+        return result
+
+    def _selected(self, filters):
+        bits = self.mask(filters)
+        if bits is None:
+            return slice(None)
+        return np.flatnonzero(np.unpackbits(bits.view(np.uint8), count=self.cells, bitorder="little"))
+
+    def query(self, filters=None, group_by=None):
+        """
+        Aggregate the students matching a filter, optionally per group.
+
+        Args:
+            filters (dict): See mask()
+            group_by (list): Dimensions to break the result down by
+
+        Returns:
+            pd.DataFrame: group_by columns plus n, passed, pass_rate (percent),
+            G3_mean and G3_std (population); one row per non-empty group, or a
+            single totals row without group_by
+        """
+        group_by = list(group_by or [])
+        for dim in group_by:
+            if dim not in self.vocab:
+                raise KeyError(f"Unknown cube dimension: {dim}")
+        selected = self._selected(filters)
+        values = {m: self.measures[m][selected] for m in MEASURES}
+
+        if group_by:
+            sizes = [len(self.vocab[d]) for d in group_by]
+            keys = np.ravel_multi_index([self.codes[d][selected] for d in group_by], sizes)
+            space = int(np.prod(sizes))
+            if space <= max(len(keys), 1) * 4:
+                # Few possible groups: sum straight into a slot per group
+                totals = {m: np.bincount(keys, weights=values[m], minlength=space) for m in MEASURES}
+                groups = np.flatnonzero(totals["n"])
+                totals = {m: t[groups] for m, t in totals.items()}
+            else:
+                groups, inverse = np.unique(keys, return_inverse=True)
+                totals = {m: np.bincount(inverse, weights=values[m], minlength=len(groups)) for m in MEASURES}
+            labels = np.unravel_index(groups, sizes)
+            df = pd.DataFrame({d: self.vocab[d][codes] for d, codes in zip(group_by, labels)})
+        else:
+            totals = {m: np.array([values[m].sum()], dtype=float) for m in MEASURES}
+            df = pd.DataFrame(index=range(1))
+
+        n = totals["n"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = totals["g3_sum"] / n
+            std = np.sqrt(np.maximum(totals["g3_sq"] / n - mean ** 2, 0))
+            pass_rate = totals["pass_n"] / n * 100
+        df["n"] = n.astype(np.int64)
+        df["passed"] = totals["pass_n"].astype(np.int64)
+        df["pass_rate"] = np.where(n > 0, pass_rate, 0.0)
+        df["G3_mean"] = np.where(n > 0, mean, np.nan)
+        df["G3_std"] = np.where(n > 0, std, np.nan)
+        return df
+
+
+def _encode(series, vocab):
+    """Map values to codes in a growing vocabulary (a list, extended in place)."""
+    local, uniques = pd.factorize(series, use_na_sentinel=False)
+    index = pd.Index(vocab)
+    new = pd.Index(uniques).difference(index)
+    if len(new):
+        vocab.extend(new)
+        index = pd.Index(vocab)
+    return index.get_indexer(uniques).astype(np.int32)[local]
+
+
+def _cells(chunk, dims, vocab):
+    """Collapse a chunk of student rows to coded cells with their measures."""
+    work = pd.DataFrame({d: _encode(chunk[d], vocab[d]) for d in dims})
+    g3 = pd.to_numeric(chunk["G3"], errors="coerce").fillna(0).to_numpy(dtype=np.int64)
+    work["n"] = 1
+    work["pass_n"] = transforms.encode_target(chunk[transforms.TARGET["column"]]).astype(np.int64)
+    work["g3_sum"] = g3
+    work["g3_sq"] = g3 * g3
+    return work.groupby(dims, sort=False)[MEASURES].sum().reset_index()
+
+
+def build_cube(eng, dimensions=None, chunksize=None):
+    """
+    Build a cube from the students table.
+
+    Only the dimension, G3 and final_result columns are read, chunksize rows
+    at a time. Configured dimensions the table lacks are skipped, as are
+    those with more than CUBE_CONFIG["max_cardinality"] distinct values.
+
+    Args:
+        eng: SQLAlchemy engine
+        dimensions (list): Attributes to index (defaults to CUBE_CONFIG["dimensions"])
+        chunksize (int): Rows per read (defaults to CUBE_CONFIG["chunksize"])
+
+    Returns:
+        Cube: The built cube
+    """
+    try:
+        columns = set(db_utils.table_columns(eng, "students"))
+        dims = [d for d in (dimensions or CUBE_CONFIG["dimensions"]) if d in columns]
+        missing = [d for d in (dimensions or CUBE_CONFIG["dimensions"]) if d not in columns]
+        if missing:
+            logger.warning(f"⚠️ Cube dimensions not in the students table: {missing}")
+        target = transforms.TARGET["column"]
+        sql = f"SELECT {', '.join(dims + ['G3', target])} FROM students"
+
+        with instrumentation.span("cube.build") as sp:
+            vocab = {d: [] for d in dims}
+            partials = []
+            with eng.connect() as conn:
+                for chunk in pd.read_sql(text(sql), conn, chunksize=chunksize or CUBE_CONFIG["chunksize"]):
+                    sp.add_rows(len(chunk))
+                    partials.append(_cells(chunk, dims, vocab))
+
+            wide = [d for d in dims if len(vocab[d]) > CUBE_CONFIG["max_cardinality"]]
+            if wide:
+                logger.warning(f"⚠️ Cube dimensions with too many values left out: {wide}")
+                dims = [d for d in dims if d not in wide]
+            if partials:
+                cells = pd.concat(partials, ignore_index=True)
+                cells = cells.groupby(dims, sort=False)[MEASURES].sum().reset_index() if dims else cells[MEASURES].sum().to_frame().T
+            else:
+                cells = pd.DataFrame(columns=dims + MEASURES, dtype=np.int64)
+
+            # Sort each vocabulary so query results come out in value order
+            sorted_vocab, codes = {}, {}
+            for d in dims:
+                values = pd.Index(vocab[d])
+                order = values.argsort()
+                rank = np.empty(len(order), dtype=np.int32)
+                rank[order] = np.arange(len(order), dtype=np.int32)
+                sorted_vocab[d] = values[order].to_numpy()
+                codes[d] = rank[cells[d].to_numpy(dtype=np.int64)] if len(cells) else np.zeros(0, dtype=np.int32)
+            cube = Cube(sorted_vocab, codes, {m: cells[m].to_numpy(dtype=np.float64) for m in MEASURES})
+
+        logger.info(f"✅ Cube built: {cube.rows:,} students in {cube.cells:,} cells over {len(dims)} dimensions")
+        return cube
+
+    except Exception as e:
+        logger.error(f"❌ Error building cube: {str(e)}")
+        raise
+
+
+def get_cube(eng=None):
+    """
+    Return the cube for a database, rebuilding it after each ETL load.
+
+    The cube is kept per database and reused while the students table's
+    version (see query_cache.bump_versions) is unchanged. Tables without a
+    recorded version get a fresh cube on every call.
+
+    Args:
+        eng: SQLAlchemy engine (defaults to db_utils.get_engine())
+
+    Returns:
+        Cube: The current cube
+    """
+    if eng is None:
+        from db_utils import get_engine
+        eng = get_engine()
+    versions = query_cache.table_versions(eng, ["students"])
+    key = query_cache.engine_id(eng)
+    with _LOCK:
+        build = _BUILDS.setdefault(key, threading.Lock())
+    with build:
+        # A concurrent caller may have built this version while we waited
+        with _LOCK:
+            cached = _CUBES.get(key)
+        if cached is not None and versions is not None and cached[0] == versions:
+            return cached[1]
+        cube = build_cube(eng)
+        if versions is not None:
+            with _LOCK:
+                _CUBES[key] = (versions, cube)
+        return cube
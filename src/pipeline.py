@@ -0,0 +1,288 @@
+"""
+Pipeline Orchestrator Module
+
+This module runs the project end to end as a dependency graph:
+
+    etl ──┬── summaries
+          └── train ── score
+
+Each stage declares the inputs it depends on: content hashes of the raw and
+processed data files and the model, and the data version of the students
+table. A stage is skipped when those inputs match its last successful run
+and its outputs still exist.
+Stages whose dependencies are done run concurrently, so the Power BI exports
+and model training overlap. Every run's per-stage status, timing and cache
+hit/miss is appended to PIPELINE_CONFIG["runs_file"].
+"""
+
+import os
+import json
+import time
+import hashlib
+import argparse
+import logging
+import threading
+from datetime import datetime, timezone
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import pandas as pd
+from sqlalchemy import inspect, text
+from config import (
+    CSV_FILE, FEATURE_SETS, ML_CONFIG, MODEL_FILE, PIPELINE_CONFIG, POWERBI_DIR,
+    PREDICT_CONFIG, PROCESSED_FILE, PROCESSED_STORE_FILE, SUMMARIES,
+)
+from db_utils import get_engine
+import feature_store
+import instrumentation
+import query_cache
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+_STATE_LOCK = threading.Lock()
+
+
+def file_hash(path):
+    """Content hash of a file, or None if it does not exist."""
+    return feature_store.fingerprint(path) if os.path.exists(path) else None
+
+
+def table_hash(table, eng=None):
+    """
+    Content hash of a database table, or None if it does not exist.
+
+    Rows are hashed in chunks while streaming the table, so memory stays
+    bounded.
+
+    Args:
+        table (str): Table name
+        eng: SQLAlchemy engine (defaults to get_engine())
+
+    Returns:
+        str: Hex digest
+    """
+    eng = eng or get_engine()
+    if not inspect(eng).has_table(table):
+        return None
+    digest = hashlib.blake2b(digest_size=16)
+    with eng.connect() as conn:
+        for i, chunk in enumerate(pd.read_sql(text(f"SELECT * FROM {table}"), conn, chunksize=100000)):
+            if i == 0:
+                digest.update(",".join(chunk.columns).encode())
+            digest.update(pd.util.hash_pandas_object(chunk, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def table_state(table, eng=None):
+    """
+    Identify the current contents of a database table, or None if it does not exist.
+
+    Every load bumps the table's data version (see query_cache.bump_versions),
+    so the version identifies its contents without reading the table. Tables
+    with no recorded version are hashed in full.
+
+    Args:
+        table (str): Table name
+        eng: SQLAlchemy engine (defaults to get_engine())
+
+    Returns:
+        str: Version or content hash
+    """
+    eng = eng or get_engine()
+    if not inspect(eng).has_table(table):
+        return None
+    versions = query_cache.table_versions(eng, [table])
+    if versions is None:
+        return table_hash(table, eng)
+    return _digest(versions)
+
+
+def _table_exists(table):
+    return inspect(get_engine()).has_table(table)
+
+
+def _run_etl():
+    import etl_students
+    etl_students.main()
+
+
+def _run_summaries():
+    import analysis_students
+    analysis_students.export_summaries()
+
+
+def _train_inputs():
+    import ml_predict_passfail
+    return {
+        "processed": file_hash(PROCESSED_STORE_FILE),
+        "feature_set": FEATURE_SETS[ML_CONFIG["feature_set"]],
+        "params": ml_predict_passfail.DEFAULT_PARAMS,
+    }
+
+
+def _run_train():
+    import ml_predict_passfail
+    ml_predict_passfail.main()
+
+
+def _run_score():
+    import predict_service
+    predict_service.score_table(model=predict_service.get_model(MODEL_FILE))
+
+
+def default_stages():
+    """
+    Define the project's stages.
+
+    Returns:
+        dict: Stage name to a dict with "deps" (stage names), "inputs"
+        (callable returning the hashes the stage depends on), "outputs"
+        (callable returning True if the stage's results exist) and "run"
+    """
+    return {
+        "etl": {
+            "deps": [],
+            "inputs": lambda: {"raw_csv": file_hash(CSV_FILE)},
+            "outputs": lambda: all(os.path.exists(p) for p in [PROCESSED_FILE, PROCESSED_STORE_FILE])
+            and _table_exists("students"),
+            "run": _run_etl,
+        },
+        "summaries": {
+            "deps": ["etl"],
+            "inputs": lambda: {"students": table_state("students"), "reports": SUMMARIES},
+            "outputs": lambda: all(
+                os.path.exists(os.path.join(POWERBI_DIR, d["file"])) for d in SUMMARIES.values()
+            ),
+            "run": _run_summaries,
+        },
+        "train": {
+            "deps": ["etl"],
+            "inputs": _train_inputs,
+            "outputs": lambda: os.path.exists(MODEL_FILE),
+            "run": _run_train,
+        },
+        "score": {
+            "deps": ["train"],
+            "inputs": lambda: {"model": file_hash(MODEL_FILE), "students": table_state("students")},
+            "outputs": lambda: _table_exists(PREDICT_CONFIG["table"]),
+            "run": _run_score,
+        },
+    }
+
+
+def _digest(inputs):
+    return hashlib.blake2b(json.dumps(inputs, sort_keys=True, default=str).encode(), digest_size=16).hexdigest()
+
+
+def _read_state():
+    try:
+        with open(PIPELINE_CONFIG["state_file"]) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _save_stage_state(name, digest):
+    with _STATE_LOCK:
+        state = _read_state()
+        state[name] = {"inputs": digest, "finished": datetime.now(timezone.utc).isoformat()}
+        tmp = PIPELINE_CONFIG["state_file"] + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp, PIPELINE_CONFIG["state_file"])
+
+
+def _execute(name, stage, force):
+    """Run one stage unless its inputs are unchanged; return its run record."""
+    start = time.perf_counter()
+    digest = _digest(stage["inputs"]())
+    if not force and _read_state().get(name, {}).get("inputs") == digest and stage["outputs"]():
+        return {"status": "skipped", "cache": "hit", "seconds": round(time.perf_counter() - start, 3)}
+
+    logger.info(f"▶️ Running stage {name}")
+    with instrumentation.span(f"pipeline.{name}"):
+        stage["run"]()
+    # Record the inputs the stage actually consumed, as read before it ran
+    _save_stage_state(name, digest)
+    return {"status": "ran", "cache": "miss", "seconds": round(time.perf_counter() - start, 3)}
+
+
+def _with_dependencies(stages, targets):
+    """Return the target stages plus everything they depend on."""
+    selected, todo = set(), list(targets)
+    while todo:
+        name = todo.pop()
+        if name not in stages:
+            raise ValueError(f"Unknown stage: {name}")
+        if name not in selected:
+            selected.add(name)
+            todo.extend(stages[name]["deps"])
+    return selected
+
+
+def run_pipeline(targets=None, force=False, workers=None, stages=None):
+    """
+    Run the pipeline's stages in dependency order.
+
+    Args:
+        targets (list): Stages to bring up to date, with their dependencies
+            (all stages by default)
+        force (bool): Run stages even when their inputs are unchanged
+        workers (int): Stages run at once (defaults to PIPELINE_CONFIG["workers"])
+        stages (dict): Stage definitions (defaults to default_stages())
+
+    Returns:
+        dict: Run record with per-stage status ("ran", "skipped", "failed" or
+        "blocked"), cache hit/miss and seconds
+    """
+    stages = stages or default_stages()
+    selected = _with_dependencies(stages, targets or list(stages))
+    workers = workers or PIPELINE_CONFIG["workers"]
+    record = {"started": datetime.now(timezone.utc).isoformat(), "stages": {}}
+    results = record["stages"]
+    start = time.perf_counter()
+
+    pending = [name for name in stages if name in selected]
+    running = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while pending or running:
+            for name in list(pending):
+                deps = [results.get(d, {}).get("status") for d in stages[name]["deps"]]
+                if any(s in ("failed", "blocked") for s in deps):
+                    results[name] = {"status": "blocked", "cache": None, "seconds": 0.0}
+                    pending.remove(name)
+                elif all(s in ("ran", "skipped") for s in deps):
+                    running[pool.submit(_execute, name, stages[name], force)] = name
+                    pending.remove(name)
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    logger.error(f"❌ Stage {name} failed: {str(e)}")
+                    results[name] = {"status": "failed", "cache": None, "seconds": None, "error": str(e)}
+
+    record["seconds"] = round(time.perf_counter() - start, 3)
+    record["ok"] = all(r["status"] in ("ran", "skipped") for r in results.values())
+    with open(PIPELINE_CONFIG["runs_file"], "a") as f:
+        f.write(json.dumps(record) + "\n")
+
+    for name, result in results.items():
+        logger.info(f"  {name:<10} {result['status']:<8} cache={result['cache']} {result['seconds']}s")
+    icon = "🎯" if record["ok"] else "❌"
+    logger.info(f"{icon} Pipeline finished in {record['seconds']}s")
+    return record
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the student analytics pipeline")
+    parser.add_argument("stages", nargs="*",
+                        help="stages to bring up to date, with their dependencies (all by default)")
+    parser.add_argument("--force", action="store_true", help="run stages even if their inputs are unchanged")
+    parser.add_argument("--workers", type=int, default=None, help="stages to run concurrently")
+    args = parser.parse_args()
+    result = run_pipeline(args.stages or None, force=args.force, workers=args.workers)
+    raise SystemExit(0 if result["ok"] else 1)
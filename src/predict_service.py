@@ -0,0 +1,478 @@
+"""
+Student Pass/Fail Prediction Service Module
+
+This module scores students with the model saved by ml_predict_passfail.
+The model is loaded once per process and kept in memory. Two entry points
+share it:
+- Batch scoring of the students table or a processed file, chunk by chunk,
+  writing pass probabilities back as it goes
+- An online HTTP server whose requests are grouped into micro-batches, so
+  concurrent callers share one predict_proba call
+"""
+
+import json
+import time
+import queue
+import argparse
+import logging
+import threading
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import pandas as pd
+import joblib
+from sqlalchemy import text
+from config import ETL_CONFIG, PREDICT_CONFIG
+from db_utils import get_engine
+import db_utils
+import bulk_load
+import columnar_store
+import feature_store
+import forest_arrays
+import instrumentation
+import query_cache
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+PROBABILITY = "pass_probability"
+PREDICTION = "predicted_result"
+
+# Models loaded in this process, keyed by file path
+_MODELS = {}
+_MODELS_LOCK = threading.Lock()
+
+
+def get_model(path=None):
+    """
+    Return the model saved at path, loading it on first use only.
+
+    Args:
+        path (str): joblib pickle or forest_arrays export directory
+            (defaults to PREDICT_CONFIG["model"])
+
+    Returns:
+        The fitted classifier, or a forest_arrays.CompactForest
+    """
+    path = path or PREDICT_CONFIG["model"]
+    with _MODELS_LOCK:
+        if path not in _MODELS:
+            start = time.perf_counter()
+            if forest_arrays.is_export(path):
+                _MODELS[path] = forest_arrays.load_forest(path)
+            else:
+                _MODELS[path] = joblib.load(path)
+            logger.info(f"✅ Model loaded from {path} in {time.perf_counter() - start:.2f}s")
+        return _MODELS[path]
+
+
+def model_features(model):
+    """Return the feature columns the model was trained on."""
+    return list(model.feature_names_in_)
+
+
+def input_columns(model):
+    """
+    Return the processed columns a request must hold to be scored.
+
+    These are the source columns of the model's feature set, or the model's
+    own feature columns if it matches no configured set.
+    """
+    name = feature_store.set_for_columns(model_features(model))
+    return feature_store.source_columns(name) if name else model_features(model)
+
+
+def predict_proba(df, model=None):
+    """
+    Score a frame of students.
+
+    Args:
+        df (pd.DataFrame): Rows holding the model's feature columns, or the
+            processed columns they are computed from (input_columns())
+        model: Fitted classifier (defaults to get_model())
+
+    Returns:
+        np.ndarray: Probability of a pass for each row
+    """
+    model = model or get_model()
+    features = model_features(model)
+    if set(features) <= set(df.columns):
+        X = df[features]
+    else:
+        X = feature_store.compute_features(df[input_columns(model)], feature_store.set_for_columns(features))
+    pass_column = list(model.classes_).index(1)
+    return model.predict_proba(X)[:, pass_column]
+
+
+def _result_frame(keys, proba):
+    """Build the predictions frame written by the batch scorers, after the key columns."""
+    return keys.reset_index(drop=True).assign(**{
+        PROBABILITY: proba,
+        # predict() picks the first class on ties, so 0.5 is a fail
+        PREDICTION: np.where(proba > 0.5, "pass", "fail"),
+    })
+
+
+def _iter_table_chunks(eng, columns, chunksize):
+    """
+    Yield (keys, rows) chunks of the given students columns.
+
+    Rows are paged on db_utils.paging_key(): row_key for incremental loads,
+    row_id for MySQL full loads, rowid on SQLite and DuckDB. Each page is a
+    separate short query, so predictions can be written between pages
+    without holding a read cursor open. keys holds the paging key as
+    row_key or row_id, which joins the predictions back to students.
+    A MySQL table loaded before full loads added row_id is streamed on one
+    connection, with ETL_CONFIG["key_columns"] as its keys.
+
+    Raises:
+        ValueError: If the table has no paging key and no key columns are configured
+    """
+    key = db_utils.paging_key(eng, "students")
+    selected = ", ".join(columns)
+    if key:
+        key_name = "row_key" if key == "row_key" else "row_id"
+        sql = text(
+            f"SELECT {key} AS {key_name}, {selected} FROM students "
+            f"WHERE {key} > :last ORDER BY {key} LIMIT :limit"
+        )
+        last = -2**63
+        while True:
+            chunk = pd.read_sql(sql, eng, params={"last": last, "limit": chunksize})
+            if chunk.empty:
+                return
+            last = int(chunk[key_name].iloc[-1])
+            yield chunk[[key_name]], chunk[columns]
+    else:
+        key_columns = ETL_CONFIG["key_columns"]
+        if not key_columns:
+            raise ValueError(
+                "students has no row_key or row_id to key predictions on: reload it "
+                "or set ETL_KEY_COLUMNS to the columns that identify a student"
+            )
+        selected = ", ".join(dict.fromkeys(key_columns + list(columns)))
+        with eng.connect().execution_options(stream_results=True) as conn:
+            for chunk in pd.read_sql(text(f"SELECT {selected} FROM students"), conn, chunksize=chunksize):
+                yield chunk[key_columns], chunk[columns]
+
+
+def score_table(eng=None, chunksize=None, model=None):
+    """
+    Score every student in the database and write the predictions back.
+
+    Predictions go to PREDICT_CONFIG["table"], keyed by the students table's
+    row_key or row_id (see _iter_table_chunks) so they join back to it.
+
+    Args:
+        eng: SQLAlchemy engine (defaults to get_engine())
+        chunksize (int): Rows per chunk (defaults to PREDICT_CONFIG["chunksize"])
+        model: Fitted classifier (defaults to get_model())
+
+    Returns:
+        int: Number of rows scored
+    """
+    try:
+        eng = eng or get_engine()
+        model = model or get_model()
+        chunksize = chunksize or PREDICT_CONFIG["chunksize"]
+        table = PREDICT_CONFIG["table"]
+
+        total = 0
+        with instrumentation.span("score.table") as s:
+            for i, (keys, X) in enumerate(_iter_table_chunks(eng, input_columns(model), chunksize)):
+                out = _result_frame(keys, predict_proba(X, model))
+                bulk_load.bulk_load(eng, out, table, "replace" if i == 0 else "append")
+                total += len(out)
+                s.add_rows(len(out))
+                logger.info(f"Scored chunk {i + 1}: {total} rows")
+
+        query_cache.bump_versions(eng, [table])
+        logger.info(f"✅ Scored {total} students → {table}")
+        return total
+
+    except Exception as e:
+        logger.error(f"❌ Error scoring students table: {str(e)}")
+        raise
+
+
+def score_file(path, output, chunksize=None, model=None):
+    """
+    Score a processed CSV or Parquet file chunk by chunk.
+
+    A file whose feature matrix is already in the feature store (e.g. from
+    training) is scored from the cached matrix. Other files are streamed,
+    with features computed per chunk, so memory stays bounded by chunksize.
+
+    Args:
+        path (str): students_processed.csv or .parquet
+        output (str): CSV to write with row_id, pass_probability and predicted_result
+        chunksize (int): Rows per chunk (defaults to PREDICT_CONFIG["chunksize"])
+        model: Fitted classifier (defaults to get_model())
+
+    Returns:
+        int: Number of rows scored
+    """
+    try:
+        model = model or get_model()
+        chunksize = chunksize or PREDICT_CONFIG["chunksize"]
+        name = feature_store.set_for_columns(model_features(model))
+        if name is None:
+            raise ValueError("Model features match no configured feature set")
+
+        cached = feature_store.cached_features(path, name)
+        if cached is not None:
+            X = cached[0]
+            chunks = (X.iloc[start:start + chunksize] for start in range(0, len(X), chunksize))
+        else:
+            columns = feature_store.source_columns(name)
+            if path.endswith(".parquet"):
+                raw = columnar_store.iter_store(columns, chunksize, path)
+            else:
+                raw = pd.read_csv(path, usecols=columns, chunksize=chunksize)
+            chunks = (feature_store.compute_features(chunk, name) for chunk in raw)
+
+        total = 0
+        for i, chunk in enumerate(chunks):
+            keys = pd.DataFrame({"row_id": np.arange(total + 1, total + len(chunk) + 1)})
+            out = _result_frame(keys, predict_proba(chunk, model))
+            out.to_csv(output, mode="w" if i == 0 else "a", header=i == 0, index=False)
+            total += len(out)
+
+        logger.info(f"✅ Scored {total} rows from {path} → {output}")
+        return total
+
+    except Exception as e:
+        logger.error(f"❌ Error scoring file: {str(e)}")
+        raise
+
+
+class MicroBatcher:
+    """
+    Group concurrent single-record predictions into batches.
+
+    Callers submit records from any thread; a worker thread takes up to
+    max_batch queued records, waiting at most max_wait_ms for the batch to
+    fill, and scores them with one predict_proba call. Records are checked
+    when submitted, and if a batch still fails its records are scored one by
+    one, so a bad record only fails its own caller.
+    """
+
+    def __init__(self, model=None, max_batch=None, max_wait_ms=None):
+        self.model = model or get_model()
+        self.columns = input_columns(self.model)
+        name = feature_store.set_for_columns(model_features(self.model))
+        self.numeric = set(feature_store.feature_set(name)["numeric"]) if name else set(self.columns)
+        self.max_batch = max_batch or PREDICT_CONFIG["max_batch"]
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else PREDICT_CONFIG["max_wait_ms"]) / 1000
+        self.batches = 0
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    def validate(self, record):
+        """
+        Check a record and coerce its values for scoring.
+
+        Args:
+            record (dict): Feature values keyed by column name
+
+        Returns:
+            dict: The input_columns() values, numeric ones as floats (None as NaN)
+
+        Raises:
+            ValueError: If the record is not a dict, lacks a feature or holds
+                a value of the wrong type
+        """
+        if not isinstance(record, dict):
+            raise ValueError(f"Each record must be a JSON object, got {type(record).__name__}")
+        missing = [c for c in self.columns if c not in record]
+        if missing:
+            raise ValueError(f"Missing features: {missing}")
+        row = {}
+        for col in self.columns:
+            value = record[col]
+            if col not in self.numeric:
+                if value is not None and not isinstance(value, str):
+                    raise ValueError(f"Feature {col} must be a string, got {value!r}")
+                row[col] = value
+            elif value is None:
+                row[col] = np.nan
+            else:
+                try:
+                    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+                        raise TypeError
+                    row[col] = float(value)
+                except (TypeError, ValueError):
+                    raise ValueError(f"Feature {col} must be a number, got {value!r}") from None
+        return row
+
+    def submit(self, record):
+        """
+        Queue one record for scoring.
+
+        Args:
+            record (dict): Feature values keyed by column name
+
+        Returns:
+            concurrent.futures.Future: Resolves to the pass probability
+
+        Raises:
+            ValueError: If the record fails validate()
+        """
+        row = self.validate(record)
+        future = Future()
+        self._queue.put((row, future))
+        return future
+
+    def predict(self, records):
+        """Score records (joining whatever batch is forming) and wait for the results."""
+        rows = [self.validate(r) for r in records]
+        futures = [self.submit(r) for r in rows]
+        return [f.result() for f in futures]
+
+    def close(self):
+        """Stop the worker once queued records are scored."""
+        self._queue.put(None)
+        self._worker.join()
+
+    def _next_batch(self):
+        """Block for the first record, then gather more until full or timed out."""
+        item = self._queue.get()
+        if item is None:
+            return None
+        batch = [item]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            records, futures = zip(*batch)
+            try:
+                proba = self._score(records)
+            except Exception:
+                # Score one by one so only the failing records' callers get the error
+                for record, future in batch:
+                    try:
+                        future.set_result(self._score([record])[0])
+                    except Exception as e:
+                        future.set_exception(e)
+            else:
+                for future, p in zip(futures, proba):
+                    future.set_result(p)
+            self.batches += 1
+
+    def _score(self, records):
+        X = pd.DataFrame(list(records), columns=self.columns)
+        return [float(p) for p in predict_proba(X, self.model)]
+
+
+def make_server(batcher, host=None, port=None):
+    """
+    Build the HTTP prediction server.
+
+    Endpoints:
+    - GET /health
+    - POST /predict with a JSON record, or a list of records, holding the
+      input_columns() of the model; returns pass_probability and predicted_result
+      lists in the same order
+
+    Args:
+        batcher (MicroBatcher): Batcher shared by all request threads
+        host (str): Bind address (defaults to PREDICT_CONFIG["host"])
+        port (int): Port (defaults to PREDICT_CONFIG["port"])
+
+    Returns:
+        ThreadingHTTPServer: Call serve_forever() to start it
+    """
+
+    class PredictionHandler(BaseHTTPRequestHandler):
+        def _reply(self, status, body):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._reply(200, {"status": "ok", "batches": batcher.batches})
+            else:
+                self._reply(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/predict":
+                self._reply(404, {"error": "not found"})
+                return
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                records = body if isinstance(body, list) else [body]
+                proba = batcher.predict(records)
+            except (ValueError, TypeError) as e:
+                self._reply(400, {"error": str(e)})
+                return
+            except Exception as e:
+                logger.error(f"❌ Prediction request failed: {str(e)}")
+                self._reply(500, {"error": "prediction failed"})
+                return
+            self._reply(200, {
+                PROBABILITY: proba,
+                PREDICTION: ["pass" if p > 0.5 else "fail" for p in proba],
+            })
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    return ThreadingHTTPServer((host or PREDICT_CONFIG["host"], port or PREDICT_CONFIG["port"]), PredictionHandler)
+
+
+def serve(host=None, port=None):
+    """Run the online prediction server until interrupted."""
+    batcher = MicroBatcher()
+    server = make_server(batcher, host, port)
+    logger.info(f"🚀 Prediction server listening on http://{server.server_address[0]}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Student pass/fail prediction service")
+    commands = parser.add_subparsers(dest="command", required=True)
+    table_cmd = commands.add_parser("score-table", help="score the students table")
+    table_cmd.add_argument("--chunksize", type=int, default=None)
+    file_cmd = commands.add_parser("score-file", help="score a processed CSV or Parquet file")
+    file_cmd.add_argument("path")
+    file_cmd.add_argument("output")
+    file_cmd.add_argument("--chunksize", type=int, default=None)
+    serve_cmd = commands.add_parser("serve", help="run the online prediction server")
+    serve_cmd.add_argument("--host", default=None)
+    serve_cmd.add_argument("--port", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.command == "score-table":
+        score_table(chunksize=args.chunksize)
+    elif args.command == "score-file":
+        score_file(args.path, args.output, args.chunksize)
+    else:
+        serve(args.host, args.port)
@@ -0,0 +1,366 @@
+"""
+Query Cache Module
+
+This module executes the project's read queries through a result cache.
+Named queries come from config.QUERIES (or register()); ad-hoc SQL can be
+run with read_sql(). Results are kept in memory and as Parquet files on
+disk, so other processes (dashboard workers, exports, notebooks) share them.
+
+Entries are keyed by the database, the SQL, its parameters and the
+versions of the tables it reads. Versions live in the data_versions table
+and are bumped by every ETL load (bump_versions), so a load invalidates all
+results computed before it without any explicit flush. The table also holds
+a random id for the database instance, created with it, so a database that
+is deleted and rebuilt behind the same URL (whose versions start again at
+1) never matches entries of the old one. Tables without a recorded version
+are never cached, since their freshness cannot be proven.
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import secrets
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+import pandas as pd
+from sqlalchemy import text
+from config import QUERIES, QUERY_CACHE_CONFIG
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# data_versions row holding the database instance id instead of a table's version
+INSTANCE = "__instance__"
+
+_TABLE_PATTERN = re.compile(r"\b(?:FROM|JOIN)\s+`?(\w+)`?", re.IGNORECASE)
+
+_LOCK = threading.Lock()
+_MEMORY = OrderedDict()
+_VERSIONS = {}
+_REGISTRY = dict(QUERIES)
+_STATS = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "uncached": 0}
+
+
+def register(name, sql):
+    """
+    Add a named query.
+
+    Args:
+        name (str): Query name for run_query()
+        sql (str): SQL with optional :name bind parameters
+    """
+    _REGISTRY[name] = sql
+
+
+def registered_queries():
+    """Return a copy of the named queries, from config.QUERIES and register()."""
+    return dict(_REGISTRY)
+
+
+def tables_in(sql):
+    """Return the tables a query reads, from its FROM and JOIN clauses."""
+    return sorted({name.lower() for name in _TABLE_PATTERN.findall(sql)})
+
+
+def _version_table():
+    return QUERY_CACHE_CONFIG["version_table"]
+
+
+def _ensure_version_table(conn):
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {_version_table()} ("
+        "table_name VARCHAR(64) PRIMARY KEY, version BIGINT NOT NULL, updated_at VARCHAR(40))"
+    ))
+
+
+def bump_versions(eng, tables):
+    """
+    Record that tables changed, invalidating cached results that read them.
+
+    Call this after a load has committed.
+
+    Args:
+        eng: SQLAlchemy engine
+        tables (list): Table names
+    """
+    now = datetime.now(timezone.utc).isoformat()
+    with eng.begin() as conn:
+        _ensure_version_table(conn)
+        # Not every driver reports UPDATE row counts (DuckDB's does not), so check first
+        known = {row[0] for row in conn.execute(text(f"SELECT table_name FROM {_version_table()}"))}
+        if INSTANCE not in known:
+            conn.execute(
+                text(f"INSERT INTO {_version_table()} (table_name, version, updated_at) VALUES (:t, :id, :now)"),
+                {"t": INSTANCE, "id": secrets.randbits(62), "now": now},
+            )
+        for table in tables:
+            params = {"now": now, "t": table.lower()}
+            if table.lower() in known:
+                conn.execute(
+                    text(f"UPDATE {_version_table()} SET version = version + 1, updated_at = :now WHERE table_name = :t"),
+                    params,
+                )
+            else:
+                conn.execute(
+                    text(f"INSERT INTO {_version_table()} (table_name, version, updated_at) VALUES (:t, 1, :now)"),
+                    params,
+                )
+    with _LOCK:
+        _VERSIONS.pop(engine_id(eng), None)
+    logger.debug(f"Bumped data versions: {tables}")
+
+
+def engine_id(eng):
+    """
+    Return the name that identifies an engine's database in cache keys.
+
+    Sync and async engines on the same database share one id; every
+    in-memory SQLite engine gets its own, since each is a separate database.
+
+    Args:
+        eng: SQLAlchemy engine (sync or async)
+
+    Returns:
+        str: URL without password, plus the engine's identity for in-memory databases
+    """
+    url = eng.url.set(drivername=eng.url.get_backend_name())
+    name = url.render_as_string(hide_password=True)
+    return f"{name}#{id(eng)}" if url.database in (None, "", ":memory:") else name
+
+
+def versions_sql():
+    """Return the query listing every table's version."""
+    return f"SELECT table_name, version FROM {_version_table()}"
+
+
+def known_versions(eng):
+    """
+    Return the table versions read for a database within the last version_ttl seconds.
+
+    Returns:
+        dict: Table name to version, or None if they must be re-read
+    """
+    with _LOCK:
+        checked_at, versions = _VERSIONS.get(engine_id(eng), (None, None))
+    if checked_at is None or time.monotonic() - checked_at > QUERY_CACHE_CONFIG["version_ttl"]:
+        return None
+    return versions
+
+
+def remember_versions(eng, rows):
+    """
+    Record the table versions just read for a database.
+
+    Args:
+        eng: Engine the rows were read from
+        rows: (table_name, version) pairs, or None if the version table is missing
+
+    Returns:
+        dict: Table name to version
+    """
+    versions = {name: int(version) for name, version in rows or []}
+    with _LOCK:
+        _VERSIONS[engine_id(eng)] = (time.monotonic(), versions)
+    return versions
+
+
+def select_versions(versions, tables):
+    """Return the versions of tables plus the database instance id, or None if any is missing."""
+    if INSTANCE not in versions or any(t not in versions for t in tables):
+        return None
+    return {INSTANCE: versions[INSTANCE], **{t: versions[t] for t in tables}}
+
+
+def table_versions(eng, tables):
+    """
+    Look up the current versions of tables.
+
+    Versions are re-read at most every QUERY_CACHE_CONFIG["version_ttl"]
+    seconds per database.
+
+    Args:
+        eng: SQLAlchemy engine
+        tables (list): Table names
+
+    Returns:
+        dict: Table name to version, or None if any table has no version
+    """
+    versions = known_versions(eng)
+    if versions is None:
+        try:
+            with eng.connect() as conn:
+                rows = conn.execute(text(versions_sql())).fetchall()
+        except Exception:
+            # No version table yet: nothing has been loaded since caching was introduced
+            rows = None
+        versions = remember_versions(eng, rows)
+    return select_versions(versions, tables)
+
+
+def _cache_key(eng, sql, params, versions):
+    payload = json.dumps(
+        {"db": engine_id(eng), "sql": " ".join(sql.split()), "params": params or {}, "versions": versions},
+        sort_keys=True, default=str,
+    )
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+def _disk_path(key):
+    return os.path.join(QUERY_CACHE_CONFIG["dir"], f"{key}.parquet")
+
+
+def _remember(key, df):
+    with _LOCK:
+        _MEMORY[key] = df
+        _MEMORY.move_to_end(key)
+        while len(_MEMORY) > QUERY_CACHE_CONFIG["max_memory_entries"]:
+            _MEMORY.popitem(last=False)
+
+
+def _write_disk(key, df):
+    """Store a result as Parquet, keeping the most recent max_disk_entries files."""
+    directory = QUERY_CACHE_CONFIG["dir"]
+    tmp = None
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        os.close(fd)
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, _disk_path(key))
+    except Exception as e:
+        # Results Parquet cannot hold (e.g. mixed-type columns) stay memory-only
+        logger.debug(f"Query result {key} not written to disk: {e}")
+        if tmp and os.path.exists(tmp):
+            os.remove(tmp)
+        return
+    files = [os.path.join(directory, f) for f in os.listdir(directory) if f.endswith(".parquet")]
+    if len(files) > QUERY_CACHE_CONFIG["max_disk_entries"]:
+        files.sort(key=lambda f: os.stat(f).st_mtime)
+        for stale in files[:len(files) - QUERY_CACHE_CONFIG["max_disk_entries"]]:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+
+
+def _read_disk(key):
+    path = _disk_path(key)
+    try:
+        df = pd.read_parquet(path)
+        os.utime(path)
+        return df
+    except (OSError, ValueError):
+        return None
+
+
+def lookup(eng, sql, params, versions):
+    """
+    Find a cached result.
+
+    Args:
+        eng: Engine the query would run on
+        sql (str): SQL text
+        params (dict): Bind parameter values
+        versions (dict): select_versions() of the tables the query reads,
+            or None if it must not be cached
+
+    Returns:
+        tuple: (key, result) where result is a copy of the cached frame or
+        None on a miss; key is None when the query is not cacheable
+    """
+    if versions is None:
+        with _LOCK:
+            _STATS["uncached"] += 1
+        return None, None
+    key = _cache_key(eng, sql, params, versions)
+    with _LOCK:
+        df = _MEMORY.get(key)
+        if df is not None:
+            _MEMORY.move_to_end(key)
+            _STATS["memory_hits"] += 1
+            return key, df.copy()
+    df = _read_disk(key)
+    if df is None:
+        return key, None
+    with _LOCK:
+        _STATS["disk_hits"] += 1
+    _remember(key, df)
+    return key, df.copy()
+
+
+def store(key, df):
+    """Cache a freshly computed result under a lookup() key (no-op for None keys)."""
+    if key is None:
+        return
+    with _LOCK:
+        _STATS["misses"] += 1
+    _write_disk(key, df)
+    _remember(key, df.copy())
+
+
+def read_sql(eng, sql, params=None, tables=None):
+    """
+    Run a read query, answering from the cache when the data is unchanged.
+
+    Args:
+        eng: SQLAlchemy engine
+        sql (str): SQL with optional :name bind parameters
+        params (dict): Bind parameter values
+        tables (list): Tables the query reads (defaults to tables_in(sql))
+
+    Returns:
+        pd.DataFrame: Query result (a copy the caller may modify)
+    """
+    versions = table_versions(eng, tables or tables_in(sql)) if QUERY_CACHE_CONFIG["enabled"] else None
+    key, df = lookup(eng, sql, params, versions)
+    if df is None:
+        df = pd.read_sql(text(sql), eng, params=params)
+        store(key, df)
+    return df
+
+
+def run_query(name, params=None, eng=None):
+    """
+    Run a named query from config.QUERIES or register().
+
+    Args:
+        name (str): Query name
+        params (dict): Bind parameter values
+        eng: SQLAlchemy engine (defaults to db_utils.get_engine())
+
+    Returns:
+        pd.DataFrame: Query result
+
+    Raises:
+        KeyError: If the query is not registered
+    """
+    if name not in _REGISTRY:
+        raise KeyError(f"Unknown query: {name}")
+    if eng is None:
+        from db_utils import get_engine
+        eng = get_engine()
+    return read_sql(eng, _REGISTRY[name], params)
+
+
+def stats():
+    """Return hit and miss counts since the process started."""
+    with _LOCK:
+        return dict(_STATS, memory_entries=len(_MEMORY))
+
+
+def clear():
+    """Drop every cached result, in memory and on disk."""
+    with _LOCK:
+        _MEMORY.clear()
+        _VERSIONS.clear()
+    directory = QUERY_CACHE_CONFIG["dir"]
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            if name.endswith(".parquet"):
+                os.remove(os.path.join(directory, name))
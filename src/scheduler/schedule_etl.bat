@@ -1,5 +1,5 @@
 @echo off
 cd /d "C:\Users\reddy\OneDrive\Desktop\student-performance-analytics"
 call .venv\Scripts\activate
-python src\etl_students.py
+python src\pipeline.py
 exit
@@ -0,0 +1,250 @@
+"""
+Summary Engine Module
+
+This module answers the registered summary reports (config.SUMMARIES) with
+as few scans of the students data as possible. Reports are packed into scans
+whose GROUP BY covers the union of their group-by columns, and each scan
+returns additive partial aggregates (row count, column sums and non-NULL
+counts). Every report is then rolled up from its scan's partials, so adding
+a report does not add a full-table scan. Scans covered by the materialized summary table read that
+table instead of the students table.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from config import SUMMARIES, SUMMARY_CONFIG
+import async_db
+import summary_tables
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+COUNT_COLUMN = "_n"
+
+
+def _sum_column(col):
+    return f"_sum_{col}"
+
+
+def _count_column(col):
+    return f"_cnt_{col}"
+
+
+def _summed_columns(definition):
+    """Columns whose sums a report needs."""
+    return {col for agg, col in definition["measures"].values() if agg in ("sum", "avg")}
+
+
+def _averaged_columns(definition):
+    """Columns whose non-NULL counts a report needs (AVG ignores NULLs)."""
+    return {col for agg, col in definition["measures"].values() if agg == "avg"}
+
+
+def required_columns(definitions=None):
+    """
+    List every column the reports read.
+
+    Args:
+        definitions (dict): Report definitions (defaults to SUMMARIES)
+
+    Returns:
+        list: Sorted column names
+    """
+    definitions = definitions or SUMMARIES
+    columns = set()
+    for definition in definitions.values():
+        columns.update(definition["group_by"])
+        columns.update(_summed_columns(definition))
+    return sorted(columns)
+
+
+def plan_scans(definitions=None, max_group_columns=None):
+    """
+    Pack reports into as few scans as the group-by column cap allows.
+
+    Reports with the most group-by columns are placed first; each report
+    joins the first scan it fits into without exceeding the cap.
+
+    Args:
+        definitions (dict): Report definitions (defaults to SUMMARIES)
+        max_group_columns (int): Cap on a scan's group-by columns (defaults
+            to SUMMARY_CONFIG["max_group_columns"])
+
+    Returns:
+        list: Scans as dicts with "group_by", "sums", "counts" (columns
+        whose non-NULL values are counted) and "reports"
+    """
+    definitions = definitions or SUMMARIES
+    cap = max_group_columns or SUMMARY_CONFIG["max_group_columns"]
+    scans = []
+    for name in sorted(definitions, key=lambda n: -len(definitions[n]["group_by"])):
+        definition = definitions[name]
+        for scan in scans:
+            if len(scan["group_by"] | set(definition["group_by"])) <= cap:
+                break
+        else:
+            scan = {"group_by": set(), "sums": set(), "counts": set(), "reports": []}
+            scans.append(scan)
+        scan["group_by"] |= set(definition["group_by"])
+        scan["sums"] |= _summed_columns(definition)
+        scan["counts"] |= _averaged_columns(definition)
+        scan["reports"].append(name)
+    return [
+        {"group_by": sorted(s["group_by"]), "sums": sorted(s["sums"]), "counts": sorted(s["counts"]), "reports": s["reports"]}
+        for s in scans
+    ]
+
+
+def scan_sql(scan, table="students"):
+    """
+    Build the single GROUP BY query for a scan.
+
+    Args:
+        scan (dict): Scan from plan_scans()
+        table (str): Table to scan
+
+    Returns:
+        str: SQL returning the group-by columns, the row count, column sums
+        and non-NULL counts
+    """
+    keys = ", ".join(scan["group_by"])
+    measures = [f"COUNT(*) AS {COUNT_COLUMN}"] + [
+        f"SUM({col}) AS {_sum_column(col)}" for col in scan["sums"]
+    ] + [f"COUNT({col}) AS {_count_column(col)}" for col in scan["counts"]]
+    return f"SELECT {keys}, {', '.join(measures)} FROM {table} GROUP BY {keys}"
+
+
+def materialized_sql(scan):
+    """
+    Build the query answering a scan from the materialized summary table.
+
+    Args:
+        scan (dict): Scan from plan_scans()
+
+    Returns:
+        str: SQL shaped like scan_sql(), or None if the table lacks a column
+    """
+    if not set(scan["group_by"]) <= set(summary_tables.dimensions()):
+        return None
+    if not set(scan["sums"]) | set(scan["counts"]) <= set(summary_tables.SUM_COLUMNS):
+        return None
+    keys = ", ".join(scan["group_by"])
+    # The materialized columns are filled by transforms (never NULL), so
+    # their non-NULL counts are the row counts
+    measures = [f"SUM({summary_tables.COUNT}) AS {COUNT_COLUMN}"] + [
+        f"SUM({summary_tables.SUM_COLUMNS[col]}) AS {_sum_column(col)}" for col in scan["sums"]
+    ] + [f"SUM({summary_tables.COUNT}) AS {_count_column(col)}" for col in scan["counts"]]
+    return f"SELECT {keys}, {', '.join(measures)} FROM {SUMMARY_CONFIG['table']} GROUP BY {keys}"
+
+
+def scan_frame(df, scan):
+    """
+    Compute a scan's partial aggregates from an in-memory frame.
+
+    Args:
+        df (pd.DataFrame): Rows holding at least the scan's columns
+        scan (dict): Scan from plan_scans()
+
+    Returns:
+        pd.DataFrame: Same shape as the result of scan_sql()
+    """
+    grouped = df.groupby(scan["group_by"], observed=True, dropna=False)
+    partial = grouped.size().rename(COUNT_COLUMN).to_frame()
+    for col in scan["sums"]:
+        partial[_sum_column(col)] = grouped[col].sum()
+    for col in scan["counts"]:
+        partial[_count_column(col)] = grouped[col].count()
+    return partial.reset_index()
+
+
+def rollup(partial, definition):
+    """
+    Roll a scan's partial aggregates up to one report.
+
+    Args:
+        partial (pd.DataFrame): Scan result
+        definition (dict): Report definition
+
+    Returns:
+        pd.DataFrame: Report rows ordered by its group-by columns
+    """
+    group_by = definition["group_by"]
+    sums = sorted(_summed_columns(definition))
+    counts = sorted(_averaged_columns(definition))
+    columns = [COUNT_COLUMN] + [_sum_column(c) for c in sums] + [_count_column(c) for c in counts]
+    totals = (
+        partial.groupby(group_by, observed=True, dropna=False)[columns]
+        .sum()
+        .sort_index()
+    )
+    report = pd.DataFrame(index=totals.index)
+    for name, (agg, col) in definition["measures"].items():
+        if agg == "count":
+            report[name] = totals[COUNT_COLUMN]
+        elif agg == "sum":
+            report[name] = totals[_sum_column(col)]
+        elif agg == "avg":
+            report[name] = totals[_sum_column(col)] / totals[_count_column(col)]
+        else:
+            raise ValueError(f"Unsupported aggregate: {agg}")
+    if "round" in definition:
+        report = report.round(definition["round"])
+    return report.reset_index()
+
+
+def _rollup_all(scans, partials, definitions):
+    """Roll each report up from its scan's partial aggregates."""
+    results = {}
+    for scan, partial in zip(scans, partials):
+        for name in scan["reports"]:
+            results[name] = rollup(partial, definitions[name])
+    logger.info(f"Computed {len(results)} summaries from {len(scans)} scan(s)")
+    return results
+
+
+def run_on_engine(eng, definitions=None, table="students"):
+    """
+    Compute the reports with one GROUP BY query per scan.
+
+    Scans are answered from the materialized summary table when it exists
+    and holds their columns, and from the students table otherwise. The
+    scans' queries run concurrently (see async_db.read_many).
+
+    Args:
+        eng: SQLAlchemy engine
+        definitions (dict): Report definitions (defaults to SUMMARIES)
+        table (str): Table to scan
+
+    Returns:
+        dict: Report name to DataFrame
+    """
+    definitions = definitions or SUMMARIES
+    scans = plan_scans(definitions)
+    use_materialized = table == "students" and summary_tables.exists(eng)
+    queries = [
+        ((materialized_sql(scan) if use_materialized else None) or scan_sql(scan, table), None)
+        for scan in scans
+    ]
+    partials = async_db.read_many(queries, eng, limit=SUMMARY_CONFIG["workers"])
+    return _rollup_all(scans, partials, definitions)
+
+
+def run_on_frame(df, definitions=None):
+    """
+    Compute the reports from an in-memory frame (e.g. the columnar store).
+
+    Args:
+        df (pd.DataFrame): Rows holding required_columns()
+        definitions (dict): Report definitions (defaults to SUMMARIES)
+
+    Returns:
+        dict: Report name to DataFrame
+    """
+    definitions = definitions or SUMMARIES
+    scans = plan_scans(definitions)
+    workers = max(1, min(SUMMARY_CONFIG["workers"], len(scans)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        partials = list(pool.map(lambda scan: scan_frame(df, scan), scans))
+    return _rollup_all(scans, partials, definitions)
@@ -0,0 +1,212 @@
+"""
+Materialized Summary Tables Module
+
+This module maintains the student_summary table: additive aggregates (row
+count, pass count and G3 sum) for every combination of the summary
+dimensions. Full loads rebuild it from the rows being loaded. Incremental
+loads apply only the change, i.e. the aggregates of the new versions of
+changed rows minus those of the old versions. Reports and the dashboard can
+then read a table whose size depends on the number of dimension
+combinations, not on the number of students.
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+from sqlalchemy import BigInteger, Column, Integer, MetaData, String, Table, UniqueConstraint, inspect, text
+from config import SUMMARY_CONFIG
+import db_utils
+import query_cache
+import transforms
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+COUNT = "n"
+PASS_COUNT = "pass_n"
+
+# Source columns whose sums are materialized, and the column holding each sum
+SUM_COLUMNS = {"G3": "g3_sum"}
+
+MEASURES = [COUNT, PASS_COUNT] + list(SUM_COLUMNS.values())
+
+# Group keys standing in for missing dimension values. NULL keys would never
+# match the unique constraint that incremental upserts rely on.
+MISSING_TEXT = "(missing)"
+MISSING_NUMBER = -1
+
+
+def dimensions():
+    """Return the configured summary dimensions."""
+    return list(SUMMARY_CONFIG["dimensions"])
+
+
+def _fill_missing(values):
+    """Replace missing dimension values with MISSING_NUMBER or MISSING_TEXT."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype(object)
+    if not values.isna().any():
+        return values
+    # Rows read back from the database can hold numbers in object columns
+    numbers = pd.api.types.infer_dtype(values, skipna=True) in ("integer", "floating", "mixed-integer-float")
+    if pd.api.types.is_numeric_dtype(values) or numbers:
+        values = pd.to_numeric(values).fillna(MISSING_NUMBER)
+        # NULLs read back from the database turn integer columns into floats
+        if (values == np.floor(values)).all():
+            values = values.astype(np.int64)
+        return values
+    return values.fillna(MISSING_TEXT)
+
+
+def aggregate(df):
+    """
+    Aggregate student rows to the summary grain.
+
+    Args:
+        df (pd.DataFrame): Student rows with the dimensions, final_result and G3
+
+    Returns:
+        pd.DataFrame: One row per dimension combination with the measures,
+        missing dimension values grouped under MISSING_NUMBER or MISSING_TEXT
+    """
+    dims = dimensions()
+    work = df[dims].copy()
+    for col in dims:
+        work[col] = _fill_missing(work[col])
+    work[COUNT] = 1
+    work[PASS_COUNT] = transforms.encode_target(df[transforms.TARGET["column"]]).astype(np.int64)
+    for source, target in SUM_COLUMNS.items():
+        work[target] = df[source].to_numpy().astype(np.int64)
+    return work.groupby(dims, dropna=False, sort=True)[MEASURES].sum().reset_index()
+
+
+def combine(partials):
+    """
+    Add several aggregate frames together.
+
+    Args:
+        partials (list): Frames returned by aggregate(); negate a frame's
+            measures to subtract it
+
+    Returns:
+        pd.DataFrame: Summed aggregates, without groups whose measures are
+        all zero
+    """
+    dims = dimensions()
+    totals = pd.concat(partials, ignore_index=True).groupby(dims, dropna=False, sort=True)[MEASURES].sum()
+    return totals[(totals != 0).any(axis=1)].reset_index()
+
+
+def _table(meta, sample, name=None):
+    """Define the summary table (or its staging copy), typing dimensions from a sample frame."""
+    columns = []
+    for col in dimensions():
+        is_int = pd.api.types.is_integer_dtype(sample[col]) if col in sample else False
+        columns.append(Column(col, Integer if is_int else String(64), nullable=False))
+    columns += [Column(m, BigInteger, nullable=False) for m in MEASURES]
+    return Table(
+        name or SUMMARY_CONFIG["table"], meta, *columns,
+        UniqueConstraint(*dimensions(), name=f"uq_{SUMMARY_CONFIG['table']}_dims"),
+    )
+
+
+def exists(eng):
+    """Return True if the summary table has been built."""
+    return inspect(eng).has_table(SUMMARY_CONFIG["table"])
+
+
+def rebuild(eng, totals, name=None):
+    """
+    Replace the summary table with the given aggregates.
+
+    Args:
+        eng: SQLAlchemy engine
+        totals (pd.DataFrame): Aggregates from aggregate() or combine()
+        name (str): Table to write instead, e.g. a staging table that a full
+            load swaps in together with students (defaults to SUMMARY_CONFIG["table"])
+    """
+    meta = MetaData()
+    table = _table(meta, totals, name)
+    with eng.begin() as conn:
+        table.drop(conn, checkfirst=True)
+        table.create(conn)
+        if len(totals):
+            conn.execute(table.insert(), totals.astype(object).to_dict("records"))
+    logger.info(f"✅ Summary table {table.name} rebuilt with {len(totals)} groups")
+
+
+def apply_delta(conn, delta):
+    """
+    Add a change in aggregates to the summary table.
+
+    Groups are upserted with their measures incremented, and groups whose
+    count drops to zero are removed.
+
+    Args:
+        conn: Open SQLAlchemy connection (part of the load's transaction)
+        delta (pd.DataFrame): Aggregates of new rows minus those of old rows
+    """
+    if delta.empty:
+        return
+    table = db_utils.reflect_table(conn, SUMMARY_CONFIG["table"])
+    if conn.dialect.name == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table)
+        stmt = stmt.on_duplicate_key_update({m: table.c[m] + stmt.inserted[m] for m in MEASURES})
+    else:
+        if conn.dialect.name == "duckdb":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=dimensions(),
+            set_={m: table.c[m] + stmt.excluded[m] for m in MEASURES},
+        )
+    conn.execute(stmt, delta.astype(object).to_dict("records"))
+    conn.execute(table.delete().where(table.c[COUNT] <= 0))
+
+
+def change_delta(new_rows, old_rows):
+    """
+    Compute the aggregate change from replacing old_rows with new_rows.
+
+    Args:
+        new_rows (pd.DataFrame): Inserted rows and new versions of updated rows
+        old_rows (pd.DataFrame): Deleted rows and old versions of updated rows
+
+    Returns:
+        pd.DataFrame: Aggregate delta for apply_delta()
+    """
+    partials = []
+    if len(new_rows):
+        partials.append(aggregate(new_rows))
+    if len(old_rows):
+        removed = aggregate(old_rows)
+        removed[MEASURES] = -removed[MEASURES]
+        partials.append(removed)
+    if not partials:
+        return pd.DataFrame(columns=dimensions() + MEASURES)
+    return combine(partials)
+
+
+def rollup_sql(group_by):
+    """Return the query read_rollup() runs for a list of dimensions."""
+    keys = ", ".join(group_by)
+    sums = ", ".join(f"SUM({m}) AS {m}" for m in MEASURES)
+    return f"SELECT {keys}, {sums} FROM {SUMMARY_CONFIG['table']} GROUP BY {keys} ORDER BY {keys}"
+
+
+def read_rollup(eng, group_by):
+    """
+    Read the measures rolled up to some of the dimensions.
+
+    Args:
+        eng: SQLAlchemy engine
+        group_by (list): Dimensions to keep
+
+    Returns:
+        pd.DataFrame: group_by columns plus n, pass_n and the sum columns
+    """
+    return query_cache.read_sql(eng, rollup_sql(group_by))
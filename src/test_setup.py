@@ -5,16 +5,79 @@ This module contains basic unit tests for the ETL, analysis, and ML components.
 """
 
 import os
+import importlib.util
+import json
+import shutil
+import subprocess
 import sqlite3
+import sys
+import tempfile
+import threading
 import unittest
+import urllib.error
+import urllib.request
+from decimal import Decimal
+from unittest import mock
 
+import numpy as np
 import pandas as pd
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.pool import NullPool
 
 # Import project modules
-from config import DATA_DIR
+from config import DATA_DIR, POWERBI_DIR, QUERIES, SUMMARIES
 from db_utils import get_engine
+import db_utils
 from etl_students import clean_data, ensure_csv
+import async_db
+import benchmark_students
+import bulk_load
+import chart_data
+import columnar_store
+import dashboard_data
+import etl_students
+import feature_store
+import forest_arrays
+import index_manager
+import incremental_training
+import ingest_students
+import instrumentation
+import model_search
+import olap_cube
+import pipeline
+import predict_service
+import query_cache
+import summary_engine
+import summary_tables
+import synthetic_students
+import transforms
+
+_PROCESSED_DIR = None
+_PROCESSED_PATCHERS = []
+
+
+def setUpModule():
+    """Write the processed CSV and columnar store to a scratch directory instead of data/"""
+    global _PROCESSED_DIR
+    _PROCESSED_DIR = tempfile.mkdtemp()
+    csv = os.path.join(_PROCESSED_DIR, "students_processed.csv")
+    store = os.path.join(_PROCESSED_DIR, "students_processed.parquet")
+    _PROCESSED_PATCHERS[:] = [
+        mock.patch.object(etl_students, "PROCESSED", csv),
+        mock.patch.object(etl_students, "PROCESSED_STORE_FILE", store),
+        mock.patch.object(columnar_store, "PROCESSED_STORE_FILE", store),
+        mock.patch.object(feature_store, "PROCESSED_FILE", csv),
+        mock.patch.object(feature_store, "PROCESSED_STORE_FILE", store),
+    ]
+    for patcher in _PROCESSED_PATCHERS:
+        patcher.start()
+    clean_data()
+
+
+def tearDownModule():
+    for patcher in reversed(_PROCESSED_PATCHERS):
+        patcher.stop()
+    shutil.rmtree(_PROCESSED_DIR, ignore_errors=True)
 
 class TestETLFunctions(unittest.TestCase):
     """Test ETL functionality"""
@@ -77,6 +140,1044 @@ class TestETLFunctions(unittest.TestCase):
         # since ensure_csv doesn't take arguments in the current implementation
         self.assertTrue(callable(ensure_csv))
 
+class TestTransforms(unittest.TestCase):
+    """Test the vectorized transform engine"""
+
+    def test_coercion_and_derivation(self):
+        """Grades become int8, bad values become 0 and the outcome is categorical"""
+        df = pd.DataFrame({'G1': ['5', 'x', '12'], 'G2': [6, 7, 8], 'G3': ['9', '10', None]})
+        out = transforms.transform(df)
+
+        self.assertEqual(str(out['G1'].dtype), 'int8')
+        self.assertEqual(list(out['G1']), [5, 0, 12])
+        self.assertEqual(list(out['G3']), [9, 10, 0])
+        self.assertIsInstance(out['final_result'].dtype, pd.CategoricalDtype)
+        self.assertEqual(list(out['final_result']), ['fail', 'pass', 'fail'])
+        self.assertEqual(list(transforms.encode_target(out['final_result'])), [0, 1, 0])
+        self.assertEqual(list(transforms.encode_target(pd.Series(['pass', 'fail']))), [1, 0])
+        mixed = pd.Series(['Pass', 'PASS', 'fail', None])
+        self.assertEqual(list(transforms.encode_target(mixed)), [1, 1, 0, 0])
+        self.assertEqual(list(transforms.encode_target(mixed.astype('category'))), [1, 1, 0, 0])
+
+    def test_out_of_range_values_rejected(self):
+        """Values that do not fit the compact dtype raise instead of wrapping"""
+        with self.assertRaises(ValueError):
+            transforms.transform(pd.DataFrame({'G1': [1], 'G2': [2], 'G3': [300]}))
+
+    def test_storage_dtypes_refuse_missing_and_fractional_values(self):
+        """Missing or fractional values are not stored as made-up integers"""
+        with self.assertRaisesRegex(ValueError, "missing"):
+            transforms.to_storage_dtypes(pd.DataFrame({'age': [15.0, np.nan, 17.0]}))
+        with self.assertRaisesRegex(ValueError, "fractional"):
+            transforms.to_storage_dtypes(pd.DataFrame({'age': [15.7, 16.0]}))
+        out = transforms.to_storage_dtypes(pd.DataFrame({'age': [15.0, 16.0]}))
+        self.assertEqual(list(out['age']), [15, 16])
+        self.assertEqual(str(out['age'].dtype), 'int8')
+
+class TestColumnarStore(unittest.TestCase):
+    """Test the typed columnar store"""
+
+    def setUp(self):
+        clean_data()
+
+    def test_projection_and_dtypes(self):
+        """Only requested columns are read, with compact dtypes"""
+        df = columnar_store.read_store(['G1', 'absences', 'Mjob'])
+        self.assertEqual(list(df.columns), ['G1', 'absences', 'Mjob'])
+        self.assertEqual(str(df['G1'].dtype), 'int8')
+        self.assertEqual(str(df['absences'].dtype), 'int16')
+        self.assertIsInstance(df['Mjob'].dtype, pd.CategoricalDtype)
+
+    def test_store_summaries_match_exports(self):
+        """Summaries computed from the store match the Power BI exports"""
+        df = columnar_store.read_store(summary_engine.required_columns())
+        results = summary_engine.run_on_frame(df)
+        for name, definition in SUMMARIES.items():
+            with open(os.path.join(POWERBI_DIR, definition["file"])) as f:
+                self.assertEqual(results[name].to_csv(index=False), f.read())
+
+class TempDatabaseTestCase(unittest.TestCase):
+    """Base class running ETL loads against a throwaway SQLite database"""
+
+    def setUp(self):
+        """Point the load at a throwaway SQLite database"""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.engine = self.make_engine()
+        for patcher in [
+            mock.patch.object(etl_students, "get_engine", return_value=self.engine),
+            mock.patch.dict(query_cache.QUERY_CACHE_CONFIG, {"dir": os.path.join(self.tmp_dir, "query_cache")}),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def make_engine(self):
+        return create_engine(f"sqlite:///{os.path.join(self.tmp_dir, 'test.db')}")
+
+    def tearDown(self):
+        self.engine.dispose()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+class TestStreamingETL(TempDatabaseTestCase):
+    """Test the chunked streaming ETL mode"""
+
+    def test_streaming_matches_in_memory(self):
+        """Streamed output is identical to the in-memory path"""
+        expected = clean_data()
+        processed = os.path.join(self.tmp_dir, "streamed.csv")
+        store = os.path.join(self.tmp_dir, "streamed.parquet")
+
+        rows = etl_students.run_streaming(chunksize=37, processed=processed, store=store)
+
+        self.assertEqual(rows, len(expected))
+        with open(etl_students.PROCESSED) as a, open(processed) as b:
+            self.assertEqual(a.read(), b.read())
+        pd.testing.assert_frame_equal(columnar_store.read_store(path=store), columnar_store.read_store())
+        loaded = pd.read_sql("SELECT * FROM students", self.engine)
+        expected = expected.astype({"final_result": str}).reset_index(drop=True)
+        pd.testing.assert_frame_equal(loaded, expected, check_dtype=False)
+
+    def test_empty_source_replaces_previous_output(self):
+        """A source without rows leaves empty outputs, not the previous run's"""
+        etl_students.load_mysql(clean_data())
+        processed = os.path.join(self.tmp_dir, "streamed.csv")
+        store = os.path.join(self.tmp_dir, "streamed.parquet")
+        with open(processed, "w") as f:
+            f.write("stale\n")
+
+        with mock.patch.object(etl_students, "iter_clean_chunks", return_value=iter([])):
+            rows = etl_students.run_streaming(processed=processed, store=store)
+
+        self.assertEqual(rows, 0)
+        written = pd.read_csv(processed)
+        self.assertTrue(written.empty)
+        self.assertIn("final_result", written.columns)
+        self.assertTrue(columnar_store.read_store(path=store).empty)
+        self.assertEqual(pd.read_sql("SELECT COUNT(*) AS n FROM students", self.engine)["n"][0], 0)
+
+class TestIncrementalLoad(TempDatabaseTestCase):
+    """Test change-detecting incremental loads"""
+
+    def test_applies_only_changes(self):
+        """Second load upserts changed rows and deletes removed ones"""
+        df = clean_data()
+        df.insert(0, "student_id", np.arange(len(df)))
+        keys = ["student_id"]
+        first = etl_students.load_incremental(df.copy(), keys)
+        self.assertEqual(first, {"inserted": len(df), "updated": 0, "deleted": 0})
+
+        changed = df.iloc[:-2].copy()
+        changed.loc[5, "G3"] = 20
+        changed.loc[5, "final_result"] = "pass"
+        second = etl_students.load_incremental(changed.copy(), keys)
+        self.assertEqual(second, {"inserted": 0, "updated": 1, "deleted": 2})
+
+        loaded = pd.read_sql("SELECT * FROM students ORDER BY student_id", self.engine)
+        self.assertEqual(len(loaded), len(changed))
+        self.assertEqual(loaded.loc[5, "G3"], 20)
+
+        third = etl_students.load_incremental(changed.copy(), keys)
+        self.assertEqual(third, {"inserted": 0, "updated": 0, "deleted": 0})
+
+    def test_content_keys_ignore_moved_rows(self):
+        """Without key columns, rows shifted by an insert or delete are not rewritten"""
+        df = clean_data()
+        etl_students.load_incremental(df.copy())
+
+        changed = df.drop(index=10).copy()
+        changed.loc[5, ["G3", "final_result"]] = [20, "pass"]
+        changed = pd.concat([changed.iloc[:50], df.iloc[[0]], changed.iloc[50:]], ignore_index=True)
+        counts = etl_students.load_incremental(changed.copy())
+        self.assertEqual(counts, {"inserted": 2, "updated": 0, "deleted": 2})
+
+        columns = list(df.columns)
+        loaded = pd.read_sql("SELECT * FROM students", self.engine)[columns]
+        expected = changed.astype({"final_result": str})
+        pd.testing.assert_frame_equal(
+            loaded.sort_values(columns).reset_index(drop=True),
+            expected.sort_values(columns).reset_index(drop=True),
+            check_dtype=False,
+        )
+
+    def test_summary_table_tracks_changes(self):
+        """The summary table is patched to match the loaded rows"""
+        df = clean_data()
+        etl_students.load_incremental(df.copy())
+
+        changed = df.iloc[3:].copy()
+        changed.loc[10, ["G3", "final_result"]] = [2, "fail"]
+        changed.loc[11, "sex"] = "M" if changed.loc[11, "sex"] == "F" else "F"
+        etl_students.load_incremental(changed.copy())
+
+        dims = summary_tables.dimensions()
+        stored = pd.read_sql(f"SELECT * FROM {summary_tables.SUMMARY_CONFIG['table']}", self.engine)
+        stored = stored.sort_values(dims).reset_index(drop=True)
+        expected = summary_tables.aggregate(changed)
+        pd.testing.assert_frame_equal(stored, expected, check_dtype=False)
+
+    def test_summary_groups_missing_dimensions(self):
+        """NULL dimension values get their own summary group instead of failing the load"""
+        df = clean_data()
+        df["address"] = df["address"].astype(object)
+        df.loc[3, "address"] = None
+        df["age"] = df["age"].astype(float)
+        df.loc[[4, 7], "age"] = np.nan
+        etl_students.load_mysql(df)
+        table = summary_tables.SUMMARY_CONFIG["table"]
+        stored = pd.read_sql(f"SELECT * FROM {table}", self.engine)
+        self.assertEqual(stored["n"].sum(), len(df))
+        self.assertEqual(stored.loc[stored["address"] == summary_tables.MISSING_TEXT, "n"].sum(), 1)
+
+        etl_students.load_incremental(df.copy())
+        changed = df.drop(index=[3, 4]).copy()
+        etl_students.load_incremental(changed.copy())
+        dims = summary_tables.dimensions()
+        stored = pd.read_sql(f"SELECT * FROM {table}", self.engine).sort_values(dims).reset_index(drop=True)
+        stored["age"] = stored["age"].astype(str)
+        expected = summary_tables.aggregate(changed)
+        expected["age"] = expected["age"].astype(str)
+        pd.testing.assert_frame_equal(stored, expected, check_dtype=False)
+
+class TestResumableLoad(TempDatabaseTestCase):
+    """Test checkpointed full loads through the staging table"""
+
+    def setUp(self):
+        super().setUp()
+        self.df = clean_data()
+        patcher = mock.patch.dict(etl_students.ETL_CONFIG, {"chunksize": 100})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _students(self):
+        return pd.read_sql("SELECT * FROM students", self.engine)
+
+    def test_failed_load_resumes_without_exposing_partial_table(self):
+        """Readers keep the previous table after a failure and the rerun writes only the missing chunks"""
+        etl_students.load_mysql(self.df.head(50))
+        write = etl_students._write_students
+        calls = []
+
+        def fail_third(eng, df, if_exists, table="students"):
+            calls.append(len(df))
+            if len(calls) == 3:
+                raise ConnectionError("connection lost")
+            write(eng, df, if_exists, table)
+
+        with mock.patch.object(etl_students, "_write_students", side_effect=fail_third):
+            with self.assertRaises(ConnectionError):
+                etl_students.load_mysql(self.df)
+        self.assertEqual(len(self._students()), 50)
+
+        calls.clear()
+        with mock.patch.object(etl_students, "_write_students", side_effect=fail_third):
+            etl_students.load_mysql(self.df)
+        self.assertEqual(calls, [100, len(self.df) - 300])
+        pd.testing.assert_frame_equal(self._students(), self.df.astype({"final_result": str}), check_dtype=False)
+        self.assertFalse(inspect(self.engine).has_table(etl_students.ETL_CONFIG["staging_table"]))
+        with self.engine.connect() as conn:
+            self.assertEqual(conn.execute(text("SELECT COUNT(*) FROM etl_load_state")).scalar(), 0)
+
+    def test_corrected_extract_is_not_mixed_with_staged_chunks(self):
+        """A resume re-hashes the staged chunks and restarts when any of their rows changed"""
+        write = etl_students._write_students
+
+        def fail_third(eng, df, if_exists, table="students"):
+            if fail_third.calls == 2:
+                raise ConnectionError("connection lost")
+            fail_third.calls += 1
+            write(eng, df, if_exists, table)
+
+        fail_third.calls = 0
+        with mock.patch.object(etl_students, "_write_students", side_effect=fail_third):
+            with self.assertRaises(ConnectionError):
+                etl_students.load_mysql(self.df)
+
+        # Same shape, one value changed in a chunk that is already staged
+        corrected = self.df.copy()
+        corrected.loc[150, "G3"] = (corrected.loc[150, "G3"] + 1) % 20
+        with mock.patch.object(etl_students, "_write_students", wraps=etl_students._write_students) as rewrite:
+            etl_students.load_mysql(corrected)
+        self.assertEqual(rewrite.call_count, 4)
+        pd.testing.assert_frame_equal(self._students(), corrected.astype({"final_result": str}), check_dtype=False)
+
+class TestBulkLoad(TempDatabaseTestCase):
+    """Test the bulk loader and its fallback"""
+
+    def test_sqlite_fast_path_matches_to_sql(self):
+        """The executemany path writes the same rows as to_sql"""
+        df = clean_data()
+        self.assertEqual(bulk_load.bulk_load(self.engine, df, "fast", method="sqlite"), "sqlite")
+        bulk_load.load_to_sql(self.engine, df, "slow", "replace")
+
+        fast = pd.read_sql("SELECT * FROM fast", self.engine)
+        slow = pd.read_sql("SELECT * FROM slow", self.engine)
+        pd.testing.assert_frame_equal(fast, slow)
+
+    def test_falls_back_to_to_sql(self):
+        """A failing native loader falls back to to_sql"""
+        df = clean_data()
+        self.assertEqual(bulk_load.bulk_load(self.engine, df, "students", method="mysql"), "to_sql")
+        count = pd.read_sql("SELECT COUNT(*) AS n FROM students", self.engine)["n"][0]
+        self.assertEqual(count, len(df))
+
+class TestSummaryEngine(TempDatabaseTestCase):
+    """Test the single-scan summary engine"""
+
+    def test_reports_share_one_scan(self):
+        """All default reports come from one scan and match the per-report SQL"""
+        self.assertEqual(len(summary_engine.plan_scans()), 1)
+        etl_students.load_mysql(clean_data())
+
+        results = summary_engine.run_on_engine(self.engine)
+        for name in SUMMARIES:
+            expected = pd.read_sql(QUERIES[name], self.engine)
+            pd.testing.assert_frame_equal(results[name], expected, check_dtype=False)
+
+    def test_avg_ignores_nulls_like_sql(self):
+        """Averages divide by the column's non-NULL count, as AVG does"""
+        definitions = {"avg_absences": {"group_by": ["sex"], "measures": {"avg": ("avg", "absences")}}}
+        df = clean_data()
+        df["absences"] = df["absences"].astype(float)
+        df.loc[df.index[::3], "absences"] = np.nan
+        df.to_sql("sparse", self.engine, index=False)
+        expected = pd.read_sql("SELECT sex, AVG(absences) AS avg FROM sparse GROUP BY sex ORDER BY sex", self.engine)
+
+        from_db = summary_engine.run_on_engine(self.engine, definitions, table="sparse")["avg_absences"]
+        from_frame = summary_engine.run_on_frame(df, definitions)["avg_absences"]
+        pd.testing.assert_frame_equal(from_db, expected, check_dtype=False)
+        pd.testing.assert_frame_equal(from_frame, expected, check_dtype=False)
+
+    def test_scans_split_at_column_cap(self):
+        """Reports are split into more scans when the column cap is reached"""
+        scans = summary_engine.plan_scans(max_group_columns=2)
+        self.assertEqual(sorted(len(s["group_by"]) for s in scans), [1, 2])
+
+@unittest.skipUnless(importlib.util.find_spec("duckdb_engine"), "duckdb-engine not installed")
+class TestDuckDBBackend(TempDatabaseTestCase):
+    """Test that loads, summaries and dashboard queries run unchanged on DuckDB"""
+
+    def make_engine(self):
+        # Set up like db_utils' DuckDB fallback engine
+        engine = create_engine(f"duckdb:///{os.path.join(self.tmp_dir, 'test.duckdb')}", poolclass=NullPool)
+        db_utils._wait_for_duckdb_lock(engine)
+        return engine
+
+    def _open_elsewhere(self, seconds=0):
+        """Open the database file in another process, holding it for seconds."""
+        script = (
+            "import sys, time, duckdb\n"
+            "con = duckdb.connect(sys.argv[1])\n"
+            "print('open', flush=True)\n"
+            "time.sleep(float(sys.argv[2]))\n"
+        )
+        other = subprocess.Popen(
+            [sys.executable, "-c", script, self.engine.url.database, str(seconds)],
+            stdout=subprocess.PIPE, text=True,
+        )
+        self.addCleanup(other.stdout.close)
+        self.addCleanup(other.wait)
+        self.addCleanup(other.kill)
+        return other
+
+    def test_file_released_between_operations(self):
+        """Another process can open the file after a query, and queries wait for its lock"""
+        etl_students.load_mysql(clean_data().head(20))
+        other = self._open_elsewhere(seconds=0.5)
+        self.assertEqual(other.stdout.readline().strip(), "open")
+        # Waits for the other process to let go instead of failing
+        self.assertEqual(dashboard_data.load_kpis(self.engine)["total_students"], 20)
+        other.wait(10)
+        self.assertEqual(other.returncode, 0)
+
+    def test_lock_conflict_is_explained(self):
+        """A file held past DB_DUCKDB_LOCK_WAIT raises an error naming the conflict"""
+        other = self._open_elsewhere(seconds=30)
+        self.assertEqual(other.stdout.readline().strip(), "open")
+        with mock.patch.dict(db_utils.DB_CONFIG, {"duckdb_lock_wait": 0.2}):
+            with self.assertRaisesRegex(RuntimeError, "open in another process"):
+                with self.engine.connect():
+                    pass
+
+    def test_load_and_summaries(self):
+        """Full and incremental loads feed the same summaries as on SQLite"""
+        df = clean_data()
+        etl_students.load_mysql(df)
+        self.assertEqual(bulk_load.bulk_load(self.engine, df.head(10), "scratch"), "duckdb")
+
+        results = summary_engine.run_on_engine(self.engine)
+        for name in SUMMARIES:
+            expected = pd.read_sql(QUERIES[name], self.engine)
+            pd.testing.assert_frame_equal(results[name], expected, check_dtype=False)
+        self.assertEqual(dashboard_data.load_kpis(self.engine)["total_students"], len(df))
+
+        etl_students.load_incremental(df)
+        changed = df.iloc[:-5].copy()
+        changed.loc[:9, "G3"] = 0
+        etl_students.load_incremental(changed)
+        self.assertEqual(dashboard_data.load_kpis(self.engine)["total_students"], len(df) - 5)
+        by_age = dashboard_data.load_avg_grade_by(self.engine, "age")
+        with mock.patch.object(summary_tables, "exists", return_value=False):
+            pd.testing.assert_frame_equal(dashboard_data.load_avg_grade_by(self.engine, "age"), by_age, check_dtype=False)
+
+class TestQueryCache(TempDatabaseTestCase):
+    """Test the versioned query result cache"""
+
+    def test_load_invalidates_cached_results(self):
+        """Repeats come from the cache until a load bumps the table version"""
+        etl_students.load_mysql(clean_data())
+        first = query_cache.run_query("age_analysis", eng=self.engine)
+        with mock.patch.object(query_cache.pd, "read_sql", side_effect=AssertionError("query ran")):
+            pd.testing.assert_frame_equal(query_cache.run_query("age_analysis", eng=self.engine), first)
+
+        etl_students.load_mysql(clean_data().assign(G3=0))
+        after = query_cache.run_query("age_analysis", eng=self.engine)
+        self.assertTrue((after["avg_final"] == 0).all())
+
+    def test_rebuilt_database_misses_old_entries(self):
+        """A database recreated at the same path does not match the old one's results"""
+        sql = "SELECT COUNT(*) AS n FROM students"
+        etl_students.load_mysql(clean_data().head(5))
+        self.assertEqual(query_cache.read_sql(self.engine, sql)["n"][0], 5)
+
+        self.engine.dispose()
+        os.remove(os.path.join(self.tmp_dir, "test.db"))
+        etl_students.load_mysql(clean_data().head(7))
+        self.assertEqual(query_cache.read_sql(self.engine, sql)["n"][0], 7)
+
+    def test_disk_cache_survives_memory(self):
+        """A result evicted from memory is read back from Parquet"""
+        etl_students.load_mysql(clean_data())
+        sql = "SELECT sex, COUNT(*) AS n FROM students WHERE age >= :age GROUP BY sex ORDER BY sex"
+        expected = query_cache.read_sql(self.engine, sql, {"age": 17})
+        with mock.patch.dict(query_cache.QUERY_CACHE_CONFIG, {"max_memory_entries": 0}):
+            query_cache.read_sql(self.engine, "SELECT COUNT(*) AS n FROM students")
+        with mock.patch.object(query_cache.pd, "read_sql", side_effect=AssertionError("query ran")):
+            pd.testing.assert_frame_equal(
+                query_cache.read_sql(self.engine, sql, {"age": 17}), expected, check_dtype=False
+            )
+        self.assertNotEqual(len(query_cache.read_sql(self.engine, sql, {"age": 19})), 0)
+
+class TestAsyncAccess(TempDatabaseTestCase):
+    """Test concurrent query execution"""
+
+    def setUp(self):
+        super().setUp()
+        etl_students.load_mysql(clean_data())
+        self.queries = [
+            ("SELECT COUNT(*) AS n FROM students WHERE age = :age", {"age": age}) for age in range(15, 23)
+        ]
+
+    def _expected(self):
+        return [int(pd.read_sql(text(sql), self.engine, params=p)["n"].iloc[0]) for sql, p in self.queries]
+
+    def test_thread_fallback_keeps_order(self):
+        """Without async drivers queries run on threads and results keep their order"""
+        with mock.patch.dict(async_db.DB_CONFIG, {"async_enabled": False}):
+            self.assertFalse(db_utils.async_available(self.engine))
+            frames = async_db.read_many(self.queries, self.engine, limit=3)
+        self.assertEqual([int(df["n"].iloc[0]) for df in frames], self._expected())
+
+    @unittest.skipUnless(
+        all(importlib.util.find_spec(m) for m in ("greenlet", "aiosqlite")), "async drivers not installed"
+    )
+    def test_async_engine_matches_sync(self):
+        """The asyncio path returns what the sync engine does"""
+        with mock.patch.dict(async_db.DB_CONFIG, {"async_enabled": True}), \
+                mock.patch.object(async_db, "read_many_async", wraps=async_db.read_many_async) as run_async:
+            self.assertTrue(db_utils.async_available(self.engine))
+            frames = async_db.read_many(self.queries, self.engine, limit=3)
+        run_async.assert_called_once()
+        self.assertEqual([int(df["n"].iloc[0]) for df in frames], self._expected())
+
+    def test_decimal_results_become_floats(self):
+        """Async frames coerce Decimals (aiomysql SUM/AVG) to floats like pd.read_sql"""
+        df = async_db.frame_from_rows([("GP", Decimal("12.346"), 3)], ["school", "avg_g3", "n"])
+        self.assertEqual(df["avg_g3"].dtype, np.float64)
+        self.assertEqual(df.round(2)["avg_g3"].iloc[0], 12.35)
+        self.assertEqual(df["school"].iloc[0], "GP")
+
+class TestOlapCube(TempDatabaseTestCase):
+    """Test the bitmap-indexed cube behind the dashboard filters"""
+
+    def setUp(self):
+        super().setUp()
+        self.df = clean_data()
+        etl_students.load_mysql(self.df)
+
+    def test_filtered_breakdown_matches_pandas(self):
+        """Filters and group-bys agree with a pandas groupby over the rows"""
+        cube = olap_cube.build_cube(self.engine, chunksize=100)
+        result = cube.query({"school": "GP", "Mjob": ["health", "teacher"]}, ["sex", "age"])
+
+        rows = self.df[(self.df["school"] == "GP") & self.df["Mjob"].isin(["health", "teacher"])]
+        expected = rows.groupby(["sex", "age"]).agg(
+            n=("G3", "size"), G3_mean=("G3", "mean"), G3_std=("G3", lambda g: g.std(ddof=0)),
+        ).reset_index()
+        self.assertEqual(list(result["n"]), list(expected["n"]))
+        self.assertEqual(list(result["age"]), list(expected["age"]))
+        np.testing.assert_allclose(result["G3_mean"], expected["G3_mean"])
+        np.testing.assert_allclose(result["G3_std"], expected["G3_std"], atol=1e-9)
+
+        totals = cube.query().iloc[0]
+        self.assertEqual(totals["n"], len(self.df))
+        self.assertEqual(totals["passed"], int((self.df["final_result"] == "pass").sum()))
+        self.assertEqual(cube.query({"school": "nowhere"}).iloc[0]["n"], 0)
+
+    def test_cube_rebuilt_after_load(self):
+        """get_cube() reuses the cube until the next load bumps the table version"""
+        first = olap_cube.get_cube(self.engine)
+        self.assertIs(olap_cube.get_cube(self.engine), first)
+        etl_students.load_mysql(self.df.head(100))
+        second = olap_cube.get_cube(self.engine)
+        self.assertIsNot(second, first)
+        self.assertEqual(second.rows, 100)
+
+    def test_build_does_not_block_other_databases(self):
+        """A slow build holds only its own database; engines on one file share a cube"""
+        other = create_engine(f"sqlite:///{os.path.join(self.tmp_dir, 'other.db')}")
+        self.addCleanup(other.dispose)
+        self.df.head(50).to_sql("students", other, index=False)
+        query_cache.bump_versions(other, ["students"])
+
+        started, release = threading.Event(), threading.Event()
+        real_build = olap_cube.build_cube
+
+        def slow_build(eng, *args, **kwargs):
+            if eng is self.engine:
+                started.set()
+                release.wait(10)
+            return real_build(eng, *args, **kwargs)
+
+        with mock.patch.object(olap_cube, "build_cube", side_effect=slow_build):
+            worker = threading.Thread(target=olap_cube.get_cube, args=(self.engine,))
+            worker.start()
+            self.assertTrue(started.wait(10))
+            try:
+                self.assertEqual(olap_cube.get_cube(other).rows, 50)
+            finally:
+                release.set()
+                worker.join()
+
+        same_file = create_engine(self.engine.url)
+        self.addCleanup(same_file.dispose)
+        self.assertIs(olap_cube.get_cube(same_file), olap_cube.get_cube(self.engine))
+
+class TestChartData(TempDatabaseTestCase):
+    """Test fixed-size chart aggregation"""
+
+    def setUp(self):
+        super().setUp()
+        self.df = clean_data()
+        etl_students.load_mysql(self.df)
+
+    def test_bins_exact_for_small_integer_columns(self):
+        """Discrete columns keep one bin per value; wide ones are capped at bins per axis"""
+        sql, params, finish = chart_data.bin2d_plan(self.engine, "studytime", "G3")
+        binned = finish(query_cache.read_sql(self.engine, sql, params))
+        exact = dashboard_data.load_point_counts(self.engine, "studytime", "G3")
+        np.testing.assert_array_equal(binned[["studytime", "G3", "n"]].to_numpy(), exact.to_numpy())
+
+        sql, params, finish = chart_data.bin2d_plan(self.engine, "absences", "G3", bins=4)
+        coarse = finish(query_cache.read_sql(self.engine, sql, params))
+        self.assertLessEqual(len(coarse), 16)
+        self.assertEqual(coarse["n"].sum(), len(self.df))
+        hexes = chart_data.hexbin(coarse, "absences", "G3", gridsize=3)
+        self.assertEqual(hexes["n"].sum(), len(self.df))
+
+    def test_lttb_keeps_extremes(self):
+        """LTTB returns the requested number of points, including ends and spikes"""
+        x = np.arange(10_000)
+        y = np.sin(x / 500.0)
+        y[4321] = 50
+        kept = chart_data.lttb(x, y, 100)
+        self.assertEqual(len(kept), 100)
+        self.assertEqual((kept[0], kept[-1]), (0, 9_999))
+        self.assertIn(4321, kept)
+        self.assertTrue((np.diff(kept) > 0).all())
+        np.testing.assert_array_equal(chart_data.lttb(x[:50], y[:50], 100), np.arange(50))
+
+class TestIndexManager(TempDatabaseTestCase):
+    """Test the workload-driven indexes on the students table"""
+
+    def setUp(self):
+        super().setUp()
+        etl_students.load_mysql(clean_data())
+
+    def test_load_builds_workload_indexes(self):
+        """The load creates one covering index per query shape and later runs keep or drop them"""
+        indexes = index_manager.recommend(self.engine)
+        served = {q for ix in indexes for q in ix["queries"]}
+        self.assertTrue({"gender_analysis", "age_analysis", "summary_scan_0", "dashboard_kpis"} <= served)
+        gender = next(ix for ix in indexes if "gender_analysis" in ix["queries"])
+        self.assertEqual(gender["key"][0], "sex")
+
+        existing = {ix["name"] for ix in inspect(self.engine).get_indexes("students")}
+        self.assertTrue({ix["name"] for ix in indexes} <= existing)
+        self.assertEqual(index_manager.ensure_indexes(self.engine)["created"], [])
+
+        only_gender = {"gender_analysis": QUERIES["gender_analysis"]}
+        changes = index_manager.ensure_indexes(self.engine, only_gender)
+        self.assertEqual(changes["kept"], [gender["name"]])
+        self.assertEqual(len(changes["dropped"]), len(indexes) - 1)
+
+    def test_reload_swaps_in_indexed_table(self):
+        """Indexes and statistics are built on staging, so students is never unindexed"""
+        wanted = {tuple(ix["columns"]) for ix in index_manager.recommend(self.engine)}
+        swap = etl_students._swap_in
+        seen = {}
+
+        def check_swap(eng, swaps):
+            seen["live"] = set(map(tuple, index_manager._managed_indexes(eng).values()))
+            seen["staging"] = set(map(tuple, index_manager._managed_indexes(eng, "students_staging").values()))
+            seen["summary"] = inspect(eng).has_table("student_summary_staging")
+            swap(eng, swaps)
+
+        with mock.patch.object(etl_students, "_swap_in", side_effect=check_swap):
+            etl_students.load_mysql(clean_data().head(200))
+        self.assertEqual(seen, {"live": wanted, "staging": wanted, "summary": True})
+
+        # Staging names alternate so they never clash with the live table's
+        after = index_manager._managed_indexes(self.engine)
+        self.assertEqual(set(map(tuple, after.values())), wanted)
+        self.assertTrue(all(name.endswith("_1") for name in after))
+        self.assertEqual(index_manager.ensure_indexes(self.engine)["created"], [])
+        with self.engine.connect() as conn:
+            stats = {row[0] for row in conn.execute(text("SELECT tbl FROM sqlite_stat1"))}
+        self.assertIn("students", stats)
+        self.assertNotIn("students_staging", stats)
+        self.assertEqual(dashboard_data.load_kpis(self.engine)["total_students"], 200)
+
+    def test_plans_use_covering_indexes(self):
+        """Queries scan the table before indexing and only an index after"""
+        sql = QUERIES["gender_analysis"]
+        indexes = index_manager.recommend(self.engine)
+        with self.engine.begin() as conn:
+            for ix in indexes:
+                conn.execute(text(f'DROP INDEX IF EXISTS "{ix["name"]}"'))
+        self.assertTrue(index_manager.explain(self.engine, sql)["full_scan"])
+
+        report = index_manager.tune(self.engine, report_path=os.path.join(self.tmp_dir, "report.json"))
+        after = report["queries"]["gender_analysis"]["after"]
+        self.assertFalse(after["full_scan"])
+        self.assertIn("COVERING INDEX", after["plan"])
+        self.assertTrue(os.path.exists(os.path.join(self.tmp_dir, "report.json")))
+
+class TestDashboardData(TempDatabaseTestCase):
+    """Test the dashboard's server-side queries"""
+
+    def setUp(self):
+        super().setUp()
+        self.df = clean_data()
+        etl_students.load_mysql(self.df)
+
+    def test_summary_and_raw_queries_agree(self):
+        """KPIs and charts are the same with and without the summary table"""
+        kpis = dashboard_data.load_kpis(self.engine)
+        self.assertEqual(kpis["total_students"], len(self.df))
+        self.assertEqual(kpis["passed"], int((self.df["final_result"] == "pass").sum()))
+        by_sex = dashboard_data.load_pass_rate_by(self.engine, "sex")
+        by_age = dashboard_data.load_avg_grade_by(self.engine, "age")
+
+        with mock.patch.object(summary_tables, "exists", return_value=False):
+            self.assertEqual(dashboard_data.load_kpis(self.engine), kpis)
+            pd.testing.assert_frame_equal(dashboard_data.load_pass_rate_by(self.engine, "sex"), by_sex)
+            pd.testing.assert_frame_equal(dashboard_data.load_avg_grade_by(self.engine, "age"), by_age)
+
+    def test_rollup_and_raw_queries_ignore_label_case(self):
+        """Mixed-case outcomes count the same from the summary table and from students"""
+        mixed = self.df.astype({"final_result": str})
+        mixed["final_result"] = mixed["final_result"].where(mixed.index % 2 == 0, mixed["final_result"].str.upper())
+        etl_students.load_mysql(mixed)
+        kpis = dashboard_data.load_kpis(self.engine)
+        self.assertEqual(kpis["passed"], int((self.df["final_result"] == "pass").sum()))
+        with mock.patch.object(summary_tables, "exists", return_value=False):
+            self.assertEqual(dashboard_data.load_kpis(self.engine), kpis)
+
+    def test_panels_match_single_loads(self):
+        """Panels run together give the same results as one query at a time"""
+        panels = dashboard_data.load_panels(self.engine, {
+            "kpis": dashboard_data.kpi_plan(self.engine),
+            "by_sex": dashboard_data.pass_rate_plan(self.engine, "sex"),
+            "points": dashboard_data.point_counts_plan(self.engine, "studytime", "G3"),
+        })
+        self.assertEqual(panels["kpis"], dashboard_data.load_kpis(self.engine))
+        pd.testing.assert_frame_equal(panels["by_sex"], dashboard_data.load_pass_rate_by(self.engine, "sex"))
+        pd.testing.assert_frame_equal(panels["points"], dashboard_data.load_point_counts(self.engine, "studytime", "G3"))
+
+    def test_pages(self):
+        """Pages are bounded slices of the table"""
+        page = dashboard_data.load_page(self.engine, 2, 100)
+        self.assertEqual(len(page), 100)
+        self.assertEqual(list(page["G3"]), list(self.df["G3"].iloc[100:200]))
+        self.assertIn("ORDER BY rowid", dashboard_data.page_sql(self.engine))
+        last = dashboard_data.load_page(self.engine, 4, 100)
+        self.assertEqual(list(last["G3"]), list(self.df["G3"].iloc[300:]))
+        self.assertTrue(dashboard_data.load_page(self.engine, 5, 100).empty)
+
+    def test_pages_follow_row_id(self):
+        """A surrogate row_id, as full loads add on MySQL, orders the pages"""
+        numbered = self.df.assign(row_id=np.arange(len(self.df), 0, -1))
+        numbered.to_sql("students", self.engine, if_exists="replace", index=False)
+        self.assertEqual(db_utils.paging_key(self.engine), "row_id")
+        page = dashboard_data.load_page(self.engine, 1, 10)
+        self.assertEqual(list(page["row_id"]), list(range(1, 11)))
+        self.assertEqual(list(page["G3"]), list(self.df["G3"].iloc[::-1].iloc[:10]))
+
+class TestPredictionService(TempDatabaseTestCase):
+    """Test batch and micro-batched scoring"""
+
+    def setUp(self):
+        super().setUp()
+        self.df = clean_data()
+        self.model = predict_service.get_model()
+        self.expected = self.model.predict_proba(self.df[predict_service.model_features(self.model)])[:, 1]
+
+    def test_score_table_in_chunks(self):
+        """Chunked table scoring writes one prediction per student"""
+        etl_students.load_mysql(self.df)
+        rows = predict_service.score_table(self.engine, chunksize=100, model=self.model)
+
+        self.assertEqual(rows, len(self.df))
+        scored = pd.read_sql("SELECT * FROM student_predictions ORDER BY row_id", self.engine)
+        self.assertEqual(list(scored["row_id"]), list(range(1, len(self.df) + 1)))
+        self.assertTrue((abs(scored["pass_probability"] - self.expected) < 1e-9).all())
+        expected_labels = pd.Series(self.model.predict(self.df[self.model.feature_names_in_])).map({0: "fail", 1: "pass"})
+        self.assertEqual(list(scored["predicted_result"]), list(expected_labels))
+
+    def test_unkeyed_table_scores_with_key_columns(self):
+        """Tables without a paging key write the configured key columns next to each prediction"""
+        etl_students.load_mysql(self.df)
+        with self.engine.connect() as conn:
+            # This path streams while writing, as MySQL allows; WAL lets SQLite do the same
+            conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+        with mock.patch.object(db_utils, "paging_key", return_value=None):
+            with mock.patch.dict(etl_students.ETL_CONFIG, {"key_columns": []}):
+                with self.assertRaises(ValueError):
+                    predict_service.score_table(self.engine, chunksize=100, model=self.model)
+            with mock.patch.dict(etl_students.ETL_CONFIG, {"key_columns": ["school", "age"]}):
+                predict_service.score_table(self.engine, chunksize=100, model=self.model)
+
+        scored = pd.read_sql("SELECT * FROM student_predictions", self.engine)
+        self.assertEqual(list(scored.columns), ["school", "age", "pass_probability", "predicted_result"])
+        self.assertEqual(list(scored["age"]), list(self.df["age"]))
+        self.assertTrue((abs(scored["pass_probability"] - self.expected) < 1e-9).all())
+
+    def test_score_file_streams_unless_cached(self):
+        """Files are featurized chunk by chunk on a miss and read from a warm feature cache"""
+        output = os.path.join(self.tmp_dir, "scored.csv")
+        with mock.patch.dict(feature_store.FEATURE_STORE_CONFIG, {"dir": os.path.join(self.tmp_dir, "features")}):
+            with mock.patch.object(feature_store, "get_features", side_effect=AssertionError("full read")), \
+                    mock.patch.object(feature_store, "compute_features", wraps=feature_store.compute_features) as compute:
+                rows = predict_service.score_file(etl_students.PROCESSED, output, chunksize=100, model=self.model)
+            self.assertEqual(rows, len(self.df))
+            self.assertEqual(compute.call_count, 4)
+            streamed = pd.read_csv(output)
+
+            feature_store.get_features(etl_students.PROCESSED, "base")
+            with mock.patch.object(feature_store, "compute_features", side_effect=AssertionError("cache miss")):
+                predict_service.score_file(etl_students.PROCESSED, output, chunksize=100, model=self.model)
+        pd.testing.assert_frame_equal(pd.read_csv(output), streamed)
+        self.assertTrue((abs(streamed["pass_probability"] - self.expected) < 1e-6).all())
+
+    def test_micro_batcher_matches_model(self):
+        """Concurrent single-record requests get their own probabilities"""
+        records = self.df[predict_service.model_features(self.model)].to_dict("records")
+        batcher = predict_service.MicroBatcher(self.model, max_batch=16, max_wait_ms=5)
+        try:
+            futures = [batcher.submit(r) for r in records]
+            results = [f.result(timeout=10) for f in futures]
+        finally:
+            batcher.close()
+        self.assertEqual(results, [float(p) for p in self.expected])
+        self.assertLess(batcher.batches, len(records))
+
+    def test_server_rejects_malformed_records(self):
+        """Bad input gets a 400 JSON reply and does not fail other callers"""
+        record = {k: float(v) for k, v in self.df[predict_service.model_features(self.model)].iloc[0].items()}
+        batcher = predict_service.MicroBatcher(self.model, max_batch=16, max_wait_ms=5)
+        server = predict_service.make_server(batcher, "127.0.0.1", 0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}/predict"
+
+        def post(body):
+            request = urllib.request.Request(url, data=body.encode(), headers={"Content-Type": "application/json"})
+            try:
+                with urllib.request.urlopen(request, timeout=10) as response:
+                    return response.status, json.loads(response.read())
+            except urllib.error.HTTPError as e:
+                return e.code, json.loads(e.read())
+
+        real_predict = predict_service.predict_proba
+
+        def reject_negative(X, model=None):
+            if (X["G1"] < 0).any():
+                raise ValueError("negative grade")
+            return real_predict(X, model)
+
+        try:
+            with mock.patch.object(predict_service, "predict_proba", side_effect=reject_negative):
+                good, bad = batcher.submit(record), batcher.submit(dict(record, G1=-1))
+                self.assertAlmostEqual(good.result(timeout=10), float(self.expected[0]))
+                self.assertRaises(ValueError, bad.result, timeout=10)
+            for body in ['{"G1": "abc"}', json.dumps(dict(record, G1="abc")), "[1, 2]", "not json", json.dumps([record, None])]:
+                status, reply = post(body)
+                self.assertEqual(status, 400, body)
+                self.assertIn("error", reply)
+            status, reply = post(json.dumps([record, dict(record, G1=None)]))
+            self.assertEqual(status, 200)
+            self.assertAlmostEqual(reply["pass_probability"][0], float(self.expected[0]))
+        finally:
+            server.shutdown()
+            server.server_close()
+            batcher.close()
+
+class TestForestArrays(unittest.TestCase):
+    """Test the memory-mapped forest export"""
+
+    def test_predictions_are_bit_identical(self):
+        """The exported forest reproduces predict_proba exactly"""
+        model = predict_service.get_model(predict_service.PREDICT_CONFIG["model"])
+        X = clean_data()[predict_service.model_features(model)].astype(float)
+        X.iloc[::5, 2] = float("nan")
+        with tempfile.TemporaryDirectory() as tmp:
+            forest_arrays.export_forest(model, tmp)
+            forest = predict_service.get_model(tmp)
+            self.assertIsInstance(forest, forest_arrays.CompactForest)
+            self.assertTrue((forest.predict_proba(X) == model.predict_proba(X)).all())
+            self.assertEqual(list(forest.predict(X)), list(model.predict(X)))
+            predict_service._MODELS.pop(tmp)
+
+class TestFeatureStore(unittest.TestCase):
+    """Test the cached, versioned feature matrices"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir, ignore_errors=True)
+        patcher = mock.patch.dict(feature_store.FEATURE_STORE_CONFIG, {"dir": self.tmp_dir, "max_entries": 1})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_cache_hit_matches_computed_matrix(self):
+        """A second read is served from the cache with identical values"""
+        X, y = feature_store.get_features(name="extended")
+        with mock.patch.object(feature_store, "compute_features", side_effect=AssertionError("cache miss")):
+            cached_X, cached_y = feature_store.get_features(name="extended")
+        pd.testing.assert_frame_equal(cached_X, X)
+        self.assertEqual(list(cached_y), list(y))
+        self.assertEqual(list(X.columns), feature_store.feature_columns("extended"))
+        self.assertEqual(X["Mjob_teacher"].sum(), (clean_data()["Mjob"] == "teacher").sum())
+
+    def test_version_bump_and_eviction(self):
+        """A new feature-set version misses the cache and evicts the old entry"""
+        old_key = feature_store.cache_key(feature_store.default_source(), "base")
+        feature_store.get_features(name="base")
+        with mock.patch.dict(feature_store.FEATURE_SETS["base"], {"version": 2}):
+            new_key = feature_store.cache_key(feature_store.default_source(), "base")
+            feature_store.get_features(name="base")
+        self.assertNotEqual(old_key, new_key)
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir, old_key)))
+        self.assertTrue(os.path.exists(os.path.join(self.tmp_dir, new_key)))
+
+class TestModelSearch(unittest.TestCase):
+    """Test the successive-halving hyperparameter search"""
+
+    def test_search_reports_every_configuration(self):
+        """The search returns a grid point and times each configuration"""
+        df = clean_data()
+        X, y = feature_store.compute_features(df, "base"), transforms.encode_target(df["final_result"])
+        grid = {"n_estimators": [10, 20], "max_depth": [3, None]}
+
+        params, table = model_search.search(X, y, grid=grid, folds=3, n_jobs=2, factor=2)
+
+        self.assertIn(params["n_estimators"], grid["n_estimators"])
+        self.assertIn(params["max_depth"], grid["max_depth"])
+        first_round = table[table["round"] == 0]
+        self.assertEqual(len(first_round), 4)
+        self.assertLess(len(table[table["round"] == table["round"].max()]), 4)
+        self.assertTrue((table["fit_s"] >= 0).all())
+
+class TestIncrementalTraining(TempDatabaseTestCase):
+    """Test out-of-core shard training and streaming metrics"""
+
+    def test_db_and_store_shards(self):
+        """Both sources hold out the same rows and merge every shard's trees"""
+        etl_students.load_mysql(clean_data())
+        params = {"n_estimators": 20, "max_depth": 5}
+        with mock.patch.object(incremental_training, "get_engine", return_value=self.engine):
+            model, metrics = incremental_training.train_incremental("db", batch_size=100, params=params)
+        store_model, store_metrics = incremental_training.train_incremental("store", batch_size=100, params=params)
+
+        self.assertEqual(len(model.estimators_), model.n_estimators)
+        self.assertEqual(list(metrics.support), list(store_metrics.support))
+        self.assertGreater(metrics.support.sum(), 0)
+
+    def test_streaming_metrics_match_sklearn(self):
+        """Batch-accumulated confusion matrix equals the one-shot result"""
+        from sklearn.metrics import confusion_matrix
+        y_true, y_pred = [0, 1, 1, 0, 1, 1, 0], [0, 1, 0, 0, 1, 1, 1]
+        metrics = incremental_training.StreamingMetrics()
+        metrics.update(y_true[:3], y_pred[:3])
+        metrics.update(y_true[3:], y_pred[3:])
+        self.assertEqual(metrics.confusion.tolist(), confusion_matrix(y_true, y_pred).tolist())
+        self.assertAlmostEqual(metrics.accuracy, 5 / 7)
+
+class TestPipeline(unittest.TestCase):
+    """Test the dependency-aware pipeline runner"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir, ignore_errors=True)
+        patcher = mock.patch.dict(pipeline.PIPELINE_CONFIG, {
+            "state_file": os.path.join(self.tmp_dir, "state.json"),
+            "runs_file": os.path.join(self.tmp_dir, "runs.jsonl"),
+        })
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.inputs = {"a": 1, "b": 1, "c": 1}
+        self.calls = []
+
+    def _stages(self, fail=None):
+        def stage(name, deps):
+            def run():
+                if name == fail:
+                    raise RuntimeError("boom")
+                self.calls.append(name)
+            return {"deps": deps, "inputs": lambda: {name: self.inputs[name]}, "outputs": lambda: True, "run": run}
+        return {"a": stage("a", []), "b": stage("b", ["a"]), "c": stage("c", ["a"])}
+
+    def test_unchanged_stages_are_skipped(self):
+        """Only stages whose inputs changed run again, and every run is logged"""
+        first = pipeline.run_pipeline(stages=self._stages())
+        self.assertEqual(self.calls[0], "a")
+        self.assertEqual(sorted(self.calls), ["a", "b", "c"])
+
+        self.calls.clear()
+        self.inputs["c"] = 2
+        second = pipeline.run_pipeline(stages=self._stages())
+        self.assertEqual(self.calls, ["c"])
+        self.assertEqual(second["stages"]["b"]["cache"], "hit")
+        self.assertTrue(first["ok"] and second["ok"])
+        with open(pipeline.PIPELINE_CONFIG["runs_file"]) as f:
+            self.assertEqual(len(f.readlines()), 2)
+
+    def test_table_state_reads_version_not_rows(self):
+        """A loaded table is identified by its data version, which each load changes"""
+        tmp_db = os.path.join(self.tmp_dir, "versions.db")
+        engine = create_engine(f"sqlite:///{tmp_db}")
+        self.addCleanup(engine.dispose)
+        with mock.patch.object(etl_students, "get_engine", return_value=engine):
+            etl_students.load_mysql(clean_data())
+            with mock.patch.object(pipeline, "table_hash", side_effect=AssertionError("full scan")):
+                first = pipeline.table_state("students", engine)
+                self.assertEqual(pipeline.table_state("students", engine), first)
+                etl_students.load_mysql(clean_data())
+                self.assertNotEqual(pipeline.table_state("students", engine), first)
+        self.assertIsNone(pipeline.table_state("missing", engine))
+
+    def test_failure_blocks_dependents(self):
+        """A failed stage blocks the stages that depend on it"""
+        result = pipeline.run_pipeline(stages=self._stages(fail="a"))
+        self.assertFalse(result["ok"])
+        self.assertEqual(result["stages"]["a"]["status"], "failed")
+        self.assertEqual(result["stages"]["b"]["status"], "blocked")
+        self.assertEqual(self.calls, [])
+
+class TestInstrumentation(unittest.TestCase):
+    """Test spans, query timings and metrics export"""
+
+    def setUp(self):
+        instrumentation.reset()
+        self.addCleanup(instrumentation.reset)
+        patcher = mock.patch.dict(instrumentation.METRICS_CONFIG, {"enabled": True})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_spans_and_queries_are_recorded(self):
+        """Spans aggregate calls and rows; engine statements are timed by kind"""
+        for _ in range(2):
+            with instrumentation.span("test.step") as s:
+                s.add_rows(10)
+        eng = create_engine("sqlite://")
+        instrumentation.instrument_engine(eng)
+        with eng.connect() as conn:
+            conn.exec_driver_sql("SELECT 1")
+
+        data = instrumentation.snapshot()
+        self.assertEqual(data["spans"]["test.step"]["calls"], 2)
+        self.assertEqual(data["spans"]["test.step"]["rows"], 20)
+        self.assertEqual(data["queries"]["select"]["calls"], 1)
+        self.assertIn('student_analytics_span_rows_total{span="test.step"} 20', instrumentation.to_prometheus())
+
+    def test_disabled_records_nothing(self):
+        """With metrics off, spans are no-ops"""
+        with mock.patch.dict(instrumentation.METRICS_CONFIG, {"enabled": False}):
+            with instrumentation.span("test.off") as s:
+                s.add_rows(5)
+            instrumentation.timed("test.off")(lambda: None)()
+        self.assertNotIn("test.off", instrumentation.snapshot()["spans"])
+
+class TestBenchmarkSuite(unittest.TestCase):
+    """Test the synthetic data generator and baseline comparison"""
+
+    def test_synthetic_rows_match_uci_schema(self):
+        """Generated files parse like the real extract and go through the ETL"""
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir, ignore_errors=True)
+        path = synthetic_students.write_csv(os.path.join(tmp_dir, "students.csv"), 2000, chunksize=700)
+        real = pd.read_csv(etl_students.CSV_FILE, sep=';')
+        synthetic = pd.read_csv(path, sep=';')
+
+        self.assertEqual(len(synthetic), 2000)
+        self.assertEqual(list(synthetic.columns), list(real.columns))
+        self.assertEqual(list(synthetic.dtypes), list(real.dtypes))
+        with open(etl_students.CSV_FILE) as f_real, open(path) as f_synthetic:
+            self.assertEqual(f_synthetic.readline(), f_real.readline())
+        cleaned = etl_students.transform_frame(synthetic)
+        self.assertTrue(cleaned["G3"].between(0, 20).all())
+        self.assertTrue(0.4 < (cleaned["final_result"] == "pass").mean() < 0.9)
+
+    def test_compare_flags_regressions(self):
+        """Slowdowns beyond the threshold fail; small or noisy changes do not"""
+        baseline = {"results": {"suite": {"rows": 10, "clean_data_s": 1.0, "page_s": 0.001, "x_rows_per_s": 100}}}
+        current = {"suite": {"rows": 10, "clean_data_s": 1.5, "page_s": 0.002, "x_rows_per_s": 95}}
+        report = benchmark_students.compare(current, baseline, threshold=0.2).set_index("metric")
+        self.assertTrue(report.loc["clean_data_s", "regression"])
+        self.assertFalse(report.loc["page_s", "regression"])
+        self.assertFalse(report.loc["x_rows_per_s", "regression"])
+        current["suite"]["rows"] = 20
+        self.assertTrue(benchmark_students.compare(current, baseline).empty)
+
+    def test_dashboard_timings_bypass_query_cache(self):
+        """Benchmarked queries run against the database every time"""
+        before = query_cache.stats()
+        benchmark_students.bench_dashboard(500)
+        benchmark_students.bench_dashboard(500)
+        after = query_cache.stats()
+        for counter in ("memory_hits", "disk_hits", "misses"):
+            self.assertEqual(after[counter], before[counter])
+
+class TestMultiFileIngestion(unittest.TestCase):
+    """Test parallel ingestion of a drop directory"""
+
+    def setUp(self):
+        self.drop_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.drop_dir, ignore_errors=True)
+        raw = pd.read_csv(etl_students.CSV_FILE, sep=';')
+        for school, part in raw.groupby('school'):
+            part.to_csv(os.path.join(self.drop_dir, f"{school}_2024.csv"), sep=';', index=False)
+        raw.drop(columns=['G3']).to_csv(os.path.join(self.drop_dir, "broken.csv"), sep=';', index=False)
+
+    def test_failures_are_isolated(self):
+        """Good files are merged and tagged, the broken one is reported"""
+        paths = ingest_students.discover_files(self.drop_dir)
+        self.assertEqual(len(paths), 3)
+
+        df, failures = ingest_students.ingest_files(paths, workers=2)
+
+        self.assertEqual(list(failures), [os.path.join(self.drop_dir, "broken.csv")])
+        self.assertEqual(len(df), len(clean_data()))
+        self.assertEqual(sorted(df['source_file'].unique()), ['GP_2024.csv', 'MS_2024.csv'])
+        self.assertTrue((df.loc[df['school'] == 'MS', 'source_file'] == 'MS_2024.csv').all())
+
 class TestDatabaseConnection(unittest.TestCase):
     """Test database connection functionality"""
 
@@ -92,5 +1193,58 @@ class TestDatabaseConnection(unittest.TestCase):
         # so we just check that we have an engine
         self.assertTrue(engine is not None)
 
+class TestEngineRegistry(unittest.TestCase):
+    """Test engine caching and the MySQL circuit breaker"""
+
+    def setUp(self):
+        db_utils.reset_engines()
+        self.addCleanup(db_utils.reset_engines)
+
+    def test_engines_are_reused(self):
+        """Repeated calls share one engine"""
+        self.assertIs(get_engine(), get_engine())
+
+    def test_duckdb_fallback_needs_driver(self):
+        """DB_FALLBACK=duckdb without duckdb-engine falls back to SQLite"""
+        unreachable = {"user": "u", "password": "p", "database": "d", "host": "127.0.0.1", "port": "1"}
+        with mock.patch.dict(db_utils.DB_CONFIG, dict(unreachable, fallback="duckdb")), \
+                mock.patch.object(db_utils.importlib.util, "find_spec", return_value=None):
+            self.assertEqual(db_utils.fallback_backend(), "sqlite")
+            self.assertEqual(get_engine().dialect.name, "sqlite")
+
+    def test_half_open_breaker_allows_one_trial(self):
+        """After the cooldown only one caller probes MySQL until the trial reports back"""
+        breaker = db_utils.CircuitBreaker(threshold=1, cooldown=60.0)
+        breaker.record_failure(ConnectionError("down"))
+        self.assertFalse(breaker.allow())
+        breaker.opened_at -= 60.0
+        self.assertEqual(breaker.state, "half-open")
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_failure(ConnectionError("still down"))
+        self.assertEqual(breaker.state, "open")
+        breaker.opened_at -= 60.0
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, "closed")
+        self.assertTrue(breaker.allow() and breaker.allow())
+
+    def test_breaker_skips_known_down_mysql(self):
+        """After a failed connection MySQL is not retried until the cooldown ends"""
+        unreachable = {"user": "u", "password": "p", "database": "d", "host": "127.0.0.1", "port": "1"}
+        with mock.patch.dict(db_utils.DB_CONFIG, unreachable):
+            first = get_engine()
+            self.assertEqual(first.dialect.name, "sqlite")
+            with mock.patch.object(db_utils, "_is_healthy") as ping:
+                second = get_engine()
+                ping.assert_not_called()
+            self.assertIs(first, second)
+
+            stats = db_utils.get_engine_stats()
+            (breaker,) = stats["breakers"].values()
+            self.assertEqual(breaker["state"], "open")
+            self.assertEqual(breaker["failures"], 1)
+            self.assertTrue(any(url.startswith("sqlite") for url in stats["engines"]))
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
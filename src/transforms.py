@@ -0,0 +1,186 @@
+"""
+Transform Engine Module
+
+This module describes the student dataset's column coercions and derived
+columns in one place and applies them as vectorized pandas/NumPy operations.
+Both the ETL and the ML loader use it, so the pass mark and the compact
+dtypes are defined only once.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Minimum G3 grade counted as a pass
+PASS_THRESHOLD = 10
+
+# Source columns to coerce: numeric parsing, fill value for unparseable
+# entries and the compact dtype the column is stored as
+COLUMN_SCHEMA = {
+    "G1": {"coerce": "numeric", "fill": 0, "dtype": "int8"},
+    "G2": {"coerce": "numeric", "fill": 0, "dtype": "int8"},
+    "G3": {"coerce": "numeric", "fill": 0, "dtype": "int8"},
+}
+
+# Columns derived from a threshold on a source column; values at or above the
+# threshold get the second label
+DERIVED_COLUMNS = {
+    "final_result": {"source": "G3", "threshold": PASS_THRESHOLD, "labels": ["fail", "pass"]},
+}
+
+# Binary ML target encoded from a derived column. Labels are compared
+# case-insensitively, in pandas (encode_target) and in SQL (label_sql) alike
+TARGET = {"column": "final_result", "positive": "pass"}
+
+# Compact dtypes for the typed columnar store; columns not listed keep the
+# dtype they have after transform()
+STORAGE_SCHEMA = {
+    **{col: "int8" for col in [
+        "age", "Medu", "Fedu", "traveltime", "studytime", "failures",
+        "famrel", "freetime", "goout", "Dalc", "Walc", "health",
+    ]},
+    "absences": "int16",
+    **{col: "category" for col in [
+        "school", "sex", "address", "famsize", "Pstatus", "Mjob", "Fjob",
+        "reason", "guardian", "schoolsup", "famsup", "paid", "activities",
+        "nursery", "higher", "internet", "romantic", "final_result",
+    ]},
+}
+
+
+def _checked_astype(values, dtype, col):
+    """Cast a NumPy array to an integer dtype, refusing missing, fractional or out-of-range values."""
+    if len(values) and dtype.kind in "iu":
+        if values.dtype.kind == "f":
+            if np.isnan(values).any():
+                raise ValueError(f"Column {col} has missing values, which {dtype} cannot hold")
+            if (values != np.floor(values)).any():
+                raise ValueError(f"Column {col} has fractional values, which {dtype} would truncate")
+        info = np.iinfo(dtype)
+        if values.min() < info.min or values.max() > info.max:
+            raise ValueError(f"Column {col} has values outside the {dtype} range")
+    return values.astype(dtype)
+
+
+def coerce_columns(df, schema=None):
+    """
+    Coerce the schema's columns to their compact dtypes in place.
+
+    Args:
+        df (pd.DataFrame): Frame to coerce
+        schema (dict): Column schema (defaults to COLUMN_SCHEMA)
+
+    Returns:
+        pd.DataFrame: The same frame
+
+    Raises:
+        ValueError: If a value does not fit in the column's dtype
+    """
+    schema = schema or COLUMN_SCHEMA
+    for col, spec in schema.items():
+        if col not in df.columns:
+            continue
+        values = df[col]
+        if spec.get("coerce") == "numeric" and not pd.api.types.is_numeric_dtype(values):
+            values = pd.to_numeric(values, errors="coerce")
+        values = values.fillna(spec.get("fill", 0)).to_numpy()
+        df[col] = _checked_astype(values, np.dtype(spec["dtype"]), col)
+    return df
+
+
+def derive_columns(df, derived=None):
+    """
+    Add the threshold-derived columns as categoricals.
+
+    Args:
+        df (pd.DataFrame): Frame with the source columns already coerced
+        derived (dict): Derived column definitions (defaults to DERIVED_COLUMNS)
+
+    Returns:
+        pd.DataFrame: The same frame
+    """
+    derived = derived or DERIVED_COLUMNS
+    for col, spec in derived.items():
+        codes = (df[spec["source"]].to_numpy() >= spec["threshold"]).astype(np.int8)
+        df[col] = pd.Categorical.from_codes(codes, categories=spec["labels"])
+    return df
+
+
+def transform(df):
+    """
+    Apply the full schema to a raw student frame.
+
+    Args:
+        df (pd.DataFrame): Raw rows
+
+    Returns:
+        pd.DataFrame: The same frame with coerced and derived columns
+    """
+    return derive_columns(coerce_columns(df))
+
+
+def to_storage_dtypes(df, schema=None):
+    """
+    Downcast columns to the compact dtypes used by the columnar store.
+
+    Args:
+        df (pd.DataFrame): Transformed frame
+        schema (dict): Column to dtype mapping (defaults to STORAGE_SCHEMA)
+
+    Returns:
+        pd.DataFrame: A new frame with compact dtypes
+
+    Raises:
+        ValueError: If a value does not fit in the column's dtype
+    """
+    schema = schema or STORAGE_SCHEMA
+    out = df.copy(deep=False)
+    for col, dtype in schema.items():
+        if col not in out.columns:
+            continue
+        if dtype == "category":
+            if not isinstance(out[col].dtype, pd.CategoricalDtype):
+                out[col] = out[col].astype("category")
+        else:
+            out[col] = _checked_astype(out[col].to_numpy(), np.dtype(dtype), col)
+    return out
+
+
+def _lower(values):
+    """Lower-case labels as strings, keeping missing values missing."""
+    return pd.Series(values).astype("string").str.lower()
+
+
+def encode_target(values):
+    """
+    Encode the pass/fail outcome as a 0/1 int8 array.
+
+    Labels match case-insensitively, like label_sql() in queries.
+
+    Args:
+        values (pd.Series): final_result values (categorical or text)
+
+    Returns:
+        np.ndarray: 1 where the outcome is a pass, else 0
+    """
+    values = pd.Series(values)
+    positive = TARGET["positive"]
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        matches = np.flatnonzero((_lower(values.cat.categories) == positive).to_numpy())
+        return np.isin(values.cat.codes.to_numpy(), matches).astype(np.int8)
+    return _lower(values).eq(positive).fillna(False).to_numpy().astype(np.int8)
+
+
+def label_sql(label, column=None):
+    """
+    Return an SQL expression that is 1 where a column holds a label, else 0.
+
+    The comparison ignores case, matching encode_target().
+
+    Args:
+        label (str): Lower-case label, e.g. "pass"
+        column (str): Column to test (defaults to TARGET["column"])
+
+    Returns:
+        str: CASE expression
+    """
+    return f"CASE WHEN LOWER({column or TARGET['column']}) = '{label}' THEN 1 ELSE 0 END"